@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Registra os receivers de sinais (fila do deck, etc.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,114 @@
+# Arquivos estáticos de produção.
+# - Bibliotecas de terceiros (Bootstrap, Hammer.js) ficam em static/vendor/,
+#   baixadas uma vez com "python manage.py vendor_static" nas versões fixadas
+#   em VENDOR_ASSETS. Enquanto não foram baixadas, as páginas usam o CDN.
+# - O collectstatic (storage abaixo) grava cada arquivo com o hash do conteúdo
+#   no nome (style.3f2a9c1b0d4e.css, via staticfiles.json) e as versões
+#   pré-comprimidas .gz e .br ao lado. Como o nome muda quando o conteúdo
+#   muda, esses arquivos podem ir com "Cache-Control: immutable" por um ano
+#   e uma página recarregada não baixa nenhum byte de estático.
+# Sem proxy na frente, o StaticAssetView (accounts/views/asset_views.py)
+# serve o STATIC_ROOT com esses cabeçalhos. Com nginx, o equivalente é:
+#   location /static/ { gzip_static on; brotli_static on; expires max;
+#                       add_header Cache-Control "public, max-age=31536000, immutable"; }
+import gzip
+import os
+import re
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.templatetags.static import static
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só o .gz é gerado
+    brotli = None
+
+# nome: (URL no CDN, caminho dentro de static/)
+VENDOR_ASSETS = {
+    'bootstrap.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+        'vendor/bootstrap-5.3.2/bootstrap.min.css',
+    ),
+    'bootstrap.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+        'vendor/bootstrap-5.3.2/bootstrap.bundle.min.js',
+    ),
+    'hammer.js': (
+        'https://cdnjs.cloudflare.com/ajax/libs/hammer.js/2.0.8/hammer.min.js',
+        'vendor/hammer-2.0.8/hammer.min.js',
+    ),
+}
+
+# Comprimir só texto; imagens e fontes já são comprimidas
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.map')
+# Abaixo disso o cabeçalho de compressão não compensa
+MIN_COMPRESS_SIZE = 256
+
+# Os arquivos vendorizados são servidos sem os mapas de código
+SOURCE_MAP_COMMENT = re.compile(rb'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)\s*$')
+
+
+@lru_cache(maxsize=None)
+def vendor_url(name):
+    """URL local (com hash) da biblioteca, ou a do CDN se ela ainda não foi baixada"""
+    cdn_url, path = VENDOR_ASSETS[name]
+    if finders.find(path):
+        return static(path)
+    return cdn_url
+
+
+def strip_source_map(content):
+    return SOURCE_MAP_COMMENT.sub(b'\n', content)
+
+
+def compressed_variants(path):
+    """Grava path.gz (e path.br com o pacote brotli) se ficarem menores; devolve as extensões gravadas"""
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+        return []
+    with open(path, 'rb') as source:
+        content = source.read()
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    written = []
+    for extension, compressed in variants:
+        if len(compressed) < len(content):
+            with open(path + extension, 'wb') as output:
+                output.write(compressed)
+            written.append(extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que também gera as versões .gz/.br de cada
+    arquivo no collectstatic. Sem manifesto ou sem o arquivo no STATIC_ROOT
+    (ex.: testes, ou antes do primeiro collectstatic) o {% static %} cai no
+    nome sem hash em vez de dar erro.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # Sem a entrada no manifesto o Django tenta calcular o hash lendo o
+        # arquivo no STATIC_ROOT, e levanta ValueError se ele não está lá
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if self.exists(name):
+                compressed_variants(self.path(name))
+
+    @property
+    def immutable_names(self):
+        """Nomes com hash do manifesto (seguros para cache imutável)"""
+        if not hasattr(self, '_immutable_names'):
+            self._immutable_names = set(self.hashed_files.values())
+        return self._immutable_names
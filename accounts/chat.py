@@ -0,0 +1,137 @@
+# Estado do chat guardado em cache.
+# Cada match tem em cache o id da última mensagem enviada ("versão" do chat).
+# O polling do GetNewMessagesView compara com o last_message_id do cliente e,
+# se nada mudou, responde sem consultar a tabela Message.
+# Só o envio grava a versão (cache.set); o poll que não a encontra lê o banco e
+# preenche com cache.add, que não sobrescreve a versão de um envio concorrente.
+# Com settings.CHAT_LATEST_MESSAGE_CACHE desligado (ver SHARED_CACHE em
+# settings.py) a versão vem sempre do banco, numa consulta pelo índice (match, id).
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Match, Message
+from .pagination import decode_int_cursor, encode_cursor
+
+# Quantidade de mensagens por página do histórico do chat
+CHAT_PAGE_SIZE = 30
+
+
+def _latest_message_key(match_id):
+    return f'chat:latest-message:{match_id}'
+
+
+def latest_message_cache_enabled():
+    return getattr(settings, 'CHAT_LATEST_MESSAGE_CACHE', False)
+
+
+def _latest_message_timeout():
+    return getattr(settings, 'CHAT_LATEST_MESSAGE_TIMEOUT', 300)
+
+
+def get_latest_message_id(match_id):
+    """Id da última mensagem do match, ou None se não estiver em cache"""
+    if not latest_message_cache_enabled():
+        return None
+    return cache.get(_latest_message_key(match_id))
+
+
+def set_latest_message_id(match_id, message_id):
+    """Atualiza a versão do chat (só o SendMessageView, depois de gravar a mensagem)"""
+    if latest_message_cache_enabled():
+        cache.set(_latest_message_key(match_id), message_id, _latest_message_timeout())
+
+
+def fill_latest_message_id(match_id, message_id):
+    """Preenche a versão lida do banco, só se nenhum envio a gravou nesse meio tempo"""
+    if latest_message_cache_enabled():
+        cache.add(_latest_message_key(match_id), message_id, _latest_message_timeout())
+
+
+def _latest_message_query(match_id):
+    return Message.objects.filter(match_id=match_id).order_by('-id').values_list('id', flat=True)
+
+
+def latest_message_id(match_id):
+    """Id da última mensagem do match (0 se não houver): do cache ou do banco"""
+    message_id = get_latest_message_id(match_id)
+    if message_id is None:
+        message_id = _latest_message_query(match_id).first() or 0
+        fill_latest_message_id(match_id, message_id)
+    return message_id
+
+
+# Versões async, usadas pelas views async do chat sob ASGI
+async def aget_latest_message_id(match_id):
+    if not latest_message_cache_enabled():
+        return None
+    return await cache.aget(_latest_message_key(match_id))
+
+
+async def aset_latest_message_id(match_id, message_id):
+    if latest_message_cache_enabled():
+        await cache.aset(_latest_message_key(match_id), message_id, _latest_message_timeout())
+
+
+async def afill_latest_message_id(match_id, message_id):
+    if latest_message_cache_enabled():
+        await cache.aadd(_latest_message_key(match_id), message_id, _latest_message_timeout())
+
+
+async def alatest_message_id(match_id):
+    message_id = await aget_latest_message_id(match_id)
+    if message_id is None:
+        message_id = await _latest_message_query(match_id).afirst() or 0
+        await afill_latest_message_id(match_id, message_id)
+    return message_id
+
+
+def advance_read_cursor(match_id, read_field, message_id):
+    """
+    Marca como lidas todas as mensagens até message_id para um participante
+    (read_field vem de Match.last_read_field). Um único UPDATE de uma linha,
+    independente do tamanho do histórico; o cursor nunca anda para trás.
+    """
+    if message_id:
+        Match.objects.filter(pk=match_id, **{f'{read_field}__lt': message_id}).update(**{read_field: message_id})
+
+
+async def aadvance_read_cursor(match_id, read_field, message_id):
+    """Versão async de advance_read_cursor"""
+    if message_id:
+        await Match.objects.filter(
+            pk=match_id, **{f'{read_field}__lt': message_id}
+        ).aupdate(**{read_field: message_id})
+
+
+def get_message_page(match_id, cursor=None, limit=CHAT_PAGE_SIZE):
+    """
+    Retorna (mensagens, older_cursor) com a página de mensagens anterior ao cursor
+    (sem cursor: as mais recentes), já em ordem cronológica.
+    Os ids são gerados junto com o timestamp (auto_now_add), então a ordem por
+    id é a mesma ordem por (timestamp, id) e a consulta usa o índice (match, id).
+    older_cursor é None quando não há mensagens mais antigas.
+    """
+    before_id = decode_int_cursor(cursor, 'before')
+    queryset = Message.objects.filter(match_id=match_id).select_related('sender__user')
+    if before_id:
+        queryset = queryset.filter(id__lt=before_id)
+
+    # Um item a mais só para saber se existe uma página anterior
+    page = list(queryset.order_by('-id')[:limit + 1])
+    older_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        older_cursor = encode_cursor({'before': page[-1].id})
+    page.reverse()
+    return page, older_cursor
+
+
+def serialize_message(message, owner_id):
+    """Formato JSON das mensagens usado pelo chat.js"""
+    return {
+        'id': message.id,
+        'content': message.content,
+        'sender': message.sender.user.username,
+        'timestamp': message.timestamp.isoformat(),
+        'is_mine': message.sender_id == owner_id,
+    }
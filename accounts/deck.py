@@ -0,0 +1,215 @@
+# Funções de apoio para montar o "deck" de swipe (a pilha de cards).
+# O deck é servido em páginas pequenas de tamanho fixo, usando um cursor
+# opaco (keyset) em vez de OFFSET, para que cada página custe o mesmo
+# independente de quantos pets existam no banco.
+import time
+from functools import partial
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Pet, Swipe, DeckCandidate
+from .pagination import InvalidCursor, decode_cursor, decode_int_cursor, encode_cursor
+from .passes import passes_by_pet
+from .ranking import feature_store, load_ranking_snapshot, rank_candidates, save_ranking_snapshot
+from .thumbnails import variant_url
+
+# Quantidade de cards entregues por página do deck
+DECK_PAGE_SIZE = 10
+
+
+def get_deck_page(user_pet_id, cursor=None, limit=DECK_PAGE_SIZE):
+    """
+    Retorna (pets, next_cursor) com a próxima página de candidatos para o pet do usuário.
+    Os candidatos são ordenados por id, e o cursor guarda o último id entregue.
+    next_cursor é None quando não há mais páginas.
+    Com settings.DECK_RANKING_ENABLED os candidatos vêm ordenados por nota
+    (ver accounts/ranking.py) em vez de por id.
+    """
+    if getattr(settings, 'DECK_RANKING_ENABLED', False):
+        return get_ranked_deck_page(user_pet_id, cursor, limit)
+
+    after_id = decode_int_cursor(cursor, 'after')
+
+    # Leitura por faixa na fila materializada (índice único pet + candidate)
+    queryset = (
+        DeckCandidate.objects.filter(pet_id=user_pet_id, candidate_id__gt=after_id)
+        .order_by('candidate_id')
+        .select_related('candidate__primary_photo')
+    )
+
+    # Busca um item a mais só para saber se existe uma próxima página
+    pets = [entry.candidate for entry in queryset[:limit + 1]]
+    next_cursor = None
+    if len(pets) > limit:
+        pets = pets[:limit]
+        next_cursor = encode_cursor({'after': pets[-1].id})
+    return pets, next_cursor
+
+
+def get_ranked_deck_page(user_pet_id, cursor=None, limit=DECK_PAGE_SIZE):
+    """
+    Mesma interface de get_deck_page, mas com os candidatos ordenados por nota.
+    A primeira página ordena a janela dos primeiros candidatos e a guarda em
+    cache (accounts/ranking.py); o cursor leva o token dessa ordem e a posição
+    do próximo card, e as páginas seguintes só leem essa fatia, com as mesmas
+    notas (nenhum card repetido ou pulado entre as páginas). Quando a janela
+    acaba, a seguinte é ordenada a partir do último card dela.
+    Se a ordem guardada expirou (ou o cache não é compartilhado e o request
+    caiu em outro processo), ela é recalculada e a página continua depois da
+    nota e do id do último card entregue, também guardados no cursor.
+    """
+    payload = decode_cursor(cursor)
+    try:
+        token = str(payload['k']) if 'k' in payload else None
+        offset = int(payload.get('o', 0))
+        after_score = float(payload['s']) if 's' in payload else None
+        after_id = int(payload.get('i', 0))
+        now = float(payload['t']) if 't' in payload else time.time()
+    except (TypeError, ValueError):
+        raise InvalidCursor('Cursor inválido')
+    if offset < 0:
+        raise InvalidCursor('Cursor inválido')
+
+    window_size = getattr(settings, 'DECK_RANKING_SNAPSHOT_SIZE', 500)
+    snapshot = load_ranking_snapshot(user_pet_id, token) if token else None
+    if snapshot is None:
+        # Keyset sobre (nota desc, id asc): a janela começa depois do último card entregue
+        after = (after_score, after_id) if after_score is not None else None
+        ids, scores = rank_candidates(user_pet_id, now, after, window_size)
+        offset = 0
+        token = save_ranking_snapshot(user_pet_id, ids, scores)
+    else:
+        ids, scores = snapshot
+
+    # Pula os candidatos que saíram da fila depois do cálculo (swipes, pets
+    # apagados): uma consulta por janela, normalmente só uma.
+    # Cada card escolhido guarda (token, posição, id, nota) da sua janela.
+    selected = []
+    position = offset
+    while len(selected) <= limit:
+        if position >= len(ids):
+            # Janela incompleta: não há mais candidatos depois dela
+            if len(ids) < window_size:
+                break
+            ids, scores = rank_candidates(user_pet_id, now, (float(scores[-1]), int(ids[-1])), window_size)
+            token = save_ranking_snapshot(user_pet_id, ids, scores)
+            position = 0
+            continue
+        chunk = ids[position:position + 2 * (limit + 1)].tolist()
+        queued = set(
+            DeckCandidate.objects.filter(pet_id=user_pet_id, candidate_id__in=chunk)
+            .values_list('candidate_id', flat=True)
+        )
+        selected += [
+            (token, index, candidate_id, float(scores[index]))
+            for index, candidate_id in enumerate(chunk, position) if candidate_id in queued
+        ]
+        position += len(chunk)
+
+    next_cursor = None
+    if len(selected) > limit:
+        selected = selected[:limit]
+        last_token, last_index, last_id, last_score = selected[-1]
+        next_cursor = encode_cursor({
+            'k': last_token, 'o': last_index + 1, 's': last_score, 'i': last_id, 't': now,
+        })
+
+    # Só os cards da página viram objetos Pet, numa consulta; a ordem vem do ranking
+    page_ids = [candidate_id for _, _, candidate_id, _ in selected]
+    pets_by_id = Pet.objects.select_related('primary_photo').in_bulk(page_ids)
+    pets = [pets_by_id[pet_id] for pet_id in page_ids if pet_id in pets_by_id]
+    return pets, next_cursor
+
+
+def serialize_pet_card(pet):
+    """Dados mínimos de um card do deck, no formato usado pelo swipe.js"""
+    photo = pet.primary_photo
+    image = photo.image if photo else None
+    ready = photo.variants_ready if photo else False
+    return {
+        'id': pet.id,
+        'name': pet.name,
+        'age': pet.age,
+        'breed': pet.breed,
+        'bio': pet.bio,
+        'photo_url': variant_url(image, 'card', 'jpg', ready),
+        'photo_webp_url': variant_url(image, 'card', 'webp', ready) if ready else None,
+    }
+
+
+# --- Manutenção da fila de candidatos (DeckCandidate) ---
+
+def _tables():
+    return (
+        connection.ops.quote_name(Pet._meta.db_table),
+        connection.ops.quote_name(Swipe._meta.db_table),
+        connection.ops.quote_name(DeckCandidate._meta.db_table),
+    )
+
+
+def enqueue_new_pet(pet):
+    """
+    Coloca um pet recém-criado na fila de todos os outros pets e
+    preenche a fila dele com todos os pets existentes.
+    Feito com INSERT ... SELECT para não trazer os pets para o Python.
+    """
+    pet_table, _, queue_table = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Fila do novo pet: todos os outros pets
+        cursor.execute(
+            f'INSERT INTO {queue_table} (pet_id, candidate_id) '
+            f'SELECT %s, id FROM {pet_table} WHERE id <> %s',
+            [pet.id, pet.id],
+        )
+        # O novo pet entra na fila de todos os outros
+        cursor.execute(
+            f'INSERT INTO {queue_table} (pet_id, candidate_id) '
+            f'SELECT id, %s FROM {pet_table} WHERE id <> %s',
+            [pet.id, pet.id],
+        )
+
+
+def consume_candidates(swiper_pet_id, swiped_pet_ids):
+    """Remove os candidatos da fila depois que foram avaliados (like ou pass)"""
+    DeckCandidate.objects.filter(pet_id=swiper_pet_id, candidate_id__in=swiped_pet_ids).delete()
+    # Swipe conta como atividade recente no ranking, mas só se a transação
+    # do swipe for confirmada (o cache em memória não volta atrás num rollback)
+    transaction.on_commit(partial(feature_store.touch, swiper_pet_id))
+
+
+def rebuild_candidate_queue(pet_ids=None):
+    """
+    Regenera a fila a partir de Pet, Swipe e PassSet: todo par (pet, candidate)
+    que ainda não tem like nem pass não expirado. Se pet_ids for informado, só
+    essas filas são refeitas.
+    """
+    pet_table, swipe_table, queue_table = _tables()
+    sql = (
+        f'INSERT INTO {queue_table} (pet_id, candidate_id) '
+        f'SELECT p.id, c.id FROM {pet_table} p JOIN {pet_table} c ON c.id <> p.id '
+        f'WHERE NOT EXISTS (SELECT 1 FROM {swipe_table} s '
+        f'WHERE s.swiper_id = p.id AND s.swiped_id = c.id)'
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        if pet_ids is None:
+            DeckCandidate.objects.all().delete()
+            cursor.execute(sql)
+        else:
+            pet_ids = list(pet_ids)
+            DeckCandidate.objects.filter(pet_id__in=pet_ids).delete()
+            for pet_id in pet_ids:
+                cursor.execute(sql + ' AND p.id = %s', [pet_id])
+        # Os passes estão em blobs, fora do alcance do SQL: saem da fila depois
+        for pet_id, passed in passes_by_pet(pet_ids).items():
+            remove_candidates(pet_id, passed.tolist())
+        return DeckCandidate.objects.count()
+
+
+def remove_candidates(pet_id, candidate_ids, chunk_size=500):
+    """Tira os candidatos da fila do pet, em lotes (limite de parâmetros do SQLite)"""
+    for start in range(0, len(candidate_ids), chunk_size):
+        DeckCandidate.objects.filter(
+            pet_id=pet_id, candidate_id__in=candidate_ids[start:start + chunk_size]
+        ).delete()
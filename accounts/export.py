@@ -0,0 +1,152 @@
+# Exportação em streaming de Swipe, Match e Message (JSONL ou CSV) para
+# análises offline. Usada pelo comando export_data e pela ExportView.
+# Os passes ficam em PassSet (accounts/passes.py): o tipo "swipes" traz os
+# likes (e os passes antigos ainda não movidos pelo compact_passes) e o tipo
+# "passes" traz uma linha por pet passado, identificada por
+# (swiper_id, swiped_id, period_start). O blob do período atual continua
+# recebendo passes: numa exportação incremental use --start (sobre o último
+# pass do período) e descarte as linhas repetidas por essa chave.
+# As linhas são lidas em lotes por keyset (id > último id ORDER BY id LIMIT n),
+# cada lote numa consulta curta: a memória fica constante qualquer que seja o
+# tamanho da tabela e nenhum cursor fica aberto segurando o banco durante um
+# download lento.
+import csv
+import json
+from datetime import timedelta
+
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from .models import Match, Message, PassSet, Swipe
+from .passes import EPOCH, decode_ids
+
+# nome -> (modelo, campos exportados, campo de data usado nos filtros de período)
+EXPORTS = {
+    'swipes': (Swipe, ['id', 'swiper_id', 'swiped_id', 'liked', 'timestamp'], 'timestamp'),
+    'matches': (Match, ['id', 'pet1_id', 'pet2_id', 'created_at', 'last_message_id', 'last_message_at'], 'created_at'),
+    'messages': (Message, ['id', 'match_id', 'sender_id', 'content', 'timestamp'], 'timestamp'),
+    'passes': (PassSet, ['id', 'pet_id', 'pet_ids', 'period', 'updated_at'], 'updated_at'),
+}
+
+
+def _expand_passes(row):
+    set_id, pet_id, blob, period, updated_at = row
+    period_start = EPOCH + timedelta(days=period)
+    for passed_id in sorted(set(decode_ids(blob).tolist())):
+        yield set_id, pet_id, passed_id, period_start, updated_at
+
+
+# Tipos em que uma linha do banco vira várias exportadas: nome -> (colunas, função)
+EXPANDED_EXPORTS = {
+    'passes': (['pass_set_id', 'swiper_id', 'swiped_id', 'period_start', 'last_pass_at'], _expand_passes),
+}
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Linhas por consulta
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ExportError(ValueError):
+    """Parâmetro de exportação inválido (tipo, formato, data ou id)"""
+
+
+def parse_bound(value):
+    """Converte um limite de período (ISO 8601) para datetime com fuso"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ExportError(f'Data inválida: {value}')
+    return make_aware(parsed) if is_naive(parsed) else parsed
+
+
+def iter_rows(kind, since_id=0, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Gera tuplas com as colunas de export_fields(kind), em ordem de id.
+    since_id: exporta só ids maiores (exportação incremental).
+    start/end: período [start, end) sobre o campo de data do modelo.
+    """
+    if kind not in EXPORTS:
+        raise ExportError(f'Tipo de exportação desconhecido: {kind}')
+    model, fields, date_field = EXPORTS[kind]
+
+    queryset = model.objects.order_by('id')
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+    # Validação feita aqui, antes do primeiro next(), e não no meio do download
+    rows = _iter_chunks(queryset, fields, since_id or 0, chunk_size)
+    if kind in EXPANDED_EXPORTS:
+        expand = EXPANDED_EXPORTS[kind][1]
+        return (expanded for row in rows for expanded in expand(row))
+    return rows
+
+
+def export_fields(kind):
+    """Colunas exportadas de um tipo (o cabeçalho do CSV e as chaves do JSONL)"""
+    if kind in EXPANDED_EXPORTS:
+        return EXPANDED_EXPORTS[kind][0]
+    return EXPORTS[kind][1]
+
+
+def _iter_chunks(queryset, fields, last_id, chunk_size):
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list(*fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _export_value(value):
+    # Datas em ISO 8601 nos dois formatos
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class _Echo:
+    """"Arquivo" cujo write devolve o texto, para usar o csv.writer num gerador"""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(kind, export_format='jsonl', **filters):
+    """Gera o conteúdo exportado em pedaços de texto de até EXPORT_CHUNK_SIZE linhas"""
+    return format_rows(kind, iter_rows(kind, **filters), export_format)
+
+
+def format_rows(kind, rows, export_format):
+    """Transforma as tuplas de iter_rows em pedaços de texto JSONL ou CSV"""
+    if export_format not in FORMATS:
+        raise ExportError(f'Formato desconhecido: {export_format}')
+    return _iter_lines(export_fields(kind), rows, export_format)
+
+
+def _iter_lines(fields, rows, export_format):
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+
+        def format_row(row):
+            return writer.writerow([_export_value(value) for value in row])
+    else:
+        def format_row(row):
+            return json.dumps(
+                {field: _export_value(value) for field, value in zip(fields, row)},
+                ensure_ascii=False,
+            ) + '\n'
+
+    # Junta as linhas antes de entregar: menos escritas pequenas no socket
+    buffer = []
+    for row in rows:
+        buffer.append(format_row(row))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -3,6 +3,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Owner, Pet, PetPhoto
+from .thumbnails import queue_variants
 from django.core.exceptions import ValidationError
 from datetime import date
 
@@ -65,9 +66,17 @@ class OwnerProfileForm(forms.ModelForm):
         user.first_name = self.cleaned_data['first_name']
         user.last_name = self.cleaned_data['last_name']
         
+        # Foto nova: as variantes antigas não servem mais
+        picture_changed = 'profile_picture' in self.changed_data and bool(owner.profile_picture)
+        if picture_changed:
+            owner.picture_variants_ready = False
+
         if commit:
             user.save()
             owner.save()
+            if picture_changed:
+                # Versões redimensionadas da foto são geradas em segundo plano
+                queue_variants(owner, 'profile_picture')
 
         return owner
 
@@ -0,0 +1,114 @@
+# Cache de fragmentos de template (cards de pets e blocos de perfil).
+# Cada fragmento é guardado no cache com uma chave que inclui a "versão" dos
+# objetos usados nele; salvar ou apagar Pet, PetPhoto ou Owner troca a versão
+# (ver accounts/signals.py), então o fragmento antigo simplesmente deixa de ser
+# encontrado e expira sozinho. A tag de template fica em templatetags/fragment_cache.py.
+# Desligado com settings.FRAGMENT_CACHE_ENABLED (ver SHARED_CACHE em settings.py).
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+
+def fragment_cache_enabled():
+    return getattr(settings, 'FRAGMENT_CACHE_ENABLED', False)
+
+
+def _version_key(label, pk):
+    return f'fragment-version:{label}:{pk}'
+
+
+def object_label(obj):
+    """Modelo + pk que identificam a versão de um objeto (ex.: accounts.pet:12)"""
+    return obj._meta.label_lower, obj.pk
+
+
+def get_versions(objects):
+    """Versão atual de cada objeto (uma ida ao cache para todos)"""
+    keys = [_version_key(*object_label(obj)) for obj in objects]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Sem versão ainda (ou o cache foi limpo): cria uma
+            cache.add(key, get_random_string(12), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def bump_version(label, pk):
+    cache.set(_version_key(label, pk), get_random_string(12), None)
+
+
+def invalidate_fragments(instance):
+    """
+    Invalida os fragmentos que mostram o objeto. Chamado pelos sinais e também
+    depois de queryset.update(), que não dispara sinais.
+    Uma foto invalida o pet; um pet invalida também o dono (lista "Meu Pet");
+    um User invalida o dono (nome e username nos blocos de perfil).
+    """
+    from django.contrib.auth.models import User
+
+    from .models import Owner, Pet, PetPhoto
+
+    if not fragment_cache_enabled():
+        return
+    if isinstance(instance, PetPhoto):
+        bump_version(Pet._meta.label_lower, instance.pet_id)
+    elif isinstance(instance, Pet):
+        bump_version(Pet._meta.label_lower, instance.pk)
+        bump_version(Owner._meta.label_lower, instance.owner_id)
+    elif isinstance(instance, Owner):
+        bump_version(Owner._meta.label_lower, instance.pk)
+    elif isinstance(instance, User):
+        for owner_id in Owner.objects.filter(user_id=instance.pk).values_list('id', flat=True):
+            bump_version(Owner._meta.label_lower, owner_id)
+
+
+def fragment_key(name, objects, vary_on):
+    """Chave do fragmento: nome + versões dos objetos + valores extras"""
+    parts = [f'{label}:{pk}' for label, pk in map(object_label, objects)]
+    parts += get_versions(objects)
+    parts += [str(value) for value in vary_on]
+    digest = hashlib.md5(':'.join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+# --- Contadores de acerto (por processo) ---
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def record(name, hit):
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+
+
+def _with_rate(counts):
+    total = counts['hits'] + counts['misses']
+    return {**counts, 'hit_rate': round(counts['hits'] / total, 4) if total else None}
+
+
+def get_fragment_stats():
+    """Acertos, falhas e taxa de acerto por fragmento e no total"""
+    with _stats_lock:
+        per_fragment = {name: dict(counts) for name, counts in _stats.items()}
+    total = {
+        'hits': sum(counts['hits'] for counts in per_fragment.values()),
+        'misses': sum(counts['misses'] for counts in per_fragment.values()),
+    }
+    return {
+        'fragments': {name: _with_rate(counts) for name, counts in sorted(per_fragment.items())},
+        'total': _with_rate(total),
+    }
+
+
+def reset_fragment_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,314 @@
+# Serve um conjunto de requisições pela aplicação WSGI (latinder_proj/wsgi.py,
+# com um pool de threads como o gunicorn --threads) ou pela ASGI
+# (latinder_proj/asgi.py, num event loop como o uvicorn), com N conexões
+# simultâneas. Mostra vazão, latência (p50/p95/p99), erros e o pico
+# de threads usadas. Tudo roda dentro do processo, sem servidor HTTP, então
+# os números medem o Django (handlers, middlewares, views e banco).
+# Os cenários são os mesmos do bench_endpoints; use um banco do seed_data.
+# Uso (um modo por execução; as views async dependem do processo):
+#   python manage.py bench_concurrency --mode wsgi --json wsgi.json
+#   LATINDER_ASYNC_API_VIEWS=1 python manage.py bench_concurrency --mode asgi --compare wsgi.json
+# Outras opções: [--concurrency 50] [--requests 1000] [--threads 8] [--only process_swipe get_messages]
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import Client, override_settings
+from django.utils.crypto import get_random_string
+
+from accounts.models import Owner
+from .bench_endpoints import SCENARIOS, BenchContext, _percentile
+
+# Endpoints servidos por views async (accounts/views/api_views.py)
+DEFAULT_ROUTES = ['process_swipe', 'send_message', 'get_messages']
+
+
+class _Request:
+    """Requisição já montada, para não medir a montagem junto"""
+
+    def __init__(self, method, url, kwargs, cookies, csrf_token):
+        self.method = method.upper()
+        self.path = url
+        data = kwargs.get('data')
+        if self.method == 'GET':
+            self.query = urlencode(data or {})
+            self.body = b''
+        else:
+            self.query = ''
+            self.body = (data or '').encode()
+        self.headers = [
+            (b'cookie', cookies.encode()),
+            (b'x-csrftoken', csrf_token.encode()),
+            (b'host', b'testserver'),
+        ]
+        if kwargs.get('content_type'):
+            self.headers.append((b'content-type', kwargs['content_type'].encode()))
+        self.headers.append((b'content-length', str(len(self.body)).encode()))
+
+    def environ(self):
+        environ = {
+            'REQUEST_METHOD': self.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': self.path,
+            'QUERY_STRING': self.query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(self.body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in self.headers:
+            key = name.decode().upper().replace('-', '_')
+            if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[key] = value.decode()
+            else:
+                environ[f'HTTP_{key}'] = value.decode()
+        return environ
+
+    def scope(self):
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': self.method,
+            'scheme': 'http',
+            'path': self.path,
+            'raw_path': self.path.encode(),
+            'query_string': self.query.encode(),
+            'root_path': '',
+            'headers': self.headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+
+
+class _ThreadPeak:
+    """Maior número de threads vivas observado durante a medição"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_wsgi(application, requests, concurrency, threads):
+    """Um pool de `threads` workers atende `concurrency` requisições simultâneas"""
+    latencies, statuses = [], []
+
+    def call(request):
+        status = []
+        started = time.perf_counter()
+        try:
+            response = application(request.environ(), lambda line, headers, exc_info=None: status.append(line))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            code = int(status[0].split()[0])
+        except Exception:
+            code = 0
+        return time.perf_counter() - started, code
+
+    # No máximo `concurrency` requisições em andamento (na fila do pool ou
+    # sendo atendidas); a latência inclui o tempo de espera por uma thread
+    slots = threading.BoundedSemaphore(concurrency)
+
+    def finished(queued, future):
+        _, code = future.result()
+        latencies.append(time.perf_counter() - queued)
+        statuses.append(code)
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for request in requests:
+            slots.acquire()
+            queued = time.perf_counter()
+            pool.submit(call, request).add_done_callback(lambda future, queued=queued: finished(queued, future))
+    return latencies, statuses
+
+
+def run_asgi(application, requests, concurrency):
+    """`concurrency` clientes simultâneos num único event loop"""
+    latencies, statuses = [], []
+
+    async def call(request):
+        done = asyncio.Event()
+        body_sent = False
+        status = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': request.body, 'more_body': False}
+            # O cliente só "desconecta" depois da resposta completa
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                done.set()
+
+        started = time.perf_counter()
+        try:
+            await application(request.scope(), receive, send)
+            code = status[0]
+        except Exception:
+            code = 0
+        done.set()
+        latencies.append(time.perf_counter() - started)
+        statuses.append(code)
+
+    async def client(chunk):
+        for request in chunk:
+            await call(request)
+
+    async def main():
+        await asyncio.gather(*(client(requests[i::concurrency]) for i in range(concurrency)))
+
+    asyncio.run(main())
+    return latencies, statuses
+
+
+class Command(BaseCommand):
+    help = 'Mede vazão e latência das views com conexões simultâneas sob WSGI (pool de threads) ou ASGI (event loop).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='seed_0', help='Usuário usado nas requisições.')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi', help='Aplicação medida.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clientes simultâneos.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requisições por rota.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads do pool WSGI (como gunicorn --threads).')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', default=DEFAULT_ROUTES, help='Rotas medidas.')
+        parser.add_argument('--json', dest='json_path', help='Salva os resultados neste arquivo.')
+        parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior (ex.: do outro modo) para comparar.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['only']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Rotas sem cenário no bench_endpoints: {", ".join(sorted(unknown))}')
+        if options['concurrency'] < 1 or options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency, --threads e --requests precisam ser positivos.')
+
+        owner = Owner.objects.filter(user__username=options['username']).select_related('user').first()
+        if owner is None:
+            raise CommandError(f'Usuário {options["username"]} não encontrado; rode o seed_data antes.')
+        context = BenchContext(owner)
+
+        client = Client()
+        client.force_login(owner.user)
+        csrf_token = get_random_string(32)
+        cookies = (
+            f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}; '
+            f'{settings.CSRF_COOKIE_NAME}={csrf_token}'
+        )
+
+        mode = options['mode']
+        application = get_wsgi_application() if mode == 'wsgi' else get_asgi_application()
+        # As views async só são usadas com LATINDER_ASYNC_API_VIEWS=1 (o asgi.py liga,
+        # mas aqui o processo começou pelo manage.py)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{mode.upper()}, {options["concurrency"]} conexões simultâneas'
+            + (f', {options["threads"]} threads' if mode == 'wsgi' else '')
+            + f', views async: {"sim" if settings.ASYNC_API_VIEWS else "não"}'
+        ))
+
+        results = {}
+        # Erros esperados e requests lentos (de propósito) não precisam ir para o log
+        loggers = [logging.getLogger(name) for name in ('django.request', 'accounts.metrics')]
+        previous_levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name in options['only']:
+                    requests = [
+                        _Request(*SCENARIOS[name](context), cookies, csrf_token)
+                        for _ in range(options['requests'])
+                    ]
+                    results[name] = self.measure(mode, application, requests, options)
+                    self.print_row(name, results[name])
+        finally:
+            for logger, level in zip(loggers, previous_levels):
+                logger.setLevel(level)
+
+        if options['compare']:
+            self.print_comparison(results, options['compare'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Resultados salvos em {options["json_path"]}'))
+
+    def measure(self, mode, application, requests, options):
+        started = time.perf_counter()
+        with _ThreadPeak() as threads:
+            if mode == 'wsgi':
+                latencies, statuses = run_wsgi(application, requests, options['concurrency'], options['threads'])
+            else:
+                latencies, statuses = run_asgi(application, requests, options['concurrency'])
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency * 1000 for latency in latencies]
+        return {
+            'mode': mode,
+            'requests_per_second': round(len(requests) / elapsed, 1),
+            'p50_ms': round(_percentile(latencies, 0.50), 3),
+            'p95_ms': round(_percentile(latencies, 0.95), 3),
+            'p99_ms': round(_percentile(latencies, 0.99), 3),
+            'errors': sum(1 for status in statuses if status == 0 or status >= 500),
+            'status': sorted(set(statuses)),
+            'peak_threads': threads.peak,
+        }
+
+    def print_row(self, name, result):
+        line = (
+            f'{name:<16} {result["requests_per_second"]:8.1f} req/s  p50 {result["p50_ms"]:8.2f} ms  '
+            f'p95 {result["p95_ms"]:8.2f} ms  p99 {result["p99_ms"]:8.2f} ms  erros {result["errors"]:<4} '
+            f'status {",".join(map(str, result["status"])):<8} threads {result["peak_threads"]}'
+        )
+        self.stdout.write(self.style.ERROR(line) if result['errors'] else line)
+
+    def print_comparison(self, results, path):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Comparação com {path} (req/s / p99 / threads):'))
+        for name, result in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{name:<16} {before["mode"]} -> {result["mode"]}  '
+                f'{before["requests_per_second"]:.1f} -> {result["requests_per_second"]:.1f} req/s  '
+                f'{before["p99_ms"]:.2f} -> {result["p99_ms"]:.2f} ms  '
+                f'{before["peak_threads"]} -> {result["peak_threads"]} threads'
+            )
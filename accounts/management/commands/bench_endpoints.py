@@ -0,0 +1,215 @@
+# Benchmark por endpoint: chama cada rota de accounts/urls.py como o usuário
+# de teste do seed_data e mostra latência (p50/p95/p99) e consultas SQL.
+# Os resultados podem ser salvos em JSON e comparados com uma execução anterior.
+# Atenção: os endpoints de escrita (swipe, mensagem) alteram o banco; rode
+# numa cópia do banco gerado pelo seed_data.
+# Uso: python manage.py bench_endpoints [--iterations 50] [--only swipe matches]
+#      [--json depois.json] [--compare antes.json]
+import itertools
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts import urls as accounts_urls
+from accounts.models import DeckCandidate, Match, Owner, Pet, PetPhoto
+from accounts.pagination import encode_cursor
+
+# Rotas que não fazem sentido repetir num benchmark (motivo exibido no relatório)
+SKIPPED = {
+    'logout': 'encerra a sessão do usuário de teste',
+    'chat_stream': 'stream SSE, só roda sob ASGI',
+    'cache_stats': 'exige usuário staff',
+    'metrics': 'exige usuário staff',
+    'export': 'exige usuário staff',
+}
+
+
+class BenchContext:
+    """Objetos do usuário de teste usados para montar as requisições"""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.pet = Pet.objects.filter(owner=owner).order_by('pk').first()
+        if self.pet is None:
+            raise CommandError('O usuário de teste não tem pet.')
+        self.other_pet = Pet.objects.exclude(owner=owner).order_by('pk').first()
+        self.photo = PetPhoto.objects.filter(pet=self.pet).first()
+        self.match = (
+            Match.objects.filter(pet1=self.pet).order_by('-last_message_at').first()
+            or Match.objects.filter(pet2=self.pet).order_by('-last_message_at').first()
+        )
+        # Candidatos ainda não avaliados, usados pelos endpoints de swipe.
+        # Quando a fila acaba, os mesmos pets são avaliados de novo (vira atualização do swipe).
+        candidates = list(
+            DeckCandidate.objects.filter(pet=self.pet).order_by('candidate_id')
+            .values_list('candidate_id', flat=True)[:5000]
+        ) or list(Pet.objects.exclude(pk=self.pet.pk).values_list('pk', flat=True)[:5000])
+        self.candidates = itertools.cycle(candidates)
+
+    def latest_message_id(self):
+        return Match.objects.filter(pk=self.match.pk).values_list('last_message_id', flat=True).first() or 0
+
+    def next_candidate(self):
+        return next(self.candidates)
+
+    def need(self, value, what):
+        if value is None:
+            raise CommandError(f'O usuário de teste não tem {what}.')
+        return value
+
+
+def _json(payload):
+    return {'data': json.dumps(payload), 'content_type': 'application/json'}
+
+
+# nome da rota -> função (contexto) -> (método, URL, kwargs do Client)
+SCENARIOS = {
+    'login': lambda ctx: ('get', reverse('login'), {}),
+    'signup': lambda ctx: ('get', reverse('signup'), {}),
+    'home': lambda ctx: ('get', reverse('home'), {}),
+    'pet_add': lambda ctx: ('get', reverse('pet_add'), {}),
+    'pet_detail': lambda ctx: ('get', reverse('pet_detail', kwargs={'pk': ctx.other_pet.pk}), {}),
+    'owner_detail': lambda ctx: ('get', reverse('owner_detail', kwargs={'pk': ctx.owner.pk}), {}),
+    'owner_edit': lambda ctx: ('get', reverse('owner_edit'), {}),
+    'pet_edit': lambda ctx: ('get', reverse('pet_edit', kwargs={'pk': ctx.pet.pk}), {}),
+    'pet_primary_photo': lambda ctx: ('post', reverse('pet_primary_photo', kwargs={
+        'pk': ctx.pet.pk, 'photo_pk': ctx.need(ctx.photo, 'foto').pk,
+    }), {}),
+    'swipe': lambda ctx: ('get', reverse('swipe'), {}),
+    'deck': lambda ctx: ('get', reverse('deck'), {}),
+    'process_swipe': lambda ctx: ('post', reverse('process_swipe'), _json({
+        'swiped_pet_id': ctx.next_candidate(), 'liked': False,
+    })),
+    'process_swipe_batch': lambda ctx: ('post', reverse('process_swipe_batch'), _json({
+        'swipes': [{'swiped_pet_id': ctx.next_candidate(), 'liked': False} for _ in range(5)],
+    })),
+    'matches': lambda ctx: ('get', reverse('matches'), {}),
+    'chat': lambda ctx: ('get', reverse('chat', kwargs={'pk': ctx.need(ctx.match, 'match').pk}), {}),
+    'send_message': lambda ctx: ('post', reverse('send_message'), _json({
+        'match_id': ctx.need(ctx.match, 'match').pk, 'content': 'Mensagem do benchmark',
+    })),
+    # Polling em regime: o cliente já tem a última mensagem
+    'get_messages': lambda ctx: ('get', reverse('get_messages'), {'data': {
+        'match_id': ctx.need(ctx.match, 'match').pk, 'last_message_id': ctx.latest_message_id(),
+    }}),
+    'message_history': lambda ctx: ('get', reverse('message_history'), {'data': {
+        'match_id': ctx.need(ctx.match, 'match').pk,
+        'cursor': encode_cursor({'before': ctx.match.last_message_id or 0}),
+    }}),
+}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Mede latência e consultas SQL de cada rota do app accounts usando os dados do seed_data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='seed_0', help='Usuário usado nas requisições.')
+        parser.add_argument('--iterations', type=int, default=50, help='Requisições medidas por rota.')
+        parser.add_argument('--warmup', type=int, default=3, help='Requisições descartadas antes de medir.')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', help='Mede só estas rotas.')
+        parser.add_argument('--json', dest='json_path', help='Salva os resultados neste arquivo.')
+        parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior para comparar.')
+
+    def handle(self, *args, **options):
+        owner = Owner.objects.filter(user__username=options['username']).select_related('user').first()
+        if owner is None:
+            raise CommandError(f'Usuário {options["username"]} não encontrado; rode o seed_data antes.')
+        context = BenchContext(owner)
+
+        client = Client()
+        client.force_login(owner.user)
+
+        names = [pattern.name for pattern in accounts_urls.urlpatterns if pattern.name]
+        if options['only']:
+            unknown = set(options['only']) - set(names)
+            if unknown:
+                raise CommandError(f'Rotas desconhecidas: {", ".join(sorted(unknown))}')
+            names = [name for name in names if name in options['only']]
+
+        results = {}
+        # Respostas 4xx esperadas não precisam ir para o log a cada repetição
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            self.run_all(client, context, names, options, results)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        if options['compare']:
+            self.print_comparison(results, options['compare'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Resultados salvos em {options["json_path"]}'))
+
+    def run_all(self, client, context, names, options, results):
+        # O Client usa o host "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in names:
+                if name in SKIPPED:
+                    self.stdout.write(f'{name:<22} pulada: {SKIPPED[name]}')
+                    continue
+                if name not in SCENARIOS:
+                    self.stdout.write(self.style.WARNING(f'{name:<22} sem cenário no bench_endpoints'))
+                    continue
+                results[name] = self.measure(client, context, SCENARIOS[name], options)
+                self.print_row(name, results[name])
+
+    def measure(self, client, context, scenario, options):
+        latencies, queries, statuses = [], [], set()
+        for iteration in range(options['warmup'] + options['iterations']):
+            method, url, kwargs = scenario(context)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, **kwargs)
+                elapsed = time.perf_counter() - started
+            if iteration < options['warmup']:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        return {
+            'method': method.upper(),
+            'status': sorted(statuses),
+            'p50_ms': round(_percentile(latencies, 0.50), 3),
+            'p95_ms': round(_percentile(latencies, 0.95), 3),
+            'p99_ms': round(_percentile(latencies, 0.99), 3),
+            'max_ms': round(max(latencies), 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def print_row(self, name, result):
+        self.stdout.write(
+            f'{name:<22} {result["method"]:<4} {",".join(map(str, result["status"])):<8} '
+            f'p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+            f'p99 {result["p99_ms"]:8.2f} ms  SQL {result["queries_mean"]:6.1f} (máx {result["queries_max"]})'
+        )
+
+    def print_comparison(self, results, path):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Comparação com {path} (p95 / SQL médio):'))
+        for name, result in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            delta = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line = (
+                f'{name:<22} {before["p95_ms"]:8.2f} -> {result["p95_ms"]:8.2f} ms ({delta:+.0f}%)  '
+                f'SQL {before["queries_mean"]:.1f} -> {result["queries_mean"]:.1f}'
+            )
+            self.stdout.write(self.style.ERROR(line) if delta > 10 else line)
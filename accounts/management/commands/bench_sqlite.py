@@ -0,0 +1,165 @@
+# Benchmark de concorrência do SQLite: configuração padrão x modo de produção.
+# Roda threads escritoras (swipes e mensagens) e leitoras (polling do chat)
+# num banco temporário, com o mesmo formato das tabelas do app, e mostra
+# a vazão, a latência p95 e quantos "database is locked" aconteceram.
+# Uso: python manage.py bench_sqlite [--writers 4] [--readers 8] [--seconds 5]
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sqlite_tuning import apply_pragmas, get_pragmas
+
+SCHEMA = [
+    'CREATE TABLE swipe (id INTEGER PRIMARY KEY, swiper_id INTEGER NOT NULL, swiped_id INTEGER NOT NULL, '
+    'liked BOOL NOT NULL, timestamp REAL NOT NULL, UNIQUE (swiper_id, swiped_id))',
+    'CREATE TABLE message (id INTEGER PRIMARY KEY, match_id INTEGER NOT NULL, sender_id INTEGER NOT NULL, '
+    'content TEXT NOT NULL, timestamp REAL NOT NULL)',
+    'CREATE INDEX message_match_id_idx ON message (match_id, id)',
+    'CREATE TABLE match (id INTEGER PRIMARY KEY, last_message_id INTEGER, last_message_at REAL)',
+]
+
+PETS = 5000
+MATCHES = 500
+
+
+def _connect(path, production, timeout):
+    # isolation_level=None: transações explícitas, como o Django faz em autocommit
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    if production:
+        apply_pragmas(connection.cursor())
+    return connection
+
+
+def _prepare(path, production):
+    connection = _connect(path, production, 5.0)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO match (id) VALUES (?)', [(i,) for i in range(1, MATCHES + 1)]
+    )
+    connection.executemany(
+        'INSERT INTO message (match_id, sender_id, content, timestamp) VALUES (?, 1, ?, ?)',
+        [(random.randint(1, MATCHES), 'oi ' * 10, time.time()) for _ in range(20000)],
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def _write(connection, rng):
+    if rng.random() < 0.7:
+        # Swipe: upsert + verificação de reciprocidade
+        swiper, swiped = rng.randint(1, PETS), rng.randint(1, PETS)
+        connection.execute('BEGIN')
+        connection.execute(
+            'INSERT INTO swipe (swiper_id, swiped_id, liked, timestamp) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (swiper_id, swiped_id) DO UPDATE SET liked = excluded.liked',
+            (swiper, swiped, rng.random() < 0.5, time.time()),
+        )
+        connection.execute(
+            'SELECT 1 FROM swipe WHERE swiper_id = ? AND swiped_id = ? AND liked', (swiped, swiper)
+        ).fetchone()
+        connection.execute('COMMIT')
+    else:
+        # Mensagem: insert + atualização do match
+        match_id = rng.randint(1, MATCHES)
+        connection.execute('BEGIN')
+        cursor = connection.execute(
+            'INSERT INTO message (match_id, sender_id, content, timestamp) VALUES (?, 1, ?, ?)',
+            (match_id, 'mensagem nova', time.time()),
+        )
+        connection.execute(
+            'UPDATE match SET last_message_id = ?, last_message_at = ? WHERE id = ?',
+            (cursor.lastrowid, time.time(), match_id),
+        )
+        connection.execute('COMMIT')
+
+
+def _read(connection, rng):
+    # Polling do chat: mensagens novas de um match
+    match_id = rng.randint(1, MATCHES)
+    connection.execute(
+        'SELECT id, sender_id, content FROM message WHERE match_id = ? AND id > ? ORDER BY id',
+        (match_id, rng.randint(0, 20000)),
+    ).fetchall()
+
+
+def _worker(path, production, timeout, operation, deadline, results, seed):
+    rng = random.Random(seed)
+    connection = _connect(path, production, timeout)
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            operation(connection, rng)
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+    results.append((operation.__name__, latencies, errors))
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Compara a concorrência do SQLite padrão com o modo de produção (WAL, busy_timeout, etc.).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Threads escritoras.')
+        parser.add_argument('--readers', type=int, default=8, help='Threads leitoras.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duração de cada rodada.')
+        parser.add_argument(
+            '--timeout', type=float, default=5.0,
+            help='Timeout do driver sqlite3 na configuração padrão (o mesmo padrão do Django).',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'PRAGMAs do modo de produção: {get_pragmas()}')
+        for label, production in (('padrão', False), ('produção', True)):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                _prepare(path, production)
+                self.report(label, self.run_round(path, production, options), options['seconds'])
+
+    def run_round(self, path, production, options):
+        results = []
+        deadline = time.perf_counter() + options['seconds']
+        threads = [
+            threading.Thread(target=_worker, args=(
+                path, production, options['timeout'], operation, deadline, results, seed,
+            ))
+            for seed, operation in enumerate(
+                [_write] * options['writers'] + [_read] * options['readers']
+            )
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, label, results, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Configuração {label}:'))
+        for name, title in (('_write', 'escritas'), ('_read', 'leituras')):
+            latencies = [value for op, values, _ in results if op == name for value in values]
+            errors = sum(count for op, _, count in results if op == name)
+            self.stdout.write(
+                f'  {title}: {len(latencies) / seconds:,.0f} ops/s, '
+                f'p50 {_percentile(latencies, 0.5) * 1000:.2f} ms, '
+                f'p95 {_percentile(latencies, 0.95) * 1000:.2f} ms, '
+                f'"database is locked": {errors}'
+            )
@@ -0,0 +1,55 @@
+# Comando para gerar as variantes (card, thumb, avatar) das fotos já existentes.
+# Uso: python manage.py build_image_variants [--force]
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.models import Owner, PetPhoto
+from accounts.thumbnails import build_and_mark
+
+
+def _build(model_label, pk, field_name):
+    try:
+        build_and_mark(model_label, pk, field_name)
+        return None
+    except Exception as e:
+        return f'{model_label} {pk}: {e}'
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Gera as versões redimensionadas de PetPhoto.image e Owner.profile_picture.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regera também as fotos que já têm variantes.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            help='Quantidade de threads do pool.',
+        )
+
+    def handle(self, *args, **options):
+        photos = PetPhoto.objects.all()
+        owners = Owner.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['force']:
+            photos = photos.filter(variants_ready=False)
+            owners = owners.filter(picture_variants_ready=False)
+
+        jobs = [('accounts.PetPhoto', pk, 'image') for pk in photos.values_list('pk', flat=True)]
+        jobs += [('accounts.Owner', pk, 'profile_picture') for pk in owners.values_list('pk', flat=True)]
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for error in executor.map(lambda job: _build(*job), jobs):
+                if error:
+                    errors.append(error)
+                    self.stderr.write(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Variantes geradas para {len(jobs) - len(errors)} de {len(jobs)} imagens.'
+        ))
@@ -0,0 +1,142 @@
+# Manutenção dos passes compactados (accounts/passes.py), em três etapas:
+#   1. move os passes antigos (Swipe com liked=False) para os blobs de PassSet;
+#   2. com settings.PASS_EXPIRY_DAYS, apaga os períodos expirados e devolve os
+#      pets à fila do deck (menos os que o pet curtiu ou passou de novo depois);
+#   3. reescreve os blobs ordenados e sem ids repetidos.
+# Mostra o espaço ocupado pelos passes antes e depois.
+# Uso: python manage.py compact_passes [--skip-legacy] [--skip-expiry] [--batch 200]
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import DeckCandidate, PassSet, Pet, Swipe
+from accounts.passes import add_passes, day_of, decode_ids, encode_ids, expired_before, passes_by_pet, period_of
+
+# Limite de parâmetros por consulta (SQLite)
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class Command(BaseCommand):
+    help = 'Move os passes de Swipe para PassSet, aplica a expiração e compacta os blobs de passes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-legacy', action='store_true', help='Não move os passes que ainda estão em Swipe.')
+        parser.add_argument('--skip-expiry', action='store_true', help='Não apaga os períodos expirados.')
+        parser.add_argument('--batch', type=int, default=200, help='Pets por transação.')
+
+    def handle(self, *args, **options):
+        before = self.footprint()
+
+        if not options['skip_legacy']:
+            moved = self.move_legacy_passes(options['batch'])
+            self.stdout.write(f'Passes movidos de Swipe para PassSet: {moved}.')
+        if not options['skip_expiry']:
+            expired, restored = self.expire_passes(options['batch'])
+            self.stdout.write(f'Períodos expirados: {expired}; candidatos de volta ao deck: {restored}.')
+        rewritten = self.compact_blobs()
+        self.stdout.write(f'Blobs reescritos ordenados: {rewritten}.')
+
+        after = self.footprint()
+        self.stdout.write(self.style.SUCCESS(
+            f'Passes em Swipe: {before["swipe_rows"]} -> {after["swipe_rows"]} linhas; '
+            f'PassSet: {before["sets"]} -> {after["sets"]} blobs, '
+            f'{before["bytes"]} -> {after["bytes"]} bytes de ids.'
+        ))
+
+    def footprint(self):
+        table = connection.ops.quote_name(PassSet._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*), COALESCE(SUM(LENGTH(pet_ids)), 0) FROM {table}')
+            sets, size = cursor.fetchone()
+        return {'swipe_rows': Swipe.objects.filter(liked=False).count(), 'sets': sets, 'bytes': size}
+
+    def move_legacy_passes(self, batch):
+        """Cada pass antigo entra no período do seu timestamp; a linha de Swipe é apagada"""
+        moved = 0
+        while True:
+            swiper_ids = list(
+                Swipe.objects.filter(liked=False).order_by('swiper_id')
+                .values_list('swiper_id', flat=True).distinct()[:batch]
+            )
+            if not swiper_ids:
+                return moved
+            with transaction.atomic():
+                rows = Swipe.objects.filter(liked=False, swiper_id__in=swiper_ids).values_list(
+                    'id', 'swiper_id', 'swiped_id', 'timestamp'
+                )
+                groups = {}
+                swipe_ids = []
+                for swipe_id, swiper_id, swiped_id, timestamp in rows.iterator():
+                    group = groups.setdefault((swiper_id, period_of(day_of(timestamp))), [[], timestamp])
+                    group[0].append(swiped_id)
+                    group[1] = max(group[1], timestamp)
+                    swipe_ids.append(swipe_id)
+                for (swiper_id, period), (passed, last) in groups.items():
+                    add_passes(swiper_id, passed, period=period, at=last)
+                for chunk in _chunks(swipe_ids):
+                    Swipe.objects.filter(id__in=chunk).delete()
+                moved += len(swipe_ids)
+
+    def expire_passes(self, batch):
+        cutoff = expired_before()
+        if cutoff is None:
+            return 0, 0
+        expired_sets = restored = 0
+        while True:
+            pet_ids = list(
+                PassSet.objects.filter(period__lt=cutoff).order_by('pet_id')
+                .values_list('pet_id', flat=True).distinct()[:batch]
+            )
+            if not pet_ids:
+                return expired_sets, restored
+            with transaction.atomic():
+                expired = PassSet.objects.filter(period__lt=cutoff, pet_id__in=pet_ids)
+                candidates = {}
+                for pet_id, blob in expired.values_list('pet_id', 'pet_ids').iterator():
+                    candidates.setdefault(pet_id, []).append(decode_ids(blob))
+                expired_sets += expired.delete()[0]
+
+                # Passes mais novos continuam valendo
+                live = passes_by_pet(pet_ids)
+                for pet_id, arrays in candidates.items():
+                    ids = np.setdiff1d(np.unique(np.concatenate(arrays)), live.get(pet_id, []))
+                    ids = [candidate_id for candidate_id in ids.tolist() if candidate_id != pet_id]
+                    restored += self.restore_candidates(pet_id, ids)
+
+    def restore_candidates(self, pet_id, candidate_ids):
+        """Devolve à fila os candidatos que ainda existem e que o pet não curtiu"""
+        restored = 0
+        for chunk in _chunks(candidate_ids):
+            existing = set(Pet.objects.filter(id__in=chunk).values_list('id', flat=True))
+            existing -= set(
+                Swipe.objects.filter(swiper_id=pet_id, swiped_id__in=chunk).values_list('swiped_id', flat=True)
+            )
+            DeckCandidate.objects.bulk_create(
+                [DeckCandidate(pet_id=pet_id, candidate_id=candidate_id) for candidate_id in sorted(existing)],
+                ignore_conflicts=True,
+            )
+            restored += len(existing)
+        return restored
+
+    def compact_blobs(self):
+        rewritten = after_id = 0
+        while True:
+            # Páginas por id: no SQLite não se escreve na tabela durante um iterator() sobre ela
+            page = list(
+                PassSet.objects.filter(id__gt=after_id).order_by('id').values_list('id', 'pet_ids')[:CHUNK_SIZE]
+            )
+            if not page:
+                return rewritten
+            after_id = page[-1][0]
+            for set_id, blob in page:
+                ids = decode_ids(blob)
+                compact = np.unique(ids)
+                if np.array_equal(compact, ids):
+                    continue
+                # Só grava se ninguém anexou um pass no meio tempo (o próximo run pega)
+                rewritten += PassSet.objects.filter(id=set_id, pet_ids=blob).update(pet_ids=encode_ids(compact))
@@ -0,0 +1,59 @@
+# Exporta swipes, passes, matches ou mensagens em JSONL ou CSV, em streaming.
+# Uso: python manage.py export_data swipes [--format csv] [--since-id 1000]
+#      [--start 2024-01-01T00:00] [--end 2024-02-01T00:00] [--output swipes.jsonl]
+# Sem --output o conteúdo vai para a saída padrão. O último id exportado é
+# mostrado no final, para ser usado como --since-id na próxima exportação.
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.export import EXPORTS, FORMATS, ExportError, format_rows, iter_rows, parse_bound
+
+
+class _LastIdTracker:
+    """Guarda o último id visto nas linhas exportadas, sem alterá-las"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.last_id = None
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.last_id = row[0]
+            self.count += 1
+            yield row
+
+
+class Command(BaseCommand):
+    help = 'Exporta Swipe, PassSet, Match ou Message em JSONL/CSV sem carregar a tabela na memória.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help='O que exportar.')
+        parser.add_argument('--format', dest='export_format', default='jsonl', choices=sorted(FORMATS))
+        parser.add_argument('--since-id', type=int, default=0, help='Exporta só ids maiores que este.')
+        parser.add_argument('--start', help='Início do período (ISO 8601, inclusivo).')
+        parser.add_argument('--end', help='Fim do período (ISO 8601, exclusivo).')
+        parser.add_argument('--output', help='Arquivo de saída (padrão: saída padrão).')
+
+    def handle(self, *args, **options):
+        try:
+            rows = _LastIdTracker(iter_rows(
+                options['kind'],
+                since_id=options['since_id'],
+                start=parse_bound(options['start']),
+                end=parse_bound(options['end']),
+            ))
+            chunks = format_rows(options['kind'], rows, options['export_format'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+
+        self.stderr.write(self.style.SUCCESS(
+            f'{rows.count} linhas exportadas; último id: {rows.last_id if rows.last_id is not None else "-"}'
+        ))
@@ -0,0 +1,19 @@
+# Comando para regenerar a fila materializada de candidatos do deck.
+# Uso: python manage.py rebuild_deck_queue [--pet ID ...]
+from django.core.management.base import BaseCommand
+
+from accounts.deck import rebuild_candidate_queue
+
+
+class Command(BaseCommand):
+    help = 'Regenera a fila de candidatos não vistos (DeckCandidate) a partir de Pet e Swipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pet', type=int, action='append', dest='pet_ids',
+            help='Refaz apenas a fila deste pet (pode ser repetido).',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_candidate_queue(options['pet_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Fila do deck regenerada: {total} candidatos.'))
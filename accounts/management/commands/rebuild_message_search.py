@@ -0,0 +1,25 @@
+# Refaz o índice FTS5 da busca nas conversas a partir das mensagens existentes.
+# Os gatilhos mantêm o índice em dia; este comando serve para bancos copiados
+# sem a tabela de busca preenchida ou para recuperar um índice corrompido.
+# Uso: python manage.py rebuild_message_search [--database default]
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.search import SearchUnavailable, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Regenera o índice de busca (FTS5) das mensagens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias do banco em settings.DATABASES.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            indexed = rebuild_index(options['database'])
+        except SearchUnavailable:
+            raise CommandError('A busca nas conversas só existe em bancos SQLite (FTS5).')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca regenerado: {indexed} mensagens em {elapsed:.1f} s.'))
@@ -0,0 +1,272 @@
+# Gera dados sintéticos em volume (donos, pets, fotos, swipes, matches e mensagens)
+# para medir o comportamento das views em escala. Usa bulk_create em lotes,
+# sem passar pelos sinais, e depois recalcula os campos desnormalizados e a
+# fila do deck com UPDATEs em massa.
+# Uso: python manage.py seed_data --rows 100000 [--seed 42] [--queue-pets 50]
+# O dono "seed_0" (senha "seed") tem matches e mensagens e é usado pelo bench_endpoints.
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Mod
+
+from accounts.deck import rebuild_candidate_queue
+from accounts.models import Match, Message, Owner, PassSet, Pet, PetPhoto, Swipe
+from accounts.passes import ID_DTYPE, current_period, encode_ids
+
+# Fração do total de linhas de cada modelo (o resto vai para swipes: likes em
+# Swipe e passes nos blobs de PassSet)
+RATIOS = {
+    'owners': 0.02,
+    'pets': 0.024,
+    'photos': 0.06,
+    'matches': 0.026,
+    'messages': 0.27,
+}
+
+# Probabilidade de um swipe aleatório ser like
+LIKE_RATE = 0.4
+# Matches garantidos para o pet do usuário seed_0
+BENCH_USER_MATCHES = 20
+
+STATES = {
+    'SP': ['São Paulo', 'Campinas', 'Santos', 'Ribeirão Preto'],
+    'RJ': ['Rio de Janeiro', 'Niterói', 'Petrópolis'],
+    'MG': ['Belo Horizonte', 'Uberlândia', 'Juiz de Fora'],
+    'RS': ['Porto Alegre', 'Caxias do Sul'],
+    'PR': ['Curitiba', 'Londrina'],
+    'BA': ['Salvador', 'Feira de Santana'],
+    'PE': ['Recife', 'Olinda'],
+}
+BREEDS = [
+    'Vira-lata', 'Labrador', 'Golden Retriever', 'Poodle', 'Shih Tzu', 'Bulldog Francês',
+    'Pastor Alemão', 'Yorkshire', 'Lhasa Apso', 'Border Collie', 'Siamês', 'Persa',
+]
+NAMES = [
+    'Thor', 'Mel', 'Luna', 'Bob', 'Nina', 'Fred', 'Bela', 'Max', 'Pipoca', 'Amora',
+    'Toby', 'Mia', 'Zeca', 'Cacau', 'Paçoca', 'Lola', 'Rex', 'Frida', 'Simba', 'Bolt',
+]
+PHRASES = [
+    'Oi! Tudo bem?', 'Que pet lindo!', 'Vamos marcar um passeio no parque?',
+    'Ele adora brincar de bolinha', 'Qual a ração que vocês usam?', 'Sábado de manhã pode ser?',
+    'Hahaha que fofo', 'Ela é bem tranquila com outros cachorros', 'Combinado então!',
+    'Manda mais fotos!', 'Moramos perto do centro', 'Ele já tomou todas as vacinas',
+]
+
+
+class Command(BaseCommand):
+    help = 'Gera dados sintéticos (10 mil a 10 milhões de linhas) para testes de desempenho.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10_000,
+            help='Total aproximado de linhas (donos + pets + fotos + swipes + matches + mensagens).',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Linhas por INSERT em lote.')
+        parser.add_argument(
+            '--queue-pets', type=int, default=50,
+            help='Quantos pets (os primeiros) ganham a fila do deck; ela cresce com pets².',
+        )
+        parser.add_argument(
+            '--full-queue', action='store_true',
+            help='Gera a fila do deck de todos os pets (só para volumes pequenos).',
+        )
+
+    def handle(self, *args, **options):
+        if not 10_000 <= options['rows'] <= 10_000_000:
+            raise CommandError('--rows deve ficar entre 10.000 e 10.000.000.')
+        if User.objects.filter(username='seed_0').exists():
+            raise CommandError('Os dados sintéticos já existem neste banco (usuário seed_0).')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        rows = options['rows']
+        counts = {name: max(int(rows * ratio), 10) for name, ratio in RATIOS.items()}
+        counts['swipes'] = rows - sum(counts.values())
+
+        started = time.perf_counter()
+        owner_ids = self.step('donos', self.create_owners, counts['owners'])
+        pet_ids, pet_owner = self.step('pets', self.create_pets, owner_ids, counts['pets'])
+        self.step('fotos', self.create_photos, pet_ids, counts['photos'])
+        matches = self.step('matches', self.create_matches, pet_ids, counts['matches'])
+        self.step('swipes', self.create_swipes, pet_ids, matches, counts['swipes'])
+        self.step('mensagens', self.create_messages, matches, pet_owner, counts['messages'])
+        self.step('campos desnormalizados', self.update_denormalized)
+
+        queue_pets = None if options['full_queue'] else pet_ids[:options['queue_pets']]
+        total = self.step('fila do deck', rebuild_candidate_queue, queue_pets)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronto em {time.perf_counter() - started:.1f} s: '
+            f'{len(owner_ids)} donos, {len(pet_ids)} pets, {len(matches)} matches, '
+            f'{total} candidatos na fila do deck. Login de teste: seed_0 / seed'
+        ))
+
+    def step(self, label, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.stdout.write(f'  {label}: {time.perf_counter() - started:.1f} s')
+        return result
+
+    def bulk(self, model, objects):
+        """bulk_create em lotes, cada lote na sua transação; devolve os ids"""
+        ids = []
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                ids += self._insert(model, batch)
+                batch = []
+        if batch:
+            ids += self._insert(model, batch)
+        return ids
+
+    def _insert(self, model, batch):
+        with transaction.atomic():
+            return [obj.pk for obj in model.objects.bulk_create(batch)]
+
+    def random_date(self, start_year, end_year):
+        start = date(start_year, 1, 1)
+        return start + timedelta(days=self.rng.randrange((date(end_year, 12, 31) - start).days))
+
+    # --- Geração ---
+
+    def create_owners(self, count):
+        # O hash é calculado uma vez só: todos os usuários têm a senha "seed"
+        password = make_password('seed')
+        user_ids = self.bulk(User, (
+            User(username=f'seed_{i}', password=password, first_name=self.rng.choice(NAMES), last_name='Seed')
+            for i in range(count)
+        ))
+        owners = []
+        for user_id in user_ids:
+            state = self.rng.choice(list(STATES))
+            owners.append(Owner(
+                user_id=user_id,
+                bio='Dono(a) de pet gerado automaticamente.',
+                birth_date=self.random_date(1960, 2005),
+                state=state,
+                city=self.rng.choice(STATES[state]),
+            ))
+        return self.bulk(Owner, owners)
+
+    def create_pets(self, owner_ids, count):
+        # Todo dono tem ao menos um pet; os extras vão para donos aleatórios
+        owners = owner_ids + [self.rng.choice(owner_ids) for _ in range(count - len(owner_ids))]
+        pet_owner = {}
+        pets = [
+            Pet(
+                owner_id=owner_id,
+                name=self.rng.choice(NAMES),
+                breed=self.rng.choice(BREEDS),
+                bio='Adora passear e fazer novos amigos.',
+                birth_date=self.random_date(2010, 2024),
+            )
+            for owner_id in owners
+        ]
+        pet_ids = self.bulk(Pet, pets)
+        for pet_id, owner_id in zip(pet_ids, owners):
+            pet_owner[pet_id] = owner_id
+        return pet_ids, pet_owner
+
+    def create_photos(self, pet_ids, count):
+        # Só o nome do arquivo: as páginas usam a URL do original (variants_ready=False)
+        return self.bulk(PetPhoto, (
+            PetPhoto(pet_id=self.rng.choice(pet_ids), image=f'pet_photos/seed/seed_{i}.jpg')
+            for i in range(count)
+        ))
+
+    def create_matches(self, pet_ids, count):
+        """Pares (pet1 < pet2); os swipes recíprocos são criados em create_swipes"""
+        pairs = set()
+        bench_pet = pet_ids[0]
+        for other in self.rng.sample(pet_ids[1:], min(BENCH_USER_MATCHES, len(pet_ids) - 1)):
+            pairs.add((bench_pet, other))
+        while len(pairs) < count:
+            a, b = sorted(self.rng.sample(pet_ids, 2))
+            pairs.add((a, b))
+        pairs = sorted(pairs)
+        match_ids = self.bulk(Match, (Match(pet1_id=a, pet2_id=b) for a, b in pairs))
+        return list(zip(match_ids, pairs))
+
+    def create_swipes(self, pet_ids, matches, count):
+        """
+        Cada match vira dois likes. Os swipes aleatórios só são like do pet de
+        menor id para o de maior id, então nunca surge um like recíproco sem o
+        Match correspondente. Os passes de cada pet viram um blob de PassSet.
+        """
+        partners = {}
+        for _, (a, b) in matches:
+            partners.setdefault(a, set()).add(b)
+            partners.setdefault(b, set()).add(a)
+
+        def generate():
+            for _, (a, b) in matches:
+                yield Swipe(swiper_id=a, swiped_id=b, liked=True)
+                yield Swipe(swiper_id=b, swiped_id=a, liked=True)
+
+            remaining = count - 2 * len(matches)
+            per_pet, extra = divmod(max(remaining, 0), len(pet_ids))
+            for index, pet_id in enumerate(pet_ids):
+                wanted = per_pet + (1 if index < extra else 0)
+                skip = partners.get(pet_id, set()) | {pet_id}
+                wanted = min(wanted, len(pet_ids) - len(skip))
+                targets = set()
+                while len(targets) < wanted:
+                    target = self.rng.choice(pet_ids)
+                    if target not in skip:
+                        targets.add(target)
+                passed = []
+                for target in targets:
+                    if target > pet_id and self.rng.random() < LIKE_RATE:
+                        yield Swipe(swiper_id=pet_id, swiped_id=target, liked=True)
+                    else:
+                        passed.append(target)
+                if passed:
+                    pass_sets.append(PassSet(pet_id=pet_id, period=period, pet_ids=encode_ids(sorted(passed))))
+
+        period = current_period()
+        pass_sets = []
+        likes = len(self.bulk(Swipe, generate()))
+        self.bulk(PassSet, pass_sets)
+        return likes + sum(len(pass_set.pet_ids) for pass_set in pass_sets) // ID_DTYPE.itemsize
+
+    def create_messages(self, matches, pet_owner, count):
+        # Conversas concentradas: metade dos matches recebe as mensagens
+        active = matches[:BENCH_USER_MATCHES] + self.rng.sample(matches, max(len(matches) // 2, 1))
+
+        def generate():
+            for _ in range(count):
+                match_id, (a, b) = self.rng.choice(active)
+                yield Message(
+                    match_id=match_id,
+                    sender_id=pet_owner[self.rng.choice((a, b))],
+                    content=self.rng.choice(PHRASES),
+                )
+
+        return len(self.bulk(Message, generate()))
+
+    def update_denormalized(self):
+        """Mesmos cálculos das migrações 0011, 0012 e 0014, em UPDATEs em massa"""
+        photos = PetPhoto.objects.filter(pet=models.OuterRef('pk'))
+        photo_count = photos.order_by().values('pet').annotate(total=models.Count('id')).values('total')
+        Pet.objects.update(
+            photo_count=Coalesce(models.Subquery(photo_count), 0),
+            primary_photo=models.Subquery(photos.order_by('id').values('id')[:1]),
+        )
+
+        latest = Message.objects.filter(match=models.OuterRef('pk')).order_by('-id')
+        Match.objects.update(
+            last_message=models.Subquery(latest.values('id')[:1]),
+            last_message_at=models.Subquery(latest.values('timestamp')[:1]),
+        )
+        # pet1 leu tudo; pet2 leu tudo em 2 de cada 3 matches (o resto fica com não lidas)
+        Match.objects.update(pet1_last_read_id=Coalesce('last_message_id', 0))
+        Match.objects.annotate(bucket=Mod('id', 3)).exclude(bucket=0).update(
+            pet2_last_read_id=Coalesce('last_message_id', 0),
+        )
@@ -0,0 +1,53 @@
+# Manutenção periódica do banco SQLite: checkpoint do WAL, ANALYZE e PRAGMA optimize.
+# Uso: python manage.py sqlite_maintenance [--mode TRUNCATE] [--skip-analyze] [--interval 3600]
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.sqlite_tuning import run_maintenance
+
+
+class Command(BaseCommand):
+    help = 'Faz o checkpoint do WAL e atualiza as estatísticas do SQLite (ANALYZE / PRAGMA optimize).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='Alias do banco em settings.DATABASES.',
+        )
+        parser.add_argument(
+            '--mode', default='TRUNCATE', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            help='Modo do wal_checkpoint (TRUNCATE também zera o arquivo -wal).',
+        )
+        parser.add_argument(
+            '--skip-analyze', action='store_true',
+            help='Só faz o checkpoint e o PRAGMA optimize.',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Repete a cada N segundos em vez de rodar uma vez só.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este comando só vale para bancos SQLite.')
+
+        while True:
+            started = time.perf_counter()
+            busy, log_pages, checkpointed = run_maintenance(
+                connection, options['mode'], analyze=not options['skip_analyze'],
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            message = (
+                f'Checkpoint {options["mode"]}: {checkpointed}/{log_pages} páginas '
+                f'({"ocupado" if busy else "ok"}), {elapsed:.0f} ms.'
+            )
+            self.stdout.write(self.style.WARNING(message) if busy else self.style.SUCCESS(message))
+
+            if not options['interval']:
+                break
+            # Não segura a conexão (e o arquivo) aberta entre as rodadas
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+# Copia o banco SQLite principal para os arquivos das réplicas de leitura.
+# Serve para testar o roteamento localmente (e como replicação simples feita
+# por cron); em produção a réplica costuma ser mantida por uma ferramenta
+# de replicação contínua.
+# Uso: python manage.py sync_sqlite_replicas
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.routers import PRIMARY_DB, get_replicas
+
+
+class Command(BaseCommand):
+    help = 'Copia o banco principal para as réplicas configuradas em LATINDER_DB_REPLICAS.'
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('Nenhuma réplica configurada (LATINDER_DB_REPLICAS).')
+        if connections[PRIMARY_DB].vendor != 'sqlite':
+            raise CommandError('Este comando só vale para bancos SQLite.')
+
+        source = sqlite3.connect(settings.DATABASES[PRIMARY_DB]['NAME'])
+        try:
+            for alias in replicas:
+                # Fecha a conexão do Django com a réplica antes de sobrescrever o arquivo
+                connections[alias].close()
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # API de backup online: cópia consistente mesmo com escritas acontecendo
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias} atualizada.'))
+        finally:
+            source.close()
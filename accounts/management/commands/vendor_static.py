@@ -0,0 +1,37 @@
+# Baixa as bibliotecas de terceiros (accounts/assets.py, VENDOR_ASSETS) para
+# static/vendor/, para que o collectstatic as publique com hash no nome em vez
+# de as páginas dependerem do CDN. Rode uma vez e versione os arquivos.
+# Uso: python manage.py vendor_static [--force]
+import os
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.assets import VENDOR_ASSETS, strip_source_map
+
+
+class Command(BaseCommand):
+    help = 'Baixa Bootstrap e Hammer.js para static/vendor/ (versões fixadas em accounts/assets.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Baixa de novo os arquivos que já existem.')
+        parser.add_argument('--timeout', type=int, default=30, help='Segundos de espera por arquivo.')
+
+    def handle(self, *args, **options):
+        static_dir = settings.STATICFILES_DIRS[0]
+        for name, (url, path) in VENDOR_ASSETS.items():
+            destination = os.path.join(static_dir, path)
+            if os.path.exists(destination) and not options['force']:
+                self.stdout.write(f'{name}: já existe ({path})')
+                continue
+            try:
+                with urlopen(url, timeout=options['timeout']) as response:
+                    content = response.read()
+            except OSError as e:
+                raise CommandError(f'Falha ao baixar {url}: {e}')
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, 'wb') as output:
+                # Sem o .map ao lado, o comentário do mapa quebraria o collectstatic
+                output.write(strip_source_map(content))
+            self.stdout.write(self.style.SUCCESS(f'{name}: {len(content)} bytes em {path}'))
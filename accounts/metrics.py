@@ -0,0 +1,239 @@
+# Métricas por request: latência, quantidade e tempo de SQL e consultas
+# repetidas (suspeita de N+1), agrupadas pelo nome da rota (url_name).
+# Coletadas pelo RequestMetricsMiddleware e expostas em formato texto do
+# Prometheus pela MetricsView (só staff). Os números são por processo.
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .fragments import get_fragment_stats
+
+logger = logging.getLogger('accounts.metrics')
+
+# Limites (segundos) dos baldes do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Limites dos baldes do histograma de consultas SQL por request
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for limit, count in zip(self.buckets, self.counts):
+            running += count
+            yield limit, running
+
+
+class _ViewMetrics:
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.duplicate_queries = 0
+        self.n_plus_one_requests = 0
+        self.slow_requests = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, url_name, method, status, duration, sql_count, sql_seconds, duplicates, n_plus_one, slow):
+        with self._lock:
+            metrics = self._views.setdefault((url_name, method, status // 100), _ViewMetrics())
+            metrics.latency.observe(duration)
+            metrics.queries.observe(sql_count)
+            metrics.sql_seconds += sql_seconds
+            metrics.duplicate_queries += duplicates
+            metrics.n_plus_one_requests += int(n_plus_one)
+            metrics.slow_requests += int(slow)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            views = sorted(self._views.items())
+
+            header('latinder_request_duration_seconds', 'histogram', 'Latência dos requests por rota.')
+            for (url_name, method, status), metrics in views:
+                labels = f'view="{url_name}",method="{method}",status="{status}xx"'
+                self._histogram_lines(lines, 'latinder_request_duration_seconds', labels, metrics.latency)
+
+            header('latinder_request_sql_queries', 'histogram', 'Consultas SQL por request.')
+            for (url_name, method, status), metrics in views:
+                labels = f'view="{url_name}",method="{method}",status="{status}xx"'
+                self._histogram_lines(lines, 'latinder_request_sql_queries', labels, metrics.queries)
+
+            counters = (
+                ('latinder_request_sql_seconds_total', 'Tempo total gasto em SQL.', 'sql_seconds'),
+                ('latinder_request_duplicate_queries_total', 'Consultas repetidas (mesmo SQL) além da primeira.', 'duplicate_queries'),
+                ('latinder_request_n_plus_one_total', 'Requests com suspeita de N+1.', 'n_plus_one_requests'),
+                ('latinder_request_slow_total', 'Requests acima de METRICS_SLOW_REQUEST_MS.', 'slow_requests'),
+            )
+            for name, text, attribute in counters:
+                header(name, 'counter', text)
+                for (url_name, method, status), metrics in views:
+                    labels = f'view="{url_name}",method="{method}",status="{status}xx"'
+                    lines.append(f'{name}{{{labels}}} {getattr(metrics, attribute):g}')
+
+        fragments = get_fragment_stats()['fragments']
+        for kind in ('hits', 'misses'):
+            name = f'latinder_fragment_cache_{kind}_total'
+            header(name, 'counter', f'Cache de fragmentos de template ({kind}).')
+            for fragment, counts in fragments.items():
+                lines.append(f'{name}{{fragment="{fragment}"}} {counts[kind]}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(lines, name, labels, histogram):
+        for limit, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{labels},le="{limit:g}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.sum:g}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.total}')
+
+
+registry = MetricsRegistry()
+
+
+# Coletor do request atual. Uma ContextVar (e não um execute_wrapper por
+# conexão aberto no middleware) porque sob ASGI as consultas das views async
+# rodam em outra thread, com outros objetos de conexão; o contexto vai junto.
+_current_collector = ContextVar('metrics_collector', default=None)
+
+
+def _dispatch_to_collector(execute, sql, params, many, context):
+    collector = _current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """Receiver de connection_created (registrado em accounts/signals.py)"""
+    if _dispatch_to_collector not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_to_collector)
+
+
+class _QueryCollector:
+    """execute_wrapper que conta e cronometra as consultas do request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            # Mesmo SQL (parâmetros à parte) repetido no request = provável N+1
+            self.statements[sql] += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Mede cada request e registra as métricas no registry, agrupadas por
+    url_name. Requests lentos ou com suspeita de N+1 geram uma linha de log
+    estruturada (JSON) no logger "accounts.metrics".
+    Deve ser um dos primeiros middlewares, para incluir as consultas de sessão e usuário.
+    Funciona nos dois modos (WSGI e ASGI) sem prender uma thread nas views async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        collector = _QueryCollector()
+        token = _current_collector.set(collector)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        self.record(request, response, time.perf_counter() - started, collector)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return await self.get_response(request)
+
+        collector = _QueryCollector()
+        token = _current_collector.set(collector)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        self.record(request, response, time.perf_counter() - started, collector)
+        return response
+
+    def record(self, request, response, duration, collector):
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name or match.view_name) if match else '<unresolved>'
+
+        threshold = getattr(settings, 'METRICS_DUPLICATE_QUERY_THRESHOLD', 3)
+        repeated = [(sql, count) for sql, count in collector.statements.most_common() if count >= threshold]
+        duplicates = sum(count - 1 for count in collector.statements.values())
+        slow = duration * 1000 >= getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+
+        registry.record(
+            url_name, request.method, response.status_code, duration,
+            collector.count, collector.seconds, duplicates, bool(repeated), slow,
+        )
+
+        if slow or repeated:
+            logger.warning(json.dumps({
+                'event': 'slow_request' if slow else 'n_plus_one',
+                'view': url_name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'sql_count': collector.count,
+                'sql_ms': round(collector.seconds * 1000, 2),
+                'repeated_queries': [{'sql': sql[:200], 'count': count} for sql, count in repeated[:3]],
+            }, ensure_ascii=False))
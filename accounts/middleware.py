@@ -0,0 +1,125 @@
+# Middlewares do app "accounts".
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+from .models import Owner, Pet
+
+# Chave da sessão onde ficam os ids do dono e do pet ativo
+ACTIVE_PET_SESSION_KEY = '_active_pet'
+
+
+def _active_pet_version_key(owner_id):
+    return f'active-pet-version:{owner_id}'
+
+
+def active_pet_version_enabled():
+    """settings.ACTIVE_PET_VERSION_CACHE (ver SHARED_CACHE em settings.py)"""
+    return getattr(settings, 'ACTIVE_PET_VERSION_CACHE', False)
+
+
+def get_active_pet_version(owner_id):
+    """
+    Versão atual dos pets de um dono. Muda sempre que um pet do dono é
+    criado ou apagado, invalidando o que estiver guardado nas sessões.
+    """
+    key = _active_pet_version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        # Sem versão em cache (primeiro acesso ou expirou): cria uma nova,
+        # o que força todas as sessões desse dono a resolver de novo
+        cache.add(key, get_random_string(12), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_active_pet_version(owner_id):
+    """Chamado pelos sinais de Pet (criação e exclusão)"""
+    if active_pet_version_enabled():
+        cache.set(_active_pet_version_key(owner_id), get_random_string(12), None)
+
+
+def _first_pet_id(owner_id):
+    # Mesmo critério do antigo owner.pet_set.first(): o pet de menor id
+    return Pet.objects.filter(owner_id=owner_id).order_by('pk').values_list('id', flat=True).first()
+
+
+def get_active_pet(request):
+    """Objeto Pet ativo do request (uma consulta, feita só quando alguém precisa)"""
+    if not hasattr(request, '_active_pet'):
+        request._active_pet = (
+            Pet.objects.filter(pk=request.active_pet_id).first()
+            if request.active_pet_id else None
+        )
+    return request._active_pet
+
+
+class ActivePetMiddleware:
+    """
+    Resolve uma vez por request o dono (Owner) e o pet ativo do usuário logado,
+    expondo request.owner_id e request.active_pet_id.
+    Os ids ficam guardados na sessão, então os requests seguintes (incluindo o
+    polling do chat) não consultam Owner nem Pet para isso. Com
+    settings.ACTIVE_PET_VERSION_CACHE desligado só o dono vem da sessão e o pet ativo é lido do banco a cada request, numa
+    consulta pelo índice de owner.
+    Precisa vir depois do AuthenticationMiddleware.
+    Sob ASGI o usuário também é carregado aqui (numa thread), então as views
+    async podem usar request.user sem consultar o banco.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        await sync_to_async(self.process_request)(request)
+        return await self.get_response(request)
+
+    def process_request(self, request):
+        request.owner_id = None
+        request.active_pet_id = None
+        # Estáticos e mídia servidos pelo Django (accounts/views/asset_views.py) não
+        # usam o dono e não devem tocar na sessão (que consulta o banco e
+        # acrescenta "Vary: Cookie")
+        if request.path.startswith((settings.STATIC_URL, settings.MEDIA_URL)):
+            return
+        if request.user.is_authenticated:
+            request.owner_id, request.active_pet_id = self.resolve(request)
+
+    def resolve(self, request):
+        cached = request.session.get(ACTIVE_PET_SESSION_KEY)
+        if cached and cached.get('user_id') == request.user.id and cached.get('owner_id'):
+            owner_id = cached['owner_id']
+            if not active_pet_version_enabled():
+                # O dono de um usuário não muda; o pet ativo vem do banco
+                pet_id = _first_pet_id(owner_id)
+                if pet_id != cached.get('pet_id'):
+                    request.session[ACTIVE_PET_SESSION_KEY] = {**cached, 'pet_id': pet_id}
+                return owner_id, pet_id
+            if cached.get('version') == get_active_pet_version(owner_id):
+                return owner_id, cached['pet_id']
+
+        owner_id = Owner.objects.filter(user_id=request.user.id).values_list('id', flat=True).first()
+        if owner_id is None:
+            # Usuário sem Owner (ex.: superusuário criado pelo createsuperuser)
+            request.session.pop(ACTIVE_PET_SESSION_KEY, None)
+            return None, None
+
+        pet_id = _first_pet_id(owner_id)
+        request.session[ACTIVE_PET_SESSION_KEY] = {
+            'user_id': request.user.id,
+            'owner_id': owner_id,
+            'pet_id': pet_id,
+            'version': get_active_pet_version(owner_id) if active_pet_version_enabled() else None,
+        }
+        return owner_id, pet_id
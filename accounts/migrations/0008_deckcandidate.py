@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_deck_queue(apps, schema_editor):
+    # Preenche a fila com todos os pares (pet, candidato) que ainda não têm Swipe
+    Pet = apps.get_model('accounts', 'Pet')
+    Swipe = apps.get_model('accounts', 'Swipe')
+    DeckCandidate = apps.get_model('accounts', 'DeckCandidate')
+    quote = schema_editor.quote_name
+    pet_table = quote(Pet._meta.db_table)
+    schema_editor.execute(
+        f'INSERT INTO {quote(DeckCandidate._meta.db_table)} (pet_id, candidate_id) '
+        f'SELECT p.id, c.id FROM {pet_table} p JOIN {pet_table} c ON c.id <> p.id '
+        f'WHERE NOT EXISTS (SELECT 1 FROM {quote(Swipe._meta.db_table)} s '
+        f'WHERE s.swiper_id = p.id AND s.swiped_id = c.id)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeckCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.pet')),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deck_candidates', to='accounts.pet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='deckcandidate',
+            constraint=models.UniqueConstraint(fields=('pet', 'candidate'), name='unique_deck_candidate'),
+        ),
+        migrations.RunPython(populate_deck_queue, migrations.RunPython.noop),
+    ]
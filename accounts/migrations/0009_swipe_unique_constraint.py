@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def remove_duplicate_swipes(apps, schema_editor):
+    # Antes da restrição única: mantém só o swipe mais recente de cada par
+    Swipe = apps.get_model('accounts', 'Swipe')
+    latest_ids = (
+        Swipe.objects.values('swiper_id', 'swiped_id')
+        .annotate(latest_id=models.Max('id'))
+        .values('latest_id')
+    )
+    Swipe.objects.exclude(id__in=latest_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_deckcandidate'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_swipes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='swipe',
+            name='swiper',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='swipes_made', to='accounts.pet'),
+        ),
+        migrations.AddConstraint(
+            model_name='swipe',
+            constraint=models.UniqueConstraint(fields=('swiper', 'swiped'), name='unique_swipe'),
+        ),
+    ]
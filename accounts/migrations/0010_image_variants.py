@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_swipe_unique_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='owner',
+            name='picture_variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:03
+
+from django.db import migrations, models
+import django.db.models.functions
+import django.db.models.deletion
+
+
+def populate_photo_fields(apps, schema_editor):
+    # Contagem de fotos e foto principal (a mais antiga) dos pets existentes
+    Pet = apps.get_model('accounts', 'Pet')
+    PetPhoto = apps.get_model('accounts', 'PetPhoto')
+    photos = PetPhoto.objects.filter(pet=models.OuterRef('pk'))
+    photo_count = photos.order_by().values('pet').annotate(total=models.Count('id')).values('total')
+    Pet.objects.update(
+        photo_count=django.db.models.functions.Coalesce(models.Subquery(photo_count), 0),
+        primary_photo=models.Subquery(photos.order_by('id').values('id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='primary_photo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.petphoto'),
+        ),
+        migrations.RunPython(populate_photo_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_last_message(apps, schema_editor):
+    # Última mensagem de cada match que já tem conversa
+    Match = apps.get_model('accounts', 'Match')
+    Message = apps.get_model('accounts', 'Message')
+    latest = Message.objects.filter(match=models.OuterRef('pk')).order_by('-id')
+    Match.objects.update(
+        last_message=models.Subquery(latest.values('id')[:1]),
+        last_message_at=models.Subquery(latest.values('timestamp')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_pet_primary_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='last_message',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.message'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_match_last_message'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='match',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='accounts.match'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['match', 'id'], name='message_match_id_idx'),
+        ),
+    ]
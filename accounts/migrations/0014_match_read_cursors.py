@@ -0,0 +1,55 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+def copy_is_read_to_cursors(apps, schema_editor):
+    # O cursor de cada lado vira o id da última mensagem do outro lado marcada como lida
+    Match = apps.get_model('accounts', 'Match')
+    Message = apps.get_model('accounts', 'Message')
+    for match in Match.objects.select_related('pet1', 'pet2').iterator():
+        read_messages = Message.objects.filter(match=match, is_read=True)
+        pet1_last_read = read_messages.exclude(sender_id=match.pet1.owner_id).aggregate(last=models.Max('id'))['last']
+        pet2_last_read = read_messages.exclude(sender_id=match.pet2.owner_id).aggregate(last=models.Max('id'))['last']
+        if pet1_last_read or pet2_last_read:
+            Match.objects.filter(pk=match.pk).update(
+                pet1_last_read_id=pet1_last_read or 0,
+                pet2_last_read_id=pet2_last_read or 0,
+            )
+
+
+def copy_cursors_to_is_read(apps, schema_editor):
+    Match = apps.get_model('accounts', 'Match')
+    Message = apps.get_model('accounts', 'Message')
+    for match in Match.objects.select_related('pet1', 'pet2').iterator():
+        Message.objects.filter(match=match, id__lte=match.pet1_last_read_id).exclude(
+            sender_id=match.pet1.owner_id
+        ).update(is_read=True)
+        Message.objects.filter(match=match, id__lte=match.pet2_last_read_id).exclude(
+            sender_id=match.pet2.owner_id
+        ).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_message_match_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='pet1_last_read_id',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='pet2_last_read_id',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(copy_is_read_to_cursors, copy_cursors_to_is_read),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-18 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_match_read_cursors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveIntegerField()),
+                ('pet_ids', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pass_sets', to='accounts.pet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='passset',
+            constraint=models.UniqueConstraint(fields=('pet', 'period'), name='unique_pass_set'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Índice FTS5 das mensagens (ver accounts/search.py). Só no SQLite; em outros
+# bancos a migração não faz nada e a busca responde 503.
+
+from django.db import migrations
+
+# Tokens dos dois donos do match da mensagem
+SCOPE_SQL = (
+    "SELECT 'o' || p1.owner_id || ' o' || p2.owner_id FROM accounts_match m "
+    "JOIN accounts_pet p1 ON p1.id = m.pet1_id JOIN accounts_pet p2 ON p2.id = m.pet2_id "
+    "WHERE m.id = {match_id}"
+)
+
+CREATE_SQL = [
+    # unicode61 sem acentos: "voce" encontra "você"
+    "CREATE VIRTUAL TABLE accounts_message_search USING fts5("
+    "content, scope, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER accounts_message_search_insert AFTER INSERT ON accounts_message BEGIN "
+    "INSERT INTO accounts_message_search (rowid, content, scope) "
+    f"VALUES (new.id, new.content, ({SCOPE_SQL.format(match_id='new.match_id')})); END",
+    "CREATE TRIGGER accounts_message_search_update AFTER UPDATE OF content ON accounts_message BEGIN "
+    "UPDATE accounts_message_search SET content = new.content WHERE rowid = new.id; END",
+    "CREATE TRIGGER accounts_message_search_delete AFTER DELETE ON accounts_message BEGIN "
+    "DELETE FROM accounts_message_search WHERE rowid = old.id; END",
+    # Mensagens que já existem
+    "INSERT INTO accounts_message_search (rowid, content, scope) "
+    f"SELECT msg.id, msg.content, ({SCOPE_SQL.format(match_id='msg.match_id')}) FROM accounts_message msg",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS accounts_message_search_insert',
+    'DROP TRIGGER IF EXISTS accounts_message_search_update',
+    'DROP TRIGGER IF EXISTS accounts_message_search_delete',
+    'DROP TABLE IF EXISTS accounts_message_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_pass_sets'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
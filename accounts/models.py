@@ -11,6 +11,8 @@ from datetime import date
 class Owner(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     profile_picture = models.ImageField(upload_to='owner_pictures/', blank=True, null=True)
+    # True quando as versões redimensionadas da foto já foram geradas (accounts/thumbnails.py)
+    picture_variants_ready = models.BooleanField(default=False, editable=False)
     bio = models.TextField(blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
     state = models.CharField(max_length=100, blank=True, null=True)
@@ -40,6 +42,13 @@ class Pet(models.Model):
     breed = models.CharField(max_length=100)
     bio = models.TextField()
     birth_date = models.DateField()
+    # Campos desnormalizados, mantidos pelos sinais de PetPhoto (accounts/signals.py),
+    # para os cards e listas mostrarem a foto sem uma consulta extra por pet
+    primary_photo = models.ForeignKey(
+        'PetPhoto', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', editable=False
+    )
+    photo_count = models.PositiveIntegerField(default=0, editable=False)
 
     # 2. ADICIONEI ESTA PROPRIEDADE
     @property
@@ -58,6 +67,8 @@ class Pet(models.Model):
 class PetPhoto(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='pet_photos/')
+    # True quando as versões redimensionadas da foto já foram geradas (accounts/thumbnails.py)
+    variants_ready = models.BooleanField(default=False, editable=False)
     # 3. ADICIONEI ESTE MÉTODO
     def __str__(self):
         return f"Photo for {self.pet.name}"
@@ -67,28 +78,81 @@ class PetPhoto(models.Model):
 # Modelo Swipe registra as interações de "like" ou "pass" entre pets
 class Swipe(models.Model):
     # O pet que está fazendo a avaliação
-    swiper = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='swipes_made')
+    # (sem índice próprio: o índice único swiper + swiped já começa por ele)
+    swiper = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='swipes_made', db_index=False)
     # O pet que está sendo avaliado
     swiped = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='swipes_received')
-    # True se foi um 'like', False se foi um 'pass'
+    # True se foi um 'like'. Passes novos vão para PassSet; linhas com False
+    # são de antes dele, até o "python manage.py compact_passes" movê-las
     liked = models.BooleanField()
     # Data e hora em que a ação ocorreu, preenchido automaticamente
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Um pet só avalia outro uma vez (evita linhas duplicadas por duplo clique).
+            # O índice composto desta restrição atende as duas consultas quentes:
+            # a checagem de like recíproco (swiper = X AND swiped = Y) no
+            # ProcessSwipeView e o "swiper = X" do deck (índice de cobertura).
+            models.UniqueConstraint(fields=['swiper', 'swiped'], name='unique_swipe'),
+        ]
+
     # Representação em string do Swipe
     def __str__(self):
         action = "Liked" if self.liked else "Passed"
         return f"{self.swiper.name} {action} {self.swiped.name}"
 
+# Passes (swipes "não") compactados: em vez de uma linha de Swipe por par,
+# cada pet tem um blob com os ids que passou em cada período (ver
+# accounts/passes.py). Likes continuam em Swipe, que a detecção de match usa.
+# A expiração (settings.PASS_EXPIRY_DAYS) apaga períodos inteiros.
+class PassSet(models.Model):
+    # O pet que passou (sem índice próprio: o índice único pet + period já começa por ele)
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='pass_sets', db_index=False)
+    # Primeiro dia do período, em dias desde 1970-01-01
+    period = models.PositiveIntegerField()
+    # Ids dos pets passados, int64 little-endian
+    pet_ids = models.BinaryField(default=bytes)
+    # Último pass gravado (atividade recente no ranking do deck)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pet', 'period'], name='unique_pass_set'),
+        ]
+
+    def __str__(self):
+        return f"Passes de {self.pet_id} no período {self.period}"
+
 # Modelo Match registra quando dois pets deram like mútuo
 class Match(models.Model):
     pet1 = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='matches_as_pet1')
     pet2 = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='matches_as_pet2')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Última mensagem do chat, mantida pelo SendMessageView (prévia e ordenação da lista de matches)
+    last_message = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', editable=False
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Cursores de leitura: id da última mensagem que cada lado já leu.
+    # Não lidas = mensagens do outro lado com id maior que o cursor.
+    pet1_last_read_id = models.PositiveBigIntegerField(default=0, editable=False)
+    pet2_last_read_id = models.PositiveBigIntegerField(default=0, editable=False)
     
     class Meta:
         # Garante que não haja matches duplicados
         unique_together = ['pet1', 'pet2']
+
+    @staticmethod
+    def last_read_field(pet_id, pet1_id):
+        """Nome do campo do cursor de leitura do participante pet_id"""
+        return 'pet1_last_read_id' if pet_id == pet1_id else 'pet2_last_read_id'
+
+    @property
+    def last_activity_at(self):
+        """Data da última mensagem, ou do próprio match se ainda não há mensagens"""
+        return self.last_message_at or self.created_at
     
     def __str__(self):
         return f"Match entre {self.pet1.name} e {self.pet2.name}"
@@ -96,19 +160,42 @@ class Match(models.Model):
 # Modelo Message registra as mensagens trocadas entre donos de pets que deram match
 class Message(models.Model):
     # O match ao qual esta mensagem pertence
-    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='messages')
+    # (sem índice próprio: o índice message_match_id_idx já começa por ele)
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='messages', db_index=False)
     # O dono que enviou a mensagem
     sender = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='messages_sent')
     # Conteúdo da mensagem
     content = models.TextField()
     # Data e hora do envio (preenchido automaticamente)
     timestamp = models.DateTimeField(auto_now_add=True)
-    # Indica se a mensagem foi lida pelo destinatário
-    is_read = models.BooleanField(default=False)
+    # (o estado de leitura fica nos cursores pet1_last_read_id/pet2_last_read_id do Match)
     
     class Meta:
         # Ordena mensagens por ordem cronológica (mais antigas primeiro)
         ordering = ['timestamp']
+        indexes = [
+            # Histórico paginado do chat: match = X AND id < cursor ORDER BY id DESC
+            models.Index(fields=['match', 'id'], name='message_match_id_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.sender.user.username}: {self.content[:50]}"
\ No newline at end of file
+        return f"{self.sender.user.username}: {self.content[:50]}"
+
+# Fila materializada de candidatos ainda não vistos por cada pet.
+# Cada linha diz "candidate ainda não foi avaliado por pet". O deck é lido
+# direto desta tabela (leitura por faixa no índice único), em vez de fazer
+# um NOT IN sobre todo o histórico de Swipe a cada carregamento.
+class DeckCandidate(models.Model):
+    # O pet dono da fila
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='deck_candidates')
+    # O pet que ainda vai aparecer no deck
+    candidate = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            # Também serve como índice (pet, candidate) para a paginação por cursor
+            models.UniqueConstraint(fields=['pet', 'candidate'], name='unique_deck_candidate'),
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} na fila de {self.pet_id}"
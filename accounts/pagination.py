@@ -0,0 +1,37 @@
+# Cursores opacos usados na paginação por keyset (deck e histórico do chat).
+# O cliente só devolve o cursor que recebeu; o conteúdo (um dicionário
+# pequeno em JSON) não faz parte da API.
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Cursor recebido do cliente não pôde ser decodificado"""
+
+
+def encode_cursor(payload):
+    """Transforma um dicionário em um cursor opaco (base64 url-safe)"""
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Operação inversa de encode_cursor. Cursor vazio vira um dicionário vazio."""
+    if not cursor:
+        return {}
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Cursor inválido')
+    if not isinstance(payload, dict):
+        raise InvalidCursor('Cursor inválido')
+    return payload
+
+
+def decode_int_cursor(cursor, key):
+    """Lê um campo inteiro do cursor (0 quando o cursor está vazio)"""
+    try:
+        return int(decode_cursor(cursor).get(key, 0))
+    except (TypeError, ValueError):
+        raise InvalidCursor('Cursor inválido')
@@ -0,0 +1,149 @@
+# Passes compactados (modelo PassSet).
+# Um pass não vira mais uma linha de Swipe: o id do pet passado é anexado a um
+# blob do pet que passou, um blob por período de settings.PASS_PERIOD_DAYS dias.
+# O blob é um array de int64 little-endian; os pets do deck nunca passam de
+# alguns milhões, e 8 bytes por pass ainda são bem menos que uma linha de
+# Swipe com o índice único (~40 bytes na tabela e no índice).
+# O append é um único INSERT ... ON CONFLICT DO UPDATE com concatenação, sem
+# ler o blob. Os ids podem ficar fora de ordem ou repetidos dentro do blob até
+# o "python manage.py compact_passes" reescrevê-lo ordenado e sem repetição.
+# Expiração: com settings.PASS_EXPIRY_DAYS, um período inteiro expira quando o
+# pass mais novo dele passa dessa idade; o compact_passes apaga o período e
+# devolve os pets à fila do deck.
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import PassSet, Pet
+
+ID_DTYPE = np.dtype('<i8')
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def encode_ids(ids):
+    return np.asarray(list(ids), dtype=ID_DTYPE).tobytes()
+
+
+def decode_ids(blob):
+    return np.frombuffer(bytes(blob), dtype=ID_DTYPE)
+
+
+def day_of(moment):
+    """Dias desde 1970-01-01 (UTC) de um datetime"""
+    return (moment.date() - EPOCH).days
+
+
+def _today():
+    return day_of(timezone.now())
+
+
+def _period_days():
+    return max(int(getattr(settings, 'PASS_PERIOD_DAYS', 7)), 1)
+
+
+def period_of(day):
+    """Primeiro dia do período que contém o dia (em dias desde 1970-01-01)"""
+    length = _period_days()
+    return day // length * length
+
+
+def current_period():
+    return period_of(_today())
+
+
+def expired_before():
+    """
+    Períodos menores que este valor já expiraram (todo pass deles é mais velho
+    que PASS_EXPIRY_DAYS). None se os passes não expiram.
+    """
+    expiry_days = getattr(settings, 'PASS_EXPIRY_DAYS', None)
+    if expiry_days is None:
+        return None
+    return _today() - int(expiry_days) - _period_days() + 1
+
+
+def live_pass_sets():
+    """PassSets ainda não expirados (os expirados só somem no compact_passes)"""
+    queryset = PassSet.objects.all()
+    cutoff = expired_before()
+    if cutoff is not None:
+        queryset = queryset.filter(period__gte=cutoff)
+    return queryset
+
+
+def _upsert_sql(guard=''):
+    table = connection.ops.quote_name(PassSet._meta.db_table)
+    concat = 't.pet_ids || excluded.pet_ids'
+    if connection.vendor == 'sqlite':
+        # No SQLite, || entre blobs devolve TEXT
+        concat = f'CAST({concat} AS BLOB)'
+    # O WHERE do SELECT também evita a ambiguidade do ON CONFLICT no SQLite
+    return (
+        f'INSERT INTO {table} AS t (pet_id, period, pet_ids, updated_at) '
+        f'SELECT %s, %s, %s, %s WHERE {guard or "1 = 1"} '
+        f'ON CONFLICT (pet_id, period) DO UPDATE SET pet_ids = {concat}, updated_at = CASE '
+        f'WHEN excluded.updated_at > t.updated_at THEN excluded.updated_at ELSE t.updated_at END'
+    )
+
+
+def _upsert_params(pet_id, passed_ids, period=None, at=None):
+    return [
+        pet_id,
+        current_period() if period is None else period,
+        encode_ids(passed_ids),
+        connection.ops.adapt_datetimefield_value(at or timezone.now()),
+    ]
+
+
+def add_passes(pet_id, passed_ids, period=None, at=None):
+    """
+    Anexa os ids (já validados) ao blob do pet, num comando SQL. Por padrão no
+    período atual e com o instante atual; o compact_passes informa os dois ao
+    mover passes antigos.
+    """
+    passed_ids = [int(passed_id) for passed_id in passed_ids]
+    if not passed_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(), _upsert_params(pet_id, passed_ids, period, at))
+
+
+def add_pass(pet_id, passed_id):
+    """
+    Anexa um id ao blob do período atual, se o pet passado existir (o blob não
+    tem chave estrangeira). Um comando SQL; retorna False se o pet não existe.
+    """
+    pet_table = connection.ops.quote_name(Pet._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _upsert_sql(f'EXISTS (SELECT 1 FROM {pet_table} WHERE id = %s)'),
+            _upsert_params(pet_id, [passed_id]) + [passed_id],
+        )
+        return cursor.rowcount > 0
+
+
+def passed_ids(pet_id):
+    """Ids (ordenados, sem repetição) que o pet passou e ainda não expiraram"""
+    blobs = live_pass_sets().filter(pet_id=pet_id).values_list('pet_ids', flat=True)
+    return _merge(blobs)
+
+
+def passes_by_pet(pet_ids=None):
+    """{pet_id: array de ids passados} dos pets informados (ou de todos)"""
+    queryset = live_pass_sets()
+    if pet_ids is not None:
+        queryset = queryset.filter(pet_id__in=list(pet_ids))
+    blobs = {}
+    for pet_id, blob in queryset.values_list('pet_id', 'pet_ids').iterator():
+        blobs.setdefault(pet_id, []).append(blob)
+    return {pet_id: _merge(pet_blobs) for pet_id, pet_blobs in blobs.items()}
+
+
+def _merge(blobs):
+    arrays = [decode_ids(blob) for blob in blobs]
+    if not arrays:
+        return np.empty(0, dtype=ID_DTYPE)
+    return np.unique(np.concatenate(arrays))
@@ -0,0 +1,98 @@
+# Camada de publish/subscribe usada para empurrar mensagens novas do chat
+# para quem está com a conversa aberta (ver ChatStreamView).
+# O backend é configurável em settings.CHAT_PUBSUB_BACKEND; o padrão
+# (InProcessBackend) só entrega mensagens dentro do mesmo processo. Com ele
+# o ChatStreamView também consulta o banco a cada keepalive, para entregar
+# as mensagens salvas por outros workers; um backend compartilhado
+# (ex.: Redis) declara shared = True e dispensa essa consulta.
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BasePubSubBackend:
+    """Interface que todo backend de pub/sub precisa implementar"""
+    # True se o publish de um processo chega aos inscritos de todos os processos
+    shared = False
+
+    def publish(self, channel, payload):
+        """Entrega payload (um dicionário) a todos os inscritos no canal. Pode ser chamado de código síncrono."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """
+        Context manager assíncrono que devolve um asyncio.Queue
+        recebendo os payloads publicados no canal enquanto estiver aberto.
+        """
+        raise NotImplementedError
+
+
+class InProcessBackend(BasePubSubBackend):
+    """Backend em memória: cada inscrito tem uma fila no seu próprio event loop"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # canal -> conjunto de (event loop, fila)
+        self._subscribers = {}
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            # publish normalmente vem de uma view síncrona (outra thread),
+            # então a fila só pode ser alimentada pelo loop dono dela
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, payload)
+            except RuntimeError:
+                # Loop já foi fechado; a inscrição será removida pelo próprio dono
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                channel_subscribers = self._subscribers.get(channel)
+                if channel_subscribers is not None:
+                    channel_subscribers.discard(entry)
+                    if not channel_subscribers:
+                        del self._subscribers[channel]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Instância única do backend configurado em settings.CHAT_PUBSUB_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_path = getattr(settings, 'CHAT_PUBSUB_BACKEND', 'accounts.pubsub.InProcessBackend')
+                _backend = import_string(backend_path)()
+    return _backend
+
+
+def chat_channel(match_id):
+    """Nome do canal de um match"""
+    return f'chat.{match_id}'
+
+
+def is_shared():
+    return get_backend().shared
+
+
+def publish(channel, payload):
+    get_backend().publish(channel, payload)
+
+
+def subscribe(channel):
+    return get_backend().subscribe(channel)
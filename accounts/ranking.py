@@ -0,0 +1,317 @@
+# Motor de ranking dos candidatos do deck.
+# As features de todos os pets ficam em arrays NumPy compactos (uma posição
+# por pet, ordenados por id) mantidos em memória; a posição de cada candidato
+# sai de um np.searchsorted e a nota de milhares de candidatos é calculada de
+# uma vez, sem laço Python por pet.
+# Só os primeiros candidatos (uma janela de DECK_RANKING_SNAPSHOT_SIZE) são
+# ordenados; essa ordem fica guardada em cache (snapshot, ver
+# save_ranking_snapshot): as páginas seguintes só leem uma fatia dela, sem
+# recalcular nada, e as notas não mudam entre as páginas mesmo que a
+# atividade dos pets mude no meio tempo. Quando a janela acaba, a próxima é
+# calculada a partir da nota e do id do último card dela.
+# O cache é atualizado de forma incremental pelos sinais (accounts/signals.py)
+# e recarregado por completo a cada DECK_RANKING_REFRESH_SECONDS, para pegar
+# mudanças feitas por outros processos.
+import threading
+import time
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Max
+from django.utils.crypto import get_random_string
+
+from .models import DeckCandidate, PassSet, Pet, Swipe
+from .routers import PRIMARY_DB
+
+# Pesos padrão de cada feature (podem ser trocados em settings.DECK_RANKING_WEIGHTS)
+DEFAULT_WEIGHTS = {
+    'age': 1.0,         # idade parecida com a do meu pet
+    'state': 1.0,       # donos no mesmo estado
+    'city': 1.5,        # donos na mesma cidade (somado ao estado)
+    'breed': 0.5,       # mesma raça
+    'recent': 1.0,      # swipou recentemente (pets ativos respondem)
+    'liked_us': 2.0,    # já deu like no meu pet (match garantido no like)
+}
+
+# Escala (anos) da similaridade de idade e meia-vida (dias) da atividade recente
+AGE_SCALE_YEARS = 3.0
+ACTIVITY_HALF_LIFE_DAYS = 7.0
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _days(value):
+    return (value - _EPOCH).days if value else 0
+
+
+class _Vocabulary:
+    """Transforma textos (estado, cidade, raça) em códigos inteiros; 0 = vazio"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def code(self, value):
+        value = (value or '').strip().lower()
+        if not value:
+            return 0
+        return self.codes.setdefault(value, len(self.codes) + 1)
+
+
+class FeatureStore:
+    """Features de todos os pets em arrays paralelos (uma posição por pet)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._dirty = set()
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.birth_days = np.empty(0, dtype=np.int32)
+        self.state = np.empty(0, dtype=np.int32)
+        self.city = np.empty(0, dtype=np.int32)
+        self.breed = np.empty(0, dtype=np.int32)
+        self.last_active = np.empty(0, dtype=np.float64)
+        self.alive = np.empty(0, dtype=bool)
+        self.states = _Vocabulary()
+        self.cities = _Vocabulary()
+        self.breeds = _Vocabulary()
+
+    # --- Carga e atualização incremental ---
+
+    # O cache vive mais que o request e a lista de pets alterados é zerada a
+    # cada carga, então as features vêm sempre do primário, nunca de uma réplica
+    def _fetch_rows(self, pet_ids=None):
+        queryset = Pet.objects.using(PRIMARY_DB)
+        if pet_ids is not None:
+            queryset = queryset.filter(id__in=pet_ids)
+        # Em ordem de id: as posições são achadas por busca binária em self.ids
+        return list(queryset.order_by('id').values_list('id', 'birth_date', 'breed', 'owner__state', 'owner__city'))
+
+    def _fetch_activity(self, pet_ids=None):
+        # Último like (Swipe) ou pass (PassSet) de cada pet
+        swipes = Swipe.objects.using(PRIMARY_DB)
+        passes = PassSet.objects.using(PRIMARY_DB)
+        if pet_ids is not None:
+            swipes = swipes.filter(swiper_id__in=pet_ids)
+            passes = passes.filter(pet_id__in=pet_ids)
+        activity = {
+            row['swiper_id']: row['last'].timestamp()
+            for row in swipes.values('swiper_id').annotate(last=Max('timestamp'))
+        }
+        for row in passes.values('pet_id').annotate(last=Max('updated_at')):
+            activity[row['pet_id']] = max(activity.get(row['pet_id'], 0.0), row['last'].timestamp())
+        return activity
+
+    def _encode(self, rows, activity):
+        city_of = lambda state, city: f'{state or ""}/{city or ""}' if city else ''
+        return (
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([_days(row[1]) for row in rows], dtype=np.int32),
+            np.array([self.states.code(row[3]) for row in rows], dtype=np.int32),
+            np.array([self.cities.code(city_of(row[3], row[4])) for row in rows], dtype=np.int32),
+            np.array([self.breeds.code(row[2]) for row in rows], dtype=np.int32),
+            np.array([activity.get(row[0], 0.0) for row in rows], dtype=np.float64),
+        )
+
+    def load(self):
+        """Recarrega tudo do banco (primeiro uso e recargas periódicas)"""
+        with self._lock:
+            self._reset()
+            rows = self._fetch_rows()
+            (self.ids, self.birth_days, self.state, self.city,
+             self.breed, self.last_active) = self._encode(rows, self._fetch_activity())
+            self.alive = np.ones(len(rows), dtype=bool)
+            self._dirty.clear()
+            self._loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Garante o cache carregado e aplica as mudanças pendentes (só dos pets alterados)"""
+        with self._lock:
+            max_age = getattr(settings, 'DECK_RANKING_REFRESH_SECONDS', 300)
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > max_age:
+                self.load()
+                return
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            rows = self._fetch_rows(dirty)
+            found = {row[0] for row in rows}
+            # Pets apagados
+            gone = self._positions(sorted(dirty - found))
+            self.alive[gone[gone >= 0]] = False
+
+            positions = self._positions([row[0] for row in rows])
+            existing = [(row, i) for row, i in zip(rows, positions.tolist()) if i >= 0]
+            new = [row for row, i in zip(rows, positions.tolist()) if i < 0]
+            activity = self._fetch_activity([row[0] for row in new]) if new else {}
+
+            for row, i in existing:
+                _, birth_days, state, city, breed, _ = self._encode([row], {})
+                self.birth_days[i], self.state[i] = birth_days[0], state[0]
+                self.city[i], self.breed[i] = city[0], breed[0]
+
+            if new:
+                arrays = self._encode(new, activity)
+                self.ids = np.concatenate([self.ids, arrays[0]])
+                self.birth_days = np.concatenate([self.birth_days, arrays[1]])
+                self.state = np.concatenate([self.state, arrays[2]])
+                self.city = np.concatenate([self.city, arrays[3]])
+                self.breed = np.concatenate([self.breed, arrays[4]])
+                self.last_active = np.concatenate([self.last_active, arrays[5]])
+                self.alive = np.concatenate([self.alive, np.ones(len(new), dtype=bool)])
+                if np.any(np.diff(self.ids) < 0):
+                    # Pets novos quase sempre têm os maiores ids; se não, reordena
+                    self._sort()
+
+    def _sort(self):
+        order = np.argsort(self.ids, kind='stable')
+        for name in ('ids', 'birth_days', 'state', 'city', 'breed', 'last_active', 'alive'):
+            setattr(self, name, getattr(self, name)[order])
+
+    def _positions(self, pet_ids):
+        """Posições dos pets nos arrays (busca binária em self.ids); -1 se o cache não conhece o pet"""
+        pet_ids = np.asarray(pet_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(pet_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, pet_ids), len(self.ids) - 1)
+        return np.where(self.ids[positions] == pet_ids, positions, -1)
+
+    def mark_dirty(self, pet_ids):
+        """Pets criados, alterados ou apagados; recarregados no próximo refresh()"""
+        with self._lock:
+            self._dirty.update(pet_ids)
+
+    def touch(self, pet_id, when=None):
+        """Registra atividade (swipe) de um pet; chamado depois do commit do swipe"""
+        with self._lock:
+            i = self._positions([pet_id])[0]
+            if i >= 0:
+                self.last_active[i] = when if when is not None else time.time()
+
+    # --- Ranking ---
+
+    def score(self, pet_id, candidate_ids, liked_us_ids, now):
+        """
+        Retorna (ids, notas) dos candidatos (array de ids) conhecidos pelo cache.
+        Tudo é feito com operações vetorizadas sobre os arrays.
+        """
+        with self._lock:
+            me = self._positions([pet_id])[0]
+            if me < 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+            positions = self._positions(candidate_ids)
+            positions = positions[positions >= 0]
+            positions = positions[self.alive[positions]]
+
+            weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'DECK_RANKING_WEIGHTS', {})}
+            ids = self.ids[positions]
+
+            age_gap_years = np.abs(self.birth_days[positions] - self.birth_days[me]) / 365.25
+            scores = weights['age'] * np.exp(-age_gap_years / AGE_SCALE_YEARS)
+
+            if self.state[me]:
+                scores += weights['state'] * (self.state[positions] == self.state[me])
+            if self.city[me]:
+                scores += weights['city'] * (self.city[positions] == self.city[me])
+            if self.breed[me]:
+                scores += weights['breed'] * (self.breed[positions] == self.breed[me])
+
+            last_active = self.last_active[positions]
+            idle_days = np.maximum(now - last_active, 0) / 86400.0
+            scores += weights['recent'] * np.where(
+                last_active > 0, np.exp2(-idle_days / ACTIVITY_HALF_LIFE_DAYS), 0.0
+            )
+
+            if liked_us_ids:
+                liked_us = np.fromiter(liked_us_ids, dtype=np.int64, count=len(liked_us_ids))
+                scores += weights['liked_us'] * np.isin(ids, liked_us)
+
+            return ids, scores
+
+
+feature_store = FeatureStore()
+
+
+def _candidate_ids(pet_id):
+    """Ids da fila do deck do pet, direto do cursor do banco para um array"""
+    alias = router.db_for_read(DeckCandidate)
+    connection = connections[alias]
+    table = connection.ops.quote_name(DeckCandidate._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT candidate_id FROM {table} WHERE pet_id = %s', [pet_id])
+        return np.array(cursor.fetchall(), dtype=np.int64).reshape(-1)
+
+
+def _top_window(ids, scores, size):
+    """
+    Posições dos `size` primeiros candidatos em (nota desc, id asc), sem
+    ordenar o resto: np.argpartition separa as maiores notas e, na nota de
+    corte, os empatados entram pelo menor id.
+    """
+    top = np.argpartition(-scores, size - 1)[:size]
+    cutoff = scores[top].min()
+    above = top[scores[top] > cutoff]
+    tied = np.flatnonzero(scores == cutoff)
+    missing = size - len(above)
+    if len(tied) > missing:
+        tied = tied[np.argpartition(ids[tied], missing - 1)[:missing]]
+    return np.concatenate((above, tied))
+
+
+def rank_candidates(pet_id, now=None, after=None, size=None):
+    """
+    Retorna (ids, notas) dos primeiros candidatos da fila do pet, em ordem de
+    nota decrescente (empate: menor id primeiro). Só a janela de `size`
+    candidatos (settings.DECK_RANKING_SNAPSHOT_SIZE) é ordenada; com `after`
+    = (nota, id) a janela começa depois desse card.
+    """
+    feature_store.refresh()
+    now = now if now is not None else time.time()
+    size = size or getattr(settings, 'DECK_RANKING_SNAPSHOT_SIZE', 500)
+
+    liked_us_ids = set(
+        Swipe.objects.filter(swiped_id=pet_id, liked=True).values_list('swiper_id', flat=True)
+    )
+    ids, scores = feature_store.score(pet_id, _candidate_ids(pet_id), liked_us_ids, now)
+    if after is not None:
+        after_score, after_id = after
+        keep = (scores < after_score) | ((scores == after_score) & (ids > after_id))
+        ids, scores = ids[keep], scores[keep]
+    if len(ids) > size:
+        window = _top_window(ids, scores, size)
+        ids, scores = ids[window], scores[window]
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
+
+
+# --- Snapshot da ordem entre as páginas do deck ---
+
+def _snapshot_key(pet_id, token):
+    return f'deck-ranking:{pet_id}:{token}'
+
+
+def save_ranking_snapshot(pet_id, ids, scores):
+    """Guarda a ordem calculada e devolve o token que vai no cursor do deck"""
+    token = get_random_string(12)
+    cache.set(
+        _snapshot_key(pet_id, token),
+        (ids.astype(np.int64).tobytes(), scores.astype(np.float64).tobytes()),
+        getattr(settings, 'DECK_RANKING_SNAPSHOT_SECONDS', 900),
+    )
+    return token
+
+
+def load_ranking_snapshot(pet_id, token):
+    """(ids, notas) guardados por save_ranking_snapshot, ou None se expirou ou não existe"""
+    stored = cache.get(_snapshot_key(pet_id, token))
+    if stored is None:
+        return None
+    ids, scores = stored
+    return np.frombuffer(ids, dtype=np.int64), np.frombuffer(scores, dtype=np.float64)
@@ -0,0 +1,108 @@
+# Roteamento de leituras para réplicas do banco.
+# As réplicas são configuradas em settings.DATABASE_REPLICAS (aliases de
+# settings.DATABASES). Só as views marcadas com ReadReplicaMixin leem das
+# réplicas, e apenas em GET/HEAD; todo o resto (e toda escrita) usa o primário.
+# Depois de uma escrita, o navegador fica "preso" ao primário por
+# REPLICA_STICKY_SECONDS (cookie), para não ler uma réplica ainda atrasada.
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Pode ler da réplica neste request/contexto?
+_replica_allowed = ContextVar('replica_allowed', default=False)
+# Este request já escreveu algo? (a partir daí lê do primário)
+_wrote = ContextVar('wrote', default=False)
+
+PRIMARY_DB = 'default'
+STICKY_COOKIE_NAME = 'db_primary'
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+class ReadReplicaMixin:
+    """Marca uma view cujas leituras (GET/HEAD) podem ir para as réplicas"""
+    read_replica = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and _replica_allowed.get() and not _wrote.get():
+            return random.choice(replicas)
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do primário
+        databases = {PRIMARY_DB, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Réplicas recebem o schema pela replicação (ou por sync_sqlite_replicas)
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Libera as réplicas durante views com ReadReplicaMixin e grava o cookie
+    que mantém o navegador no primário logo depois de uma escrita.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        wrote_token = _wrote.set(False)
+        allowed_token = _replica_allowed.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _replica_allowed.reset(allowed_token)
+            _wrote.reset(wrote_token)
+        return self.process_response(request, response, wrote)
+
+    async def __acall__(self, request):
+        wrote_token = _wrote.set(False)
+        allowed_token = _replica_allowed.set(False)
+        try:
+            response = await self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _replica_allowed.reset(allowed_token)
+            _wrote.reset(wrote_token)
+        return self.process_response(request, response, wrote)
+
+    def process_response(self, request, response, wrote):
+        if wrote or request.method not in ('GET', 'HEAD'):
+            response.set_cookie(
+                STICKY_COOKIE_NAME, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, args, kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if (
+            getattr(view_class, 'read_replica', False)
+            and request.method in ('GET', 'HEAD')
+            and STICKY_COOKIE_NAME not in request.COOKIES
+        ):
+            _replica_allowed.set(True)
+        return None
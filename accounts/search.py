@@ -0,0 +1,126 @@
+# Busca de texto nas conversas (SQLite FTS5).
+# A tabela virtual accounts_message_search (migração 0016) guarda, por
+# mensagem (rowid = id da mensagem), o conteúdo e o "escopo": os tokens
+# o<owner_id> dos dois donos do match. A busca de um dono vira
+# "scope : o42 AND content : (...)", e o FTS5 cruza as duas listas de
+# documentos sem olhar mensagens de outros donos nem a tabela de mensagens.
+# Gatilhos no banco mantêm o índice em dia em todo INSERT, UPDATE do conteúdo
+# e DELETE de Message (inclusive os apagados em cascata pelo Django).
+# Para dados existentes ou um índice corrompido: python manage.py rebuild_message_search
+import re
+
+from django.db import connections, router, transaction
+from django.utils.html import escape
+
+from .models import Match, Message, Pet
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+SEARCH_TABLE = 'accounts_message_search'
+# Resultados por página da busca
+SEARCH_PAGE_SIZE = 20
+# Termos considerados por busca (o resto é ignorado)
+MAX_TERMS = 8
+# Palavras de contexto em cada trecho destacado
+SNIPPET_TOKENS = 12
+
+# Marcadores do snippet(); trocados por <mark> depois de escapar o HTML da mensagem
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+class SearchUnavailable(Exception):
+    """O banco não tem FTS5 (só o SQLite é suportado)"""
+
+
+def search_available(connection):
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(owner_id, text):
+    """
+    Expressão do MATCH para o texto digitado: cada palavra vira uma frase entre
+    aspas (nada da sintaxe do FTS5 passa do usuário) e a última vale como
+    prefixo, para buscar enquanto se digita. None se não houver palavras.
+    """
+    terms = re.findall(r'\w+', text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += '*'
+    return f'scope : "o{int(owner_id)}" AND content : ({" ".join(phrases)})'
+
+
+def highlight(snippet):
+    return escape(snippet).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def search_messages(owner_id, text, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Retorna (resultados, next_cursor) com as mensagens dos matches do dono que
+    contêm o texto, da mais relevante (bm25) para a menos; empate: mais nova
+    primeiro. Cada resultado é (mensagem, trecho em HTML com <mark>).
+    O cursor guarda a nota e o id do último resultado (keyset, sem OFFSET).
+    """
+    payload = decode_cursor(cursor)
+    try:
+        after_score = float(payload['s']) if 's' in payload else None
+        after_id = int(payload.get('i', 0))
+    except (TypeError, ValueError):
+        raise InvalidCursor('Cursor inválido')
+
+    query = build_match_query(owner_id, text)
+    if query is None:
+        return [], None
+
+    alias = router.db_for_read(Message)
+    connection = connections[alias]
+    if not search_available(connection):
+        raise SearchUnavailable('Busca indisponível')
+
+    # Nota bm25 só do conteúdo (peso 0 para o escopo); menor é mais relevante
+    sql = (
+        f'SELECT id, score, snippet FROM ('
+        f'SELECT rowid AS id, bm25({SEARCH_TABLE}, 1.0, 0.0) AS score, '
+        f"snippet({SEARCH_TABLE}, 0, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet "
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)'
+    )
+    params = [query]
+    if after_score is not None:
+        sql += ' WHERE score > %s OR (score = %s AND id < %s)'
+        params += [after_score, after_score, after_id]
+    sql += ' ORDER BY score, id DESC LIMIT %s'
+    params.append(limit + 1)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'s': rows[-1][1], 'i': rows[-1][0]})
+
+    messages = Message.objects.using(alias).select_related('sender__user').in_bulk([row[0] for row in rows])
+    return [(messages[row[0]], highlight(row[2])) for row in rows if row[0] in messages], next_cursor
+
+
+def rebuild_index(using='default'):
+    """Refaz o índice a partir de Message (dados anteriores à migração ou índice corrompido)"""
+    connection = connections[using]
+    if not search_available(connection):
+        raise SearchUnavailable('Busca indisponível')
+    quote = connection.ops.quote_name
+    message_table = quote(Message._meta.db_table)
+    match_table = quote(Match._meta.db_table)
+    pet_table = quote(Pet._meta.db_table)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, content, scope) '
+            f"SELECT msg.id, msg.content, 'o' || p1.owner_id || ' o' || p2.owner_id "
+            f'FROM {message_table} msg JOIN {match_table} m ON m.id = msg.match_id '
+            f'JOIN {pet_table} p1 ON p1.id = m.pet1_id JOIN {pet_table} p2 ON p2.id = m.pet2_id'
+        )
+        indexed = cursor.rowcount
+        # Junta os segmentos do índice numa b-tree só (buscas mais rápidas)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return indexed
@@ -0,0 +1,96 @@
+# Sinais do app "accounts".
+# Mantêm as estruturas derivadas (como a fila de candidatos do deck e os
+# campos desnormalizados de foto do Pet) sincronizadas com os modelos principais.
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .deck import enqueue_new_pet
+from .fragments import invalidate_fragments
+from .metrics import install_query_wrapper
+from .middleware import bump_active_pet_version
+from .models import Owner, Pet, PetPhoto
+from .ranking import feature_store
+from .sqlite_tuning import configure_connection
+
+
+# Quando um pet novo é cadastrado, ele entra na fila de todos os outros
+# e ganha a própria fila com os pets existentes
+@receiver(post_save, sender=Pet)
+def add_new_pet_to_deck_queues(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        enqueue_new_pet(instance)
+        # O pet ativo guardado nas sessões do dono pode ter mudado
+        bump_active_pet_version(instance.owner_id)
+
+
+@receiver(post_delete, sender=Pet)
+def forget_deleted_pet(sender, instance, **kwargs):
+    bump_active_pet_version(instance.owner_id)
+
+
+# Features do ranking do deck: pets (e donos, por causa de estado e cidade)
+# alterados são recarregados no cache do ranking na próxima consulta
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+def refresh_pet_ranking_features(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feature_store.mark_dirty([instance.pk])
+
+
+@receiver(post_save, sender=Owner)
+def refresh_owner_ranking_features(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        feature_store.mark_dirty(Pet.objects.filter(owner_id=instance.pk).values_list('id', flat=True))
+
+
+# Foto nova: soma na contagem e vira a principal se o pet ainda não tinha uma
+@receiver(post_save, sender=PetPhoto)
+def add_photo_to_pet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Pet.objects.filter(pk=instance.pet_id).update(
+            photo_count=F('photo_count') + 1,
+            primary_photo=Coalesce(F('primary_photo'), instance.pk, output_field=models.BigIntegerField()),
+        )
+
+
+# Foto removida: desconta da contagem e, se era a principal (o SET_NULL já
+# limpou o campo), promove a foto mais antiga que sobrou
+@receiver(post_delete, sender=PetPhoto)
+def remove_photo_from_pet(sender, instance, **kwargs):
+    next_photo = PetPhoto.objects.filter(pet_id=instance.pet_id).order_by('id').values('id')[:1]
+    Pet.objects.filter(pk=instance.pet_id).update(
+        photo_count=Greatest(F('photo_count') - 1, 0),
+        primary_photo=Coalesce(F('primary_photo'), Subquery(next_photo), output_field=models.BigIntegerField()),
+    )
+
+
+# Cache de fragmentos (cards e perfis): qualquer mudança em pet, foto ou
+# dono troca a versão do objeto e os fragmentos antigos deixam de ser usados
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+@receiver(post_save, sender=PetPhoto)
+@receiver(post_delete, sender=PetPhoto)
+@receiver(post_save, sender=Owner)
+@receiver(post_delete, sender=Owner)
+def invalidate_cached_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_fragments(instance)
+
+
+# Os blocos de perfil mostram nome e username do User (editados no admin ou
+# na conta): salvar o User invalida o dono. O login só grava last_login.
+@receiver(post_save, sender=User)
+def invalidate_owner_fragments(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and update_fields != frozenset({'last_login'}):
+        invalidate_fragments(instance)
+
+
+# PRAGMAs do modo de produção do SQLite em toda conexão nova
+connection_created.connect(configure_connection, dispatch_uid='accounts.sqlite_tuning')
+# Contagem e tempo de SQL por request (accounts/metrics.py)
+connection_created.connect(install_query_wrapper, dispatch_uid='accounts.metrics')
@@ -0,0 +1,52 @@
+# Modo de produção do SQLite (opt-in, settings.SQLITE_PRODUCTION_MODE).
+# Com ele ligado, toda conexão nova recebe os PRAGMAs de SQLITE_PRAGMAS:
+# WAL (leitores não esperam o escritor), busy_timeout (espera o lock em vez
+# de falhar com "database is locked"), synchronous=NORMAL (seguro com WAL),
+# mmap e um cache de páginas maior. Ver também o comando sqlite_maintenance.
+from django.conf import settings
+
+# Valores usados quando settings.SQLITE_PRAGMAS não define o PRAGMA
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,           # ms
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -64000,           # negativo = KiB (64 MB)
+    'temp_store': 'MEMORY',
+}
+
+
+def get_pragmas():
+    return {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """Executa os PRAGMAs num cursor DB-API (Django ou sqlite3 puro)"""
+    for name, value in (pragmas or get_pragmas()).items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Receiver de connection_created (registrado em accounts/signals.py)"""
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_PRODUCTION_MODE', False):
+        return
+    # Bancos em memória (testes) não suportam WAL
+    if connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
+
+
+def run_maintenance(connection, checkpoint_mode='TRUNCATE', analyze=True):
+    """
+    Checkpoint do WAL (devolve o arquivo -wal ao tamanho zero com TRUNCATE),
+    ANALYZE para atualizar as estatísticas do planejador e PRAGMA optimize.
+    Retorna (busy, páginas no log, páginas copiadas) do checkpoint.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({checkpoint_mode})')
+        checkpoint = cursor.fetchone()
+        if analyze:
+            cursor.execute('ANALYZE')
+        cursor.execute('PRAGMA optimize')
+    return checkpoint
@@ -0,0 +1,55 @@
+# Caminho de escrita de um swipe (ProcessSwipeView e AsyncProcessSwipeView).
+# Tudo numa transação, com o mínimo de comandos:
+#   like: INSERT ... ON CONFLICT DO UPDATE do swipe (um duplo clique não duplica),
+#   pass: DELETE de um like anterior e append no blob de passes (accounts/passes.py),
+#   DELETE do candidato na fila do deck,
+#   SELECT do like recíproco (só em likes) e
+#   INSERT ... ON CONFLICT DO NOTHING do match (só se houver like recíproco).
+# Sobre dois likes mútuos simultâneos: o swipe é gravado antes da consulta do
+# like recíproco, e no SQLite a primeira escrita da transação pega o lock de
+# escrita do banco. A segunda transação só grava depois do commit da primeira,
+# então a consulta dela enxerga o like da outra e o match é criado (uma vez só,
+# pela restrição única de Match). Num banco com escritas concorrentes (ex.:
+# PostgreSQL em READ COMMITTED) seria preciso um lock por par antes da consulta.
+from django.db import IntegrityError, transaction
+
+from .deck import consume_candidates
+from .models import Match, Pet, Swipe
+from .passes import add_pass
+
+
+def record_swipe(swiper_pet_id, swiped_pet_id, liked):
+    """
+    Grava o swipe e, se for um like correspondido, o match.
+    Retorna True se o par tem like mútuo (match criado agora ou já existente).
+    Levanta Pet.DoesNotExist se o pet avaliado não existe.
+    """
+    swiped_pet_id = int(swiped_pet_id)
+    liked = bool(liked)
+    try:
+        with transaction.atomic():
+            if liked:
+                # Sem consultar o Pet antes: a chave estrangeira recusa ids inexistentes
+                Swipe.objects.bulk_create(
+                    [Swipe(swiper_id=swiper_pet_id, swiped_id=swiped_pet_id, liked=True)],
+                    update_conflicts=True,
+                    unique_fields=['swiper', 'swiped'],
+                    update_fields=['liked'],
+                )
+            else:
+                # Um pass depois de um like desfaz o like
+                Swipe.objects.filter(swiper_id=swiper_pet_id, swiped_id=swiped_pet_id).delete()
+                if not add_pass(swiper_pet_id, swiped_pet_id):
+                    raise Pet.DoesNotExist('Pet matching query does not exist.')
+            consume_candidates(swiper_pet_id, [swiped_pet_id])
+
+            if not liked or not Swipe.objects.filter(
+                swiper_id=swiped_pet_id, swiped_id=swiper_pet_id, liked=True
+            ).exists():
+                return False
+
+            pet1, pet2 = sorted([swiper_pet_id, swiped_pet_id])
+            Match.objects.bulk_create([Match(pet1_id=pet1, pet2_id=pet2)], ignore_conflicts=True)
+            return True
+    except IntegrityError:
+        raise Pet.DoesNotExist('Pet matching query does not exist.')
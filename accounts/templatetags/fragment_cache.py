@@ -0,0 +1,59 @@
+# Tag de template para cachear pedaços de páginas que dependem de Pets/Owners.
+# Uso: {% load fragment_cache %}
+#      {% cachefragment 'swipe_card' pet %} ... {% endcachefragment %}
+#      {% cachefragment 'pet_photos' pet skip=is_mine %} ... {% endcachefragment %}
+# Argumentos que são objetos do banco entram na chave pela versão (invalidada
+# pelos sinais); os demais entram pelo valor. Com skip verdadeiro o bloco é
+# renderizado sem cache (ex.: quando contém {% csrf_token %}). Sem
+# settings.FRAGMENT_CACHE_ENABLED todo bloco é renderizado sem cache.
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+from ..fragments import fragment_cache_enabled, fragment_key, record
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, args, skip):
+        self.nodelist = nodelist
+        self.name = name
+        self.args = args
+        self.skip = skip
+
+    def render(self, context):
+        if not fragment_cache_enabled() or (self.skip is not None and self.skip.resolve(context)):
+            return self.nodelist.render(context)
+
+        name = self.name.resolve(context)
+        values = [arg.resolve(context) for arg in self.args]
+        objects = [value for value in values if isinstance(value, Model)]
+        vary_on = [value for value in values if not isinstance(value, Model)]
+
+        key = fragment_key(name, objects, vary_on)
+        content = cache.get(key)
+        record(name, content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+        return content
+
+
+@register.tag('cachefragment')
+def do_cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' precisa de um nome de fragmento")
+
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+
+    args, skip = [], None
+    for bit in bits[2:]:
+        if bit.startswith('skip='):
+            skip = parser.compile_filter(bit[len('skip='):])
+        else:
+            args.append(parser.compile_filter(bit))
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]), args, skip)
@@ -0,0 +1,28 @@
+# Tag de template para servir a versão redimensionada certa de uma foto.
+# Uso: {% load media_variants %}
+#      {% picture photo.image 'card' ready=photo.variants_ready alt="..." css_class="..." style="..." %}
+# Enquanto as variantes não existem (ready=False), cai no arquivo original.
+from django import template
+from django.utils.html import format_html
+
+from ..thumbnails import variant_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(field_file, variant, ready=False, alt='', css_class='', style=''):
+    if not field_file:
+        return ''
+    if not ready:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}">',
+            field_file.url, alt, css_class, style,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" alt="{}" class="{}" style="{}"></picture>',
+        variant_url(field_file, variant, 'webp'),
+        variant_url(field_file, variant, 'jpg'),
+        alt, css_class, style,
+    )
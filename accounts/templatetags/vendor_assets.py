@@ -0,0 +1,15 @@
+# Tag de template com a URL de uma biblioteca de terceiros (accounts/assets.py).
+# Uso: {% load vendor_assets %}
+#      <script src="{% vendor_static 'hammer.js' %}"></script>
+# Usa a cópia em static/vendor/ (com hash do collectstatic) se ela existir;
+# senão, o CDN.
+from django import template
+
+from ..assets import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(name):
+    return vendor_url(name)
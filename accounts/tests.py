@@ -1,3 +1,1353 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+
+from .chat import fill_latest_message_id, get_latest_message_id, serialize_message, set_latest_message_id
+from .deck import consume_candidates, get_ranked_deck_page, rebuild_candidate_queue
+from .export import EXPORTS, FORMATS as EXPORT_FORMATS, export_fields, parse_bound
+from .metrics import registry as metrics_registry
+from .middleware import ACTIVE_PET_SESSION_KEY, ActivePetMiddleware, bump_active_pet_version
+from .models import DeckCandidate, Match, Message, Owner, PassSet, Pet, PetPhoto, Swipe
+from .pagination import InvalidCursor, encode_cursor
+from .passes import add_passes, current_period, encode_ids, passed_ids
+from .ranking import feature_store, rank_candidates
+from .routers import STICKY_COOKIE_NAME, ReplicaRouter, ReplicaRoutingMiddleware
+from .search import search_messages
+from .swipes import record_swipe
+from .thumbnails import build_and_mark, submit_variants, variant_name
+from .views import (
+    AsyncGetNewMessagesView, AsyncProcessSwipeView, AsyncSendMessageView, ChatStreamView, DeckView,
+    GetNewMessagesView, ProcessSwipeView, SendMessageView,
+)
+
+
+def make_pet(name):
+    user = User.objects.create_user(name)
+    owner = Owner.objects.create(user=user, birth_date=date(1990, 1, 1))
+    pet = Pet.objects.create(owner=owner, name=name, breed='vira-lata', bio='-', birth_date=date(2020, 1, 1))
+    client = Client()
+    client.force_login(user)
+    return pet, client
+
+
+class SwipeWritePathTests(TransactionTestCase):
+    """Caminho de escrita do swipe (accounts/swipes.py e ProcessSwipeView)"""
+
+    def swipe(self, client, pet_id, liked):
+        return client.post(
+            '/api/swipe/',
+            data=json.dumps({'swiped_pet_id': pet_id, 'liked': liked}),
+            content_type='application/json',
+        )
+
+    def test_statements_per_swipe(self):
+        pet_a, _ = make_pet('a')
+        pet_b, _ = make_pet('b')
+
+        # BEGIN, DELETE de um like anterior, INSERT ... ON CONFLICT no blob de passes, DELETE da fila, COMMIT
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(record_swipe(pet_a.id, pet_b.id, False))
+        self.assertEqual(len(queries), 5)
+
+        # BEGIN, INSERT ... ON CONFLICT do like, DELETE da fila, consulta do like recíproco, COMMIT
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(record_swipe(pet_a.id, pet_b.id, True))
+        self.assertEqual(len(queries), 5)
+
+        # + o INSERT ... ON CONFLICT DO NOTHING do match
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(record_swipe(pet_b.id, pet_a.id, True))
+        self.assertEqual(len(queries), 6)
+
+        self.assertEqual(Swipe.objects.count(), 2)
+        self.assertEqual(Match.objects.count(), 1)
+
+    def test_swipe_on_missing_pet(self):
+        pet_a, client = make_pet('a')
+        for liked in (True, False):
+            response = self.swipe(client, 999999, liked)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], 'Pet matching query does not exist.')
+        self.assertFalse(Swipe.objects.exists())
+        self.assertFalse(PassSet.objects.exists())
+
+    def test_repeated_swipe_updates_decision(self):
+        pet_a, client = make_pet('a')
+        pet_b, _ = make_pet('b')
+        self.swipe(client, pet_b.id, False)
+        self.swipe(client, pet_b.id, True)
+        self.assertEqual(list(Swipe.objects.values_list('liked', flat=True)), [True])
+        # Um pass depois do like desfaz o like
+        self.swipe(client, pet_b.id, False)
+        self.assertFalse(Swipe.objects.exists())
+        self.assertEqual(passed_ids(pet_a.id).tolist(), [pet_b.id])
+
+    def test_concurrent_mutual_likes_create_one_match(self):
+        pairs = [(make_pet(f'a{i}'), make_pet(f'b{i}')) for i in range(8)]
+        requests = []
+        for (pet_a, client_a), (pet_b, client_b) in pairs:
+            requests.append((client_a, pet_b.id))
+            requests.append((client_b, pet_a.id))
+
+        barrier = threading.Barrier(len(requests))
+        results = {}
+
+        def like(client, pet_id):
+            try:
+                barrier.wait()
+                response = self.swipe(client, pet_id, True)
+                results[pet_id] = (response.status_code, response.json().get('match'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=like, args=request) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({status for status, _ in results.values()}, {200})
+        for (pet_a, _), (pet_b, _) in pairs:
+            pet1, pet2 = sorted([pet_a.id, pet_b.id])
+            self.assertEqual(Match.objects.filter(pet1_id=pet1, pet2_id=pet2).count(), 1)
+            # Quem gravou por último encontrou o like do outro
+            self.assertTrue(results[pet_a.id][1] or results[pet_b.id][1])
+
+
+class SwipeBatchTests(TransactionTestCase):
+    """Swipes em lote (ProcessSwipeBatchView)"""
+
+    def setUp(self):
+        self.pet, self.client = make_pet('a')
+        self.others = [make_pet(name)[0] for name in ('b', 'c', 'd')]
+
+    def batch(self, body):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        return self.client.post('/api/swipe/batch/', data=body, content_type='application/json')
+
+    def test_malformed_bodies_get_a_fixed_message(self):
+        b = self.others[0].id
+        bodies = [
+            'não é json',
+            b'\xff\xfe',
+            [],
+            {'swipes': {'swiped_pet_id': b, 'liked': True}},
+            {'swipes': [b]},
+            {'swipes': [{'liked': True}]},
+            {'swipes': [{'swiped_pet_id': f'{b}a', 'liked': True}]},
+            {'swipes': [{'swiped_pet_id': f'-{b}', 'liked': True}]},
+            {'swipes': [{'swiped_pet_id': 1.5, 'liked': True}]},
+            {'swipes': [{'swiped_pet_id': True, 'liked': True}]},
+            {'swipes': [{'swiped_pet_id': b, 'liked': 'yes'}]},
+            {'swipes': [{'swiped_pet_id': b, 'liked': True}] * 101},
+        ]
+        for body in bodies:
+            response = self.batch(body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json(), {'status': 'error', 'message': 'Invalid swipe batch.'})
+        self.assertFalse(Swipe.objects.exists())
+        self.assertFalse(PassSet.objects.exists())
+
+    def test_payload_built_by_swipe_js(self):
+        b, c, d = (pet.id for pet in self.others)
+        # JSON.stringify({swipes: [...]}) do flushSwipes: o id sai de Number(card.dataset.petId)
+        body = '{"swipes":[{"swiped_pet_id":%d,"liked":true},{"swiped_pet_id":%d,"liked":false}]}' % (b, c)
+        self.assertEqual(self.batch(body).json(), {'status': 'success', 'processed': 2, 'matches': []})
+        # Versões anteriores do swipe.js mandavam o data-pet-id como texto
+        body = '{"swipes":[{"swiped_pet_id":"%d","liked":true}]}' % d
+        self.assertEqual(self.batch(body).json(), {'status': 'success', 'processed': 1, 'matches': []})
+        self.assertEqual(sorted(Swipe.objects.values_list('swiped_id', flat=True)), [b, d])
+        self.assertEqual(passed_ids(self.pet.id).tolist(), [c])
+
+    def test_missing_pets_are_skipped_and_the_rest_is_recorded(self):
+        b, c, d = (pet.id for pet in self.others)
+        response = self.batch({'swipes': [
+            {'swiped_pet_id': b, 'liked': True},
+            {'swiped_pet_id': 999999, 'liked': True},
+            {'swiped_pet_id': c, 'liked': False},
+            {'swiped_pet_id': self.pet.id, 'liked': True},
+            # A última decisão sobre o mesmo pet é a que vale
+            {'swiped_pet_id': d, 'liked': True},
+            {'swiped_pet_id': d, 'liked': False},
+        ]})
+        self.assertEqual(response.json(), {'status': 'success', 'processed': 3, 'matches': []})
+        self.assertEqual(list(Swipe.objects.values_list('swiper_id', 'swiped_id')), [(self.pet.id, b)])
+        self.assertEqual(sorted(passed_ids(self.pet.id).tolist()), [c, d])
+        self.assertFalse(DeckCandidate.objects.filter(pet_id=self.pet.id, candidate_id__in=[b, c, d]).exists())
+
+    def test_reciprocal_likes_become_matches(self):
+        b, c, d = self.others
+        record_swipe(b.id, self.pet.id, True)
+        record_swipe(c.id, self.pet.id, False)
+        record_swipe(d.id, self.pet.id, True)
+        response = self.batch({'swipes': [
+            {'swiped_pet_id': b.id, 'liked': True},
+            {'swiped_pet_id': c.id, 'liked': True},
+            {'swiped_pet_id': d.id, 'liked': False},
+        ]})
+        self.assertEqual(response.json(), {'status': 'success', 'processed': 3, 'matches': [b.id]})
+        self.assertEqual(
+            list(Match.objects.values_list('pet1_id', 'pet2_id')),
+            [(min(self.pet.id, b.id), max(self.pet.id, b.id))],
+        )
+        # Repetir o lote não duplica swipes nem matches
+        self.batch({'swipes': [{'swiped_pet_id': b.id, 'liked': True}]})
+        self.assertEqual(Match.objects.count(), 1)
+        self.assertEqual(Swipe.objects.filter(swiper_id=self.pet.id).count(), 2)
+
+
+class ChatPollTests(TransactionTestCase):
+    """Polling do chat com 304 (GetNewMessagesView e a versão em accounts/chat.py)"""
+
+    def setUp(self):
+        cache.clear()
+        pet_a, self.client_a = make_pet('a')
+        pet_b, self.client_b = make_pet('b')
+        self.match = Match.objects.create(pet1=pet_a, pet2=pet_b)
+
+    def send(self, content):
+        response = self.client_a.post(
+            '/api/send-message/',
+            data=json.dumps({'match_id': self.match.id, 'content': content}),
+            content_type='application/json',
+        )
+        return response.json()['message']['id']
+
+    def poll(self, last_message_id):
+        return self.client_b.get('/api/get-messages/', {'match_id': self.match.id, 'last_message_id': last_message_id})
+
+    def check_poll_sequence(self):
+        self.assertEqual(self.poll(0).status_code, 304)
+        first = self.send('oi')
+        response = self.poll(0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([message['id'] for message in response.json()['messages']], [first])
+        self.assertEqual(self.poll(first).status_code, 304)
+        second = self.send('tudo bem?')
+        response = self.poll(first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([message['id'] for message in response.json()['messages']], [second])
+        self.assertEqual(self.poll(second).status_code, 304)
+
+    @override_settings(CHAT_LATEST_MESSAGE_CACHE=True)
+    def test_poll_sequence_with_shared_cache(self):
+        self.check_poll_sequence()
+        self.assertEqual(get_latest_message_id(self.match.id), Message.objects.latest('id').id)
+
+    @override_settings(CHAT_LATEST_MESSAGE_CACHE=False)
+    def test_poll_sequence_without_shared_cache_reads_the_database(self):
+        self.check_poll_sequence()
+        self.assertIsNone(cache.get(f'chat:latest-message:{self.match.id}'))
+
+    @override_settings(CHAT_LATEST_MESSAGE_CACHE=True)
+    def test_stale_fill_does_not_overwrite_a_send(self):
+        # Um poll leu o banco antes do envio e só grava depois dele
+        set_latest_message_id(self.match.id, 10)
+        fill_latest_message_id(self.match.id, 5)
+        self.assertEqual(get_latest_message_id(self.match.id), 10)
+
+
+class AsyncApiViewTests(TransactionTestCase):
+    """Versões async das views de swipe e chat (ASGI) respondem como as síncronas"""
+
+    views = {'swipe': ProcessSwipeView, 'send': SendMessageView, 'poll': GetNewMessagesView}
+    async_views = {'swipe': AsyncProcessSwipeView, 'send': AsyncSendMessageView, 'poll': AsyncGetNewMessagesView}
+
+    def setUp(self):
+        cache.clear()
+        self.pet_a, _ = make_pet('a')
+        self.pet_b, _ = make_pet('b')
+
+    def call(self, views, name, pet, method, path, data):
+        # Como o ActivePetMiddleware deixaria o request
+        if views is self.async_views:
+            request_factory, handler = AsyncRequestFactory(), async_to_sync(views[name].as_view())
+        else:
+            request_factory, handler = RequestFactory(), views[name].as_view()
+        if method == 'post':
+            request = request_factory.post(path, data=json.dumps(data), content_type='application/json')
+        else:
+            request = request_factory.get(path, data)
+        request.user, request.owner_id, request.active_pet_id = pet.owner.user, pet.owner_id, pet.id
+        return handler(request)
+
+    def check_views(self, views):
+        def swipe(pet, other):
+            response = self.call(views, 'swipe', pet, 'post', '/api/swipe/', {'swiped_pet_id': other.id, 'liked': True})
+            self.assertEqual(response.status_code, 200)
+            return json.loads(response.content)
+
+        def send(pet, match, content):
+            data = {'match_id': match.id, 'content': content}
+            return self.call(views, 'send', pet, 'post', '/api/send-message/', data)
+
+        def poll(pet, match, last_message_id):
+            data = {'match_id': match.id, 'last_message_id': last_message_id}
+            return self.call(views, 'poll', pet, 'get', '/api/get-messages/', data)
+
+        self.assertEqual(swipe(self.pet_a, self.pet_b), {'status': 'success', 'match': False})
+        self.assertEqual(swipe(self.pet_b, self.pet_a), {'status': 'success', 'match': True})
+        match = Match.objects.get()
+
+        self.assertEqual(poll(self.pet_b, match, 0).status_code, 304)
+        response = send(self.pet_a, match, 'oi')
+        self.assertEqual(response.status_code, 200)
+        message = Message.objects.select_related('sender__user').get()
+        self.assertEqual(json.loads(response.content), {
+            'status': 'success', 'message': serialize_message(message, self.pet_a.owner_id),
+        })
+        self.assertEqual(json.loads(send(self.pet_a, match, '   ').content), {'status': 'error', 'message': 'Mensagem vazia'})
+
+        response = poll(self.pet_b, match, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {
+            'status': 'success', 'messages': [serialize_message(message, self.pet_b.owner_id)],
+        })
+        self.assertEqual(poll(self.pet_b, match, message.id).status_code, 304)
+
+        pet_c, _ = make_pet('c')
+        self.assertEqual(json.loads(poll(pet_c, match, 0).content), {'status': 'error', 'message': 'Acesso negado'})
+        self.assertEqual(send(pet_c, match, 'oi').status_code, 403)
+
+    def test_sync_views(self):
+        self.check_views(self.views)
+
+    def test_async_views(self):
+        self.check_views(self.async_views)
+
+
+class ReadCursorTests(TransactionTestCase):
+    """Cursores de leitura do Match (não lidas na lista de matches e migração 0014)"""
+
+    def setUp(self):
+        cache.clear()
+        self.pet_a, self.client_a = make_pet('a')
+        self.pet_b, self.client_b = make_pet('b')
+        self.match = Match.objects.create(pet1=self.pet_a, pet2=self.pet_b)
+
+    def send(self, client, content):
+        client.post(
+            '/api/send-message/',
+            data=json.dumps({'match_id': self.match.id, 'content': content}),
+            content_type='application/json',
+        )
+
+    def unread(self, client):
+        return client.get('/matches/').context['matches'][0]['unread_count']
+
+    def test_unread_counts_after_viewing_and_sending(self):
+        self.send(self.client_a, 'oi')
+        self.send(self.client_a, 'tudo bem?')
+        self.assertEqual((self.unread(self.client_a), self.unread(self.client_b)), (0, 2))
+
+        # Abrir o chat lê tudo até a última mensagem exibida
+        self.client_b.get(f'/chat/{self.match.id}/')
+        self.assertEqual(self.unread(self.client_b), 0)
+
+        # As próprias mensagens nunca contam como não lidas
+        self.send(self.client_b, 'oi!')
+        self.assertEqual((self.unread(self.client_a), self.unread(self.client_b)), (1, 0))
+        self.send(self.client_a, 'vamos passear?')
+        self.assertEqual((self.unread(self.client_a), self.unread(self.client_b)), (1, 1))
+
+        # O polling também avança o cursor de quem recebe as mensagens
+        response = self.client_a.get('/api/get-messages/', {'match_id': self.match.id, 'last_message_id': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.unread(self.client_a), self.unread(self.client_b)), (0, 1))
+
+    def test_migration_0014_copies_is_read_both_ways(self):
+        before, after = [('accounts', '0013_message_match_id_index')], [('accounts', '0014_match_read_cursors')]
+        executor = MigrationExecutor(connection)
+        executor.migrate(before)
+        try:
+            apps = executor.loader.project_state(before).apps
+            OldMatch = apps.get_model('accounts', 'Match')
+            OldMessage = apps.get_model('accounts', 'Message')
+            owner_a, owner_b = self.pet_a.owner_id, self.pet_b.owner_id
+            ids = [
+                OldMessage.objects.create(match_id=self.match.id, sender_id=sender, content='-', is_read=is_read).id
+                for sender, is_read in [(owner_a, True), (owner_b, True), (owner_a, True), (owner_a, False), (owner_b, False)]
+            ]
+            OldMatch.objects.create(pet1_id=self.pet_b.id, pet2_id=self.pet_a.id)
+
+            executor = MigrationExecutor(connection)
+            executor.migrate(after)
+            cursors = Match.objects.values_list('pet1_last_read_id', 'pet2_last_read_id')
+            # pet1 (a) leu até a mensagem 2 de b; pet2 (b) leu até a mensagem 3 de a
+            self.assertEqual(cursors.get(pk=self.match.id), (ids[1], ids[2]))
+            # Match sem mensagens lidas fica com os cursores zerados
+            self.assertEqual(cursors.exclude(pk=self.match.id).get(), (0, 0))
+
+            executor = MigrationExecutor(connection)
+            executor.migrate(before)
+            apps = executor.loader.project_state(before).apps
+            read = apps.get_model('accounts', 'Message').objects.filter(is_read=True)
+            self.assertEqual(sorted(read.values_list('id', flat=True)), ids[:3])
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+class InboxTests(TransactionTestCase):
+    """Lista de matches numa consulta só (MatchesView)"""
+
+    def setUp(self):
+        cache.clear()
+        self.pet, self.client = make_pet('me')
+        self.clients = {}
+
+    def add_match(self, name):
+        pet, client = make_pet(name)
+        self.clients[pet.id] = client
+        return Match.objects.create(pet1=self.pet, pet2=pet), pet
+
+    def send(self, client, match, content):
+        client.post(
+            '/api/send-message/',
+            data=json.dumps({'match_id': match.id, 'content': content}),
+            content_type='application/json',
+        )
+
+    def inbox(self):
+        return self.client.get('/matches/').context['matches']
+
+    def test_ordering_last_message_and_unread(self):
+        quiet, _ = self.add_match('b')
+        older, pet_c = self.add_match('c')
+        newer, pet_d = self.add_match('d')
+        self.send(self.clients[pet_c.id], older, 'oi')
+        self.send(self.clients[pet_c.id], older, 'tudo bem?')
+        self.send(self.clients[pet_d.id], newer, 'au au')
+        self.send(self.client, newer, 'miau')
+
+        inbox = self.inbox()
+        # Atividade mais recente primeiro; sem mensagens vale a data do match
+        self.assertEqual([item['match'].id for item in inbox], [newer.id, older.id, quiet.id])
+        self.assertEqual([item['pet'].id for item in inbox[:2]], [pet_d.id, pet_c.id])
+        self.assertEqual(
+            [item['last_message'] and item['last_message'].content for item in inbox],
+            ['miau', 'tudo bem?', None],
+        )
+        self.assertEqual([item['unread_count'] for item in inbox], [1, 2, 0])
+        self.assertEqual(inbox[2]['last_activity'], quiet.created_at)
+
+        # Um match novo sem mensagens sobe para o topo; ler o chat zera as não lidas
+        fresh, _ = self.add_match('e')
+        self.client.get(f'/chat/{older.id}/')
+        inbox = self.inbox()
+        self.assertEqual([item['match'].id for item in inbox], [fresh.id, newer.id, older.id, quiet.id])
+        self.assertEqual([item['unread_count'] for item in inbox], [0, 1, 0, 0])
+
+    def test_query_count_does_not_grow_with_matches(self):
+        # Sessão, usuário e uma única consulta agregada de matches, seja qual for o tamanho da caixa
+        for count, names in ((2, ('b', 'c')), (6, ('d', 'e', 'f', 'g'))):
+            for name in names:
+                match, pet = self.add_match(name)
+                self.send(self.clients[pet.id], match, 'oi')
+            self.inbox()
+            with self.assertNumQueries(3):
+                self.assertEqual(len(self.inbox()), count)
+
+
+class MessageHistoryTests(TransactionTestCase):
+    """Histórico do chat paginado por cursor (MessageHistoryView)"""
+
+    def setUp(self):
+        pet_a, self.client = make_pet('a')
+        pet_b, _ = make_pet('b')
+        self.match = Match.objects.create(pet1=pet_a, pet2=pet_b)
+        self.ids = [
+            message.id for message in Message.objects.bulk_create(
+                Message(match=self.match, sender=(pet_a, pet_b)[i % 2].owner, content=f'm{i}') for i in range(35)
+            )
+        ]
+
+    def history(self, client=None, **params):
+        return (client or self.client).get('/api/messages/history/', {'match_id': self.match.id, **params})
+
+    def test_pages_go_back_until_the_first_message(self):
+        first = self.history().json()
+        self.assertEqual([message['id'] for message in first['messages']], self.ids[5:])
+        self.assertEqual([message['is_mine'] for message in first['messages'][:2]], [False, True])
+        self.assertIsNotNone(first['next_cursor'])
+
+        last = self.history(cursor=first['next_cursor']).json()
+        self.assertEqual([message['id'] for message in last['messages']], self.ids[:5])
+        self.assertIsNone(last['next_cursor'])
+
+    def test_invalid_requests(self):
+        for match_id in ('abc', '', '-1', '1.5'):
+            response = self.client.get('/api/messages/history/', {'match_id': match_id})
+            self.assertEqual(response.status_code, 400, match_id)
+        self.assertEqual(self.client.get('/api/messages/history/').status_code, 400)
+        self.assertEqual(self.history(match_id=self.match.id + 1).status_code, 404)
+        self.assertEqual(self.history(cursor='%%%').status_code, 400)
+
+        _, outsider = make_pet('c')
+        response = self.history(client=outsider)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'status': 'error', 'message': 'Acesso negado'})
+
+
+class ChatStreamTests(TransactionTestCase):
+    """Push do chat por SSE (ChatStreamView.event_stream)"""
+
+    def test_stream_catches_up_with_messages_from_other_workers(self):
+        pet_a, _ = make_pet('a')
+        pet_b, _ = make_pet('b')
+        match = Match.objects.create(pet1=pet_a, pet2=pet_b)
+        view = ChatStreamView(keepalive_seconds=0.05, max_stream_seconds=2)
+
+        async def collect():
+            events = []
+            stream = view.event_stream(match.id, pet_b.owner_id, Match.last_read_field(pet_b.id, match.pet1_id), 0)
+            async for chunk in stream:
+                if chunk == ': keepalive\n\n' and not events:
+                    # Salva sem publish, como faria o SendMessageView de outro processo
+                    events.append(await sync_to_async(Message.objects.create)(
+                        match=match, sender=pet_a.owner, content='oi',
+                    ))
+                elif chunk.startswith('id: '):
+                    events.append(chunk)
+                    await stream.aclose()
+                    break
+            return events
+
+        message, event = async_to_sync(collect)()
+        self.assertTrue(event.startswith(f'id: {message.id}\n'))
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['content'], 'oi')
+        match.refresh_from_db()
+        self.assertEqual(getattr(match, Match.last_read_field(pet_b.id, match.pet1_id)), message.id)
+
+    @override_settings(CHAT_PUSH_ENABLED=True)
+    def test_invalid_match_id(self):
+        pet_a, _ = make_pet('a')
+        pet_b, _ = make_pet('b')
+        pet_c, _ = make_pet('c')
+        match = Match.objects.create(pet1=pet_a, pet2=pet_b)
+
+        def stream(match_id, pet):
+            request = AsyncRequestFactory().get('/api/chat-stream/', {'match_id': match_id})
+            request.user, request.owner_id, request.active_pet_id = pet.owner.user, pet.owner_id, pet.id
+            return async_to_sync(ChatStreamView.as_view())(request)
+
+        for match_id in ('abc', '', '0'):
+            response = stream(match_id, pet_a)
+            self.assertEqual(response.status_code, 400, match_id)
+            self.assertEqual(json.loads(response.content)['message'], 'match_id inválido')
+        self.assertEqual(stream(match.id, pet_c).status_code, 403)
+
+
+class PetPhotoTests(TransactionTestCase):
+    """Foto principal e contagem de fotos desnormalizadas no Pet (accounts/signals.py e PetPrimaryPhotoView)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pet, self.client = make_pet('a')
+
+    def photo(self, pet=None):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), (255, 0, 0)).save(buffer, 'PNG')
+        return PetPhoto.objects.create(pet=pet or self.pet, image=SimpleUploadedFile('rex.png', buffer.getvalue()))
+
+    def assertPhotos(self, count, primary):
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.photo_count, count)
+        self.assertEqual(self.pet.primary_photo_id, primary and primary.pk)
+
+    def set_primary(self, photo, pet=None, client=None):
+        pet = pet or self.pet
+        return (client or self.client).post(f'/pet/{pet.pk}/photo/{photo.pk}/primary/')
+
+    def test_create_and_delete_keep_count_and_primary(self):
+        self.assertPhotos(0, None)
+        first = self.photo()
+        self.assertPhotos(1, first)
+        second, third = self.photo(), self.photo()
+        # A principal continua sendo a primeira foto enviada
+        self.assertPhotos(3, first)
+
+        second.delete()
+        self.assertPhotos(2, first)
+        # Remover a principal promove a mais antiga que sobrou
+        first.delete()
+        self.assertPhotos(1, third)
+        third.delete()
+        self.assertPhotos(0, None)
+
+    def test_set_primary_photo(self):
+        first, second = self.photo(), self.photo()
+        response = self.set_primary(second)
+        self.assertRedirects(response, f'/pet/{self.pet.pk}/', fetch_redirect_response=False)
+        self.assertPhotos(2, second)
+
+        # Só o dono do pet troca a foto, e só por uma foto do próprio pet
+        other, other_client = make_pet('b')
+        other_photo = self.photo(other)
+        self.assertEqual(self.set_primary(first, client=other_client).status_code, 404)
+        self.assertEqual(self.set_primary(other_photo).status_code, 404)
+        self.assertEqual(self.set_primary(other_photo, pet=self.pet, client=other_client).status_code, 404)
+        self.assertPhotos(2, second)
+        self.assertEqual(self.set_primary(first, client=Client()).status_code, 302)
+        self.assertPhotos(2, second)
+
+
+class ImageVariantTests(TransactionTestCase):
+    """Variantes redimensionadas das fotos (accounts/thumbnails.py)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pet, _ = make_pet('a')
+
+    def photo(self, filename, color, image_format):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 900), color).save(buffer, image_format)
+        return PetPhoto.objects.create(pet=self.pet, image=SimpleUploadedFile(filename, buffer.getvalue()))
+
+    def test_same_name_with_other_extension_keeps_its_own_variants(self):
+        red = self.photo('rex.png', (255, 0, 0), 'PNG')
+        blue = self.photo('rex.jpg', (0, 0, 255), 'JPEG')
+        for photo in (red, blue):
+            build_and_mark('accounts.PetPhoto', photo.pk, 'image')
+            photo.refresh_from_db()
+            self.assertTrue(photo.variants_ready)
+
+        names = {variant_name(photo.image.name, 'card', 'jpg') for photo in (red, blue)}
+        self.assertEqual(names, {'pet_photos/variants/rex.png__card.jpg', 'pet_photos/variants/rex.jpg__card.jpg'})
+        for photo, channel in ((red, 0), (blue, 2)):
+            with photo.image.storage.open(variant_name(photo.image.name, 'card', 'jpg')) as variant:
+                image = Image.open(variant)
+                self.assertEqual(image.size, (800, 600))
+                self.assertGreater(image.getpixel((400, 300))[channel], 200)
+
+    def test_worker_failure_is_logged(self):
+        photo = PetPhoto.objects.create(pet=self.pet, image=SimpleUploadedFile('broken.jpg', b'not an image'))
+        logged = threading.Event()
+        with self.assertLogs('accounts.thumbnails', 'ERROR') as logs:
+            future = submit_variants('accounts.PetPhoto', photo.pk, 'image')
+            # Os callbacks rodam na ordem em que foram registrados
+            future.add_done_callback(lambda _: logged.set())
+            self.assertTrue(logged.wait(10))
+        self.assertIn(f'accounts.PetPhoto {photo.pk}', logs.output[0])
+        photo.refresh_from_db()
+        self.assertFalse(photo.variants_ready)
+
+
+@override_settings(DECK_RANKING_ENABLED=False)
+class DeckQueueTests(TransactionTestCase):
+    """Fila de candidatos (DeckCandidate) e paginação por id do deck (DeckView)"""
+
+    def setUp(self):
+        self.pet, self.client = make_pet('me')
+        self.others = [make_pet(f'p{i}')[0] for i in range(4)]
+
+    def queue(self, pet_id):
+        return set(DeckCandidate.objects.filter(pet_id=pet_id).values_list('candidate_id', flat=True))
+
+    def all_ids(self):
+        return {self.pet.id, *(pet.id for pet in self.others)}
+
+    def test_new_pet_enters_every_queue(self):
+        # post_save do Pet (enqueue_new_pet): a fila dele e a dos outros
+        for pet_id in self.all_ids():
+            self.assertEqual(self.queue(pet_id), self.all_ids() - {pet_id})
+        self.assertEqual(DeckCandidate.objects.count(), 5 * 4)
+
+    def test_pages_have_no_duplicates(self):
+        self.others += [make_pet(f'q{i}')[0] for i in range(21)]
+        seen, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get('/api/deck/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data['pets']), 10)
+            seen += [card['id'] for card in data['pets']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, sorted(self.all_ids() - {self.pet.id}))
+
+    def test_bad_cursor(self):
+        for cursor in ('%%%', encode_cursor([1]), encode_cursor({'after': 'x'})):
+            response = self.client.get('/api/deck/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], 'Cursor inválido')
+
+    def test_swipes_leave_the_queue(self):
+        liked, passed = self.others[0].id, self.others[1].id
+        record_swipe(self.pet.id, liked, True)
+        record_swipe(self.pet.id, passed, False)
+        self.assertEqual(self.queue(self.pet.id), self.all_ids() - {self.pet.id, liked, passed})
+        # Só a fila de quem swipou muda
+        self.assertIn(self.pet.id, self.queue(liked))
+        self.assertIn(self.pet.id, self.queue(passed))
+
+    def test_rebuild(self):
+        liked, passed = self.others[0].id, self.others[1].id
+        record_swipe(self.pet.id, liked, True)
+        record_swipe(self.pet.id, passed, False)
+        expected = {pet_id: self.queue(pet_id) for pet_id in self.all_ids()}
+
+        DeckCandidate.objects.all().delete()
+        self.assertEqual(rebuild_candidate_queue(), 5 * 4 - 2)
+        self.assertEqual({pet_id: self.queue(pet_id) for pet_id in self.all_ids()}, expected)
+
+        # Só as filas pedidas são refeitas
+        DeckCandidate.objects.all().delete()
+        self.assertEqual(rebuild_candidate_queue([self.pet.id]), 2)
+        self.assertEqual(self.queue(self.pet.id), expected[self.pet.id])
+
+    def test_one_swipe_per_pair(self):
+        Swipe.objects.create(swiper=self.pet, swiped=self.others[0], liked=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Swipe.objects.create(swiper=self.pet, swiped=self.others[0], liked=True)
+        # O par contrário é outro swipe
+        Swipe.objects.create(swiper=self.others[0], swiped=self.pet, liked=True)
+        self.assertEqual(Swipe.objects.count(), 2)
+
+
+class RankedDeckTests(TransactionTestCase):
+    """Deck ordenado por nota (accounts/ranking.py e get_ranked_deck_page)"""
+
+    def setUp(self):
+        cache.clear()
+        self.pet, _ = make_pet('me')
+        self.others = [make_pet(f'p{i}')[0] for i in range(25)]
+        feature_store.load()
+
+    def pages(self, limit=10, between_pages=None):
+        seen, cursor = [], None
+        while True:
+            pets, cursor = get_ranked_deck_page(self.pet.id, cursor, limit)
+            seen += [pet.id for pet in pets]
+            if not cursor:
+                return seen
+            if between_pages:
+                between_pages(seen)
+
+    def test_pages_keep_the_first_page_order(self):
+        expected = self.pages()
+        self.assertEqual(sorted(expected), sorted(pet.id for pet in self.others))
+
+        def change_scores(seen):
+            # Atividade nova sobe a nota dos últimos cards; um card da próxima página é swipado
+            for pet_id in expected[-5:]:
+                feature_store.touch(pet_id)
+            remaining = [pet_id for pet_id in expected if pet_id not in seen]
+            record_swipe(self.pet.id, remaining[0], False)
+            swiped.append(remaining[0])
+
+        swiped = []
+        seen = self.pages(between_pages=change_scores)
+        self.assertEqual(seen, [pet_id for pet_id in expected if pet_id not in swiped])
+
+    def test_lost_snapshot_continues_after_the_last_card(self):
+        seen = self.pages(limit=7, between_pages=lambda seen: cache.clear())
+        self.assertEqual(sorted(seen), sorted(pet.id for pet in self.others))
+
+    def test_window_is_a_prefix_of_the_full_order(self):
+        # Notas distintas para metade dos pets; a outra metade empata
+        for pet in self.others[::2]:
+            feature_store.touch(pet.id)
+        now = time.time()
+        ids, scores = rank_candidates(self.pet.id, now, size=100)
+        self.assertEqual(sorted(ids.tolist()), sorted(pet.id for pet in self.others))
+        for size in (1, 5, 12, 13, 20, 25):
+            window_ids, window_scores = rank_candidates(self.pet.id, now, size=size)
+            self.assertEqual(window_ids.tolist(), ids[:size].tolist())
+            self.assertEqual(window_scores.tolist(), scores[:size].tolist())
+            after = (float(scores[size - 1]), int(ids[size - 1]))
+            rest, _ = rank_candidates(self.pet.id, now, after, size=100)
+            self.assertEqual(rest.tolist(), ids[size:].tolist())
+
+    @override_settings(DECK_RANKING_SNAPSHOT_SIZE=4)
+    def test_pages_cross_ranking_windows(self):
+        for pet in self.others[::3]:
+            feature_store.touch(pet.id)
+        expected = self.pages(limit=100)
+        self.assertEqual(sorted(expected), sorted(pet.id for pet in self.others))
+        for limit in (3, 4, 10):
+            self.assertEqual(self.pages(limit=limit), expected)
+        self.assertEqual(self.pages(limit=3, between_pages=lambda seen: cache.clear()), expected)
+
+    def test_bad_cursor(self):
+        for cursor in ('%%%', encode_cursor({'o': -1}), encode_cursor({'s': 'x'})):
+            with self.assertRaises(InvalidCursor):
+                get_ranked_deck_page(self.pet.id, cursor)
+
+    def test_activity_is_recorded_only_after_commit(self):
+        position = int(np.searchsorted(feature_store.ids, self.pet.id))
+        before = feature_store.last_active[position]
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            consume_candidates(self.pet.id, [self.others[0].id])
+            raise RuntimeError
+        self.assertEqual(feature_store.last_active[position], before)
+        self.assertTrue(DeckCandidate.objects.filter(pet=self.pet, candidate=self.others[0]).exists())
+
+        with transaction.atomic():
+            consume_candidates(self.pet.id, [self.others[0].id])
+            self.assertEqual(feature_store.last_active[position], before)
+        self.assertGreater(feature_store.last_active[position], before)
+
+
+class ActivePetMiddlewareTests(TransactionTestCase):
+    """Dono e pet ativo guardados na sessão (ActivePetMiddleware)"""
+
+    def setUp(self):
+        cache.clear()
+        self.first, _ = make_pet('a')
+        self.second = Pet.objects.create(
+            owner=self.first.owner, name='b', breed='vira-lata', bio='-', birth_date=date(2020, 1, 1),
+        )
+        self.middleware = ActivePetMiddleware(lambda request: HttpResponse())
+        self.session = {}
+
+    def resolve(self):
+        request = RequestFactory().get('/swipe/')
+        request.user = self.first.owner.user
+        request.session = self.session
+        with CaptureQueriesContext(connection) as queries:
+            self.middleware.process_request(request)
+        return request.active_pet_id, len(queries)
+
+    @override_settings(ACTIVE_PET_VERSION_CACHE=True)
+    def test_shared_version_skips_queries_until_bumped(self):
+        self.assertEqual(self.resolve(), (self.first.id, 2))
+        self.assertEqual(self.resolve(), (self.first.id, 0))
+        # A versão trocada por outro processo (no cache compartilhado) vale aqui
+        bump_active_pet_version(self.first.owner_id)
+        self.assertEqual(self.resolve(), (self.first.id, 2))
+        self.assertEqual(self.resolve(), (self.first.id, 0))
+        # A exclusão troca a versão pelos sinais
+        self.first.delete()
+        self.assertEqual(self.resolve(), (self.second.id, 2))
+        self.second.delete()
+        self.assertEqual(self.resolve(), (None, 2))
+
+    @override_settings(ACTIVE_PET_VERSION_CACHE=False)
+    def test_without_shared_cache_the_pet_comes_from_the_database(self):
+        # Versões gravadas pelos sinais do setUp, com as configurações padrão
+        cache.clear()
+        self.assertEqual(self.resolve(), (self.first.id, 2))
+        self.assertEqual(self.resolve(), (self.first.id, 1))
+        # Sem versão em cache, a exclusão já vale no próximo request de qualquer processo
+        Pet.objects.filter(pk=self.first.pk).delete()
+        self.assertEqual(self.resolve(), (self.second.id, 1))
+        self.assertEqual(self.session[ACTIVE_PET_SESSION_KEY]['pet_id'], self.second.id)
+        self.assertIsNone(cache.get(f'active-pet-version:{self.first.owner_id}'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TransactionTestCase):
+    """Leituras nas réplicas (accounts/routers.py), com uma réplica que aponta para o banco de teste"""
+
+    def setUp(self):
+        connections.settings['replica1'] = {**connection.settings_dict}
+        self.replica = connections['replica1']
+        self.pet, self.client = make_pet('a')
+        make_pet('b')
+
+    def tearDown(self):
+        self.replica.close()
+        del connections['replica1']
+        del connections.settings['replica1']
+
+    def queries(self, method, path, **kwargs):
+        """(consultas no primário, consultas na réplica) de um request"""
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(self.replica) as replica:
+            response = getattr(self.client, method)(path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary), len(replica)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        _, _, replica = self.queries('get', '/api/deck/')
+        self.assertGreater(replica, 0)
+
+        response, _, replica = self.queries(
+            'post', '/api/swipe/', content_type='application/json',
+            data=json.dumps({'swiped_pet_id': self.pet.id + 1, 'liked': True}),
+        )
+        self.assertEqual(replica, 0)
+        self.assertEqual(response.cookies[STICKY_COOKIE_NAME]['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        # O cookie volta nos próximos requests e mantém as leituras no primário
+        response, primary, replica = self.queries('get', '/api/deck/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+        self.assertNotIn(STICKY_COOKIE_NAME, response.cookies)
+
+        # Cookie expirado: volta para a réplica
+        del self.client.cookies[STICKY_COOKIE_NAME]
+        _, _, replica = self.queries('get', '/api/deck/')
+        self.assertGreater(replica, 0)
+
+    def test_write_in_a_get_request_moves_its_reads_to_the_primary(self):
+        router = ReplicaRouter()
+        routed = []
+
+        def view(request):
+            routed.append(router.db_for_read(Pet))
+            router.db_for_write(Pet)
+            routed.append(router.db_for_read(Pet))
+            return HttpResponse()
+        view.view_class = DeckView
+
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(request, view, (), {}) or view(request)
+        )
+        response = middleware(RequestFactory().get('/api/deck/'))
+        self.assertEqual(routed, ['replica1', 'default'])
+        self.assertIn(STICKY_COOKIE_NAME, response.cookies)
+
+        # As ContextVars voltam ao padrão: o próximo request começa sem escrita,
+        # e fora de um request (ex.: comandos) tudo lê do primário
+        routed.clear()
+        middleware(RequestFactory().get('/api/deck/'))
+        self.assertEqual(routed, ['replica1', 'default'])
+        self.assertEqual(router.db_for_read(Pet), 'default')
+
+    def test_views_without_the_mixin_read_the_primary(self):
+        match = Match.objects.create(pet1_id=self.pet.id, pet2_id=self.pet.id + 1)
+        _, primary, replica = self.queries('get', f'/chat/{match.id}/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_the_primary(self):
+        _, primary, replica = self.queries('get', '/api/deck/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+
+class FragmentCacheTests(TransactionTestCase):
+    """Cache de fragmentos (accounts/fragments.py e a tag cachefragment)"""
+
+    def setUp(self):
+        cache.clear()
+        self.pet, self.client = make_pet('rex')
+        self.owner = self.pet.owner
+        self.url = f'/profile/{self.owner.pk}/'
+
+    @override_settings(FRAGMENT_CACHE_ENABLED=True)
+    def test_user_save_invalidates_owner_profile(self):
+        self.assertContains(self.client.get(self.url), '@rex')
+        user = self.owner.user
+        user.first_name, user.last_name = 'Maria', 'Silva'
+        user.save()
+        self.assertContains(self.client.get(self.url), 'Maria Silva')
+        # O login só grava last_login e não troca a versão do dono
+        key = f'fragment-version:{Owner._meta.label_lower}:{self.owner.pk}'
+        version = cache.get(key)
+        self.client.force_login(user)
+        self.assertEqual(cache.get(key), version)
+
+    @override_settings(FRAGMENT_CACHE_ENABLED=False)
+    def test_without_shared_cache_fragments_are_not_cached(self):
+        cache.clear()
+        self.assertContains(self.client.get(self.url), '@rex')
+        User.objects.filter(pk=self.owner.user_id).update(username='rex2')
+        self.assertContains(self.client.get(self.url), '@rex2')
+        self.assertIsNone(cache.get(f'fragment-version:{Owner._meta.label_lower}:{self.owner.pk}'))
+
+
+class RequestMetricsTests(TransactionTestCase):
+    """Métricas por request (accounts/metrics.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.pet, self.client = make_pet('a')
+        make_pet('b')
+        # Primeiro request de cada rota: sessão, pet ativo e cache do ranking
+        for path in ('/api/deck/', '/matches/'):
+            self.client.get(path)
+        metrics_registry.reset()
+
+    def route(self, url_name):
+        return metrics_registry._views[(url_name, 'GET', 2)]
+
+    def measure(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return len(queries)
+
+    def test_queries_are_counted_per_request(self):
+        deck = self.measure('/api/deck/')
+        matches = self.measure('/matches/')
+        self.measure('/api/deck/')
+        # Consultas fora de um request não entram em nenhuma rota
+        Pet.objects.count()
+
+        self.assertEqual((self.route('deck').queries.total, self.route('deck').queries.sum), (2, 2 * deck))
+        self.assertEqual((self.route('matches').queries.total, self.route('matches').queries.sum), (1, matches))
+        self.assertGreater(self.route('deck').sql_seconds, 0)
+        self.assertGreaterEqual(self.route('deck').latency.sum, self.route('deck').sql_seconds)
+
+        staff = User.objects.create_user('staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        text = client.get('/api/metrics/').content.decode()
+        self.assertIn(f'latinder_request_sql_queries_sum{{view="deck",method="GET",status="2xx"}} {2 * deck}', text)
+        self.assertIn('latinder_request_duration_seconds_count{view="matches",method="GET",status="2xx"} 1', text)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    def test_concurrent_requests_do_not_mix_their_queries(self):
+        expected = {'deck': self.measure('/api/deck/'), 'matches': self.measure('/matches/')}
+        metrics_registry.reset()
+
+        paths = ['/api/deck/', '/matches/'] * 4
+        barrier = threading.Barrier(len(paths))
+        clients = []
+        for _ in paths:
+            client = Client()
+            client.cookies = self.client.cookies
+            clients.append(client)
+
+        def get(client, path):
+            try:
+                barrier.wait()
+                client.get(path)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=get, args=args) for args in zip(clients, paths)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for url_name, count in expected.items():
+            self.assertEqual(self.route(url_name).queries.total, 4)
+            self.assertEqual(self.route(url_name).queries.sum, 4 * count)
+
+
+class PassSetTests(TransactionTestCase):
+    """Passes compactados em blobs (accounts/passes.py e compact_passes)"""
+
+    def queue(self, pet):
+        return set(DeckCandidate.objects.filter(pet=pet).values_list('candidate_id', flat=True))
+
+    def test_passes_are_appended_to_one_blob_per_period(self):
+        pet_a, _ = make_pet('a')
+        others = [make_pet(f'b{i}')[0] for i in range(3)]
+        for pet in reversed(others):
+            record_swipe(pet_a.id, pet.id, False)
+        record_swipe(pet_a.id, others[0].id, False)
+
+        pass_set = PassSet.objects.get()
+        self.assertEqual(pass_set.period, current_period())
+        self.assertEqual(len(pass_set.pet_ids), 4 * 8)
+        self.assertEqual(passed_ids(pet_a.id).tolist(), [pet.id for pet in others])
+        self.assertFalse(Swipe.objects.exists())
+        self.assertEqual(self.queue(pet_a), set())
+        # A fila refeita também deixa os passes de fora
+        rebuild_candidate_queue()
+        self.assertEqual(self.queue(pet_a), set())
+
+    def test_compact_passes_moves_legacy_rows_and_expires_old_periods(self):
+        pet_a, _ = make_pet('a')
+        pet_b, _ = make_pet('b')
+        pet_c, _ = make_pet('c')
+        pet_d, _ = make_pet('d')
+        old = timezone.now() - timedelta(days=60)
+        # Pass antigo ainda em Swipe, e um pass de 60 dias atrás já no blob
+        Swipe.objects.create(swiper=pet_a, swiped=pet_b, liked=False)
+        Swipe.objects.filter(swiper=pet_a).update(timestamp=old)
+        old_period = (old.date() - date(1970, 1, 1)).days // 7 * 7
+        add_passes(pet_a.id, [pet_d.id, pet_c.id, pet_c.id], period=old_period, at=old)
+        # pet_d foi passado de novo agora; esse pass continua valendo
+        add_passes(pet_a.id, [pet_d.id])
+        DeckCandidate.objects.filter(pet=pet_a).delete()
+
+        call_command('compact_passes', stdout=io.StringIO())
+        self.assertFalse(Swipe.objects.exists())
+        self.assertEqual(passed_ids(pet_a.id).tolist(), [pet_b.id, pet_c.id, pet_d.id])
+        blob = PassSet.objects.get(pet=pet_a, period=old_period).pet_ids
+        self.assertEqual(bytes(blob), encode_ids([pet_b.id, pet_c.id, pet_d.id]))
+
+        with override_settings(PASS_EXPIRY_DAYS=30):
+            self.assertEqual(passed_ids(pet_a.id).tolist(), [pet_d.id])
+            call_command('compact_passes', stdout=io.StringIO())
+        self.assertEqual(PassSet.objects.get().period, current_period())
+        self.assertEqual(self.queue(pet_a), {pet_b.id, pet_c.id})
+
+    def test_passes_export_has_one_row_per_passed_pet(self):
+        pet_a, _ = make_pet('a')
+        pet_b, _ = make_pet('b')
+        pet_c, _ = make_pet('c')
+        record_swipe(pet_a.id, pet_c.id, False)
+        record_swipe(pet_a.id, pet_b.id, False)
+        record_swipe(pet_a.id, pet_b.id, False)
+        record_swipe(pet_b.id, pet_a.id, True)
+
+        output = io.StringIO()
+        call_command('export_data', 'passes', stdout=output, stderr=io.StringIO())
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        period_start = (date(1970, 1, 1) + timedelta(days=current_period())).isoformat()
+        pass_set = PassSet.objects.get()
+        self.assertEqual(rows, [
+            {'pass_set_id': pass_set.id, 'swiper_id': pet_a.id, 'swiped_id': swiped_id,
+             'period_start': period_start, 'last_pass_at': pass_set.updated_at.isoformat()}
+            for swiped_id in (pet_b.id, pet_c.id)
+        ])
+
+
+class ExportTests(TransactionTestCase):
+    """Exportação em JSONL e CSV (accounts/export.py e ExportView)"""
+
+    def setUp(self):
+        pet_a, self.client = make_pet('a')
+        pet_b, _ = make_pet('b')
+        pet_c, _ = make_pet('c')
+        record_swipe(pet_a.id, pet_b.id, True)
+        record_swipe(pet_b.id, pet_a.id, True)
+        record_swipe(pet_a.id, pet_c.id, False)
+        match = Match.objects.get()
+        self.messages = [
+            Message.objects.create(match=match, sender=pet_a.owner, content=content)
+            for content in ('oi', 'olá, "tudo"\nbem?')
+        ]
+        self.staff = Client()
+        self.staff.force_login(User.objects.create_user('staff', is_staff=True))
+
+    def export(self, kind, export_format, **params):
+        response = self.staff.get(f'/api/export/{kind}/', {'format': export_format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], f'{EXPORT_FORMATS[export_format]}; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{kind}.{export_format}"')
+        content = b''.join(response.streaming_content).decode()
+        if export_format == 'csv':
+            reader = csv.reader(io.StringIO(content))
+            self.assertEqual(next(reader), export_fields(kind))
+            return [dict(zip(export_fields(kind), row)) for row in reader]
+        rows = [json.loads(line) for line in content.splitlines()]
+        for row in rows:
+            self.assertEqual(list(row), export_fields(kind))
+        return rows
+
+    def test_every_kind_in_both_formats(self):
+        counts = {'swipes': 2, 'matches': 1, 'messages': 2, 'passes': 1}
+        self.assertEqual(set(counts), set(EXPORTS))
+        for kind, count in counts.items():
+            rows = self.export(kind, 'jsonl')
+            self.assertEqual(len(rows), count, kind)
+            # O CSV tem as mesmas linhas, com os valores em texto (None vira vazio)
+            self.assertEqual(self.export(kind, 'csv'), [
+                {field: '' if value is None else str(value) for field, value in row.items()} for row in rows
+            ])
+
+        swipe = self.export('swipes', 'jsonl')[0]
+        self.assertIs(swipe['liked'], True)
+        self.assertEqual(parse_bound(swipe['timestamp']), Swipe.objects.order_by('id')[0].timestamp)
+        # Vírgula, aspas, quebra de linha e acentos sobrevivem aos dois formatos
+        for export_format in EXPORT_FORMATS:
+            contents = [row['content'] for row in self.export('messages', export_format)]
+            self.assertEqual(contents, [message.content for message in self.messages])
+
+    def test_filters_and_errors(self):
+        rows = self.export('messages', 'jsonl', since_id=self.messages[0].id)
+        self.assertEqual([row['id'] for row in rows], [self.messages[1].id])
+        start = (self.messages[0].timestamp + timedelta(days=1)).isoformat()
+        self.assertEqual(self.export('messages', 'csv', start=start), [])
+
+        for kind, params in [('likes', {}), ('swipes', {'format': 'xml'}), ('swipes', {'start': 'ontem'}),
+                             ('swipes', {'since_id': 'x'})]:
+            response = self.staff.get(f'/api/export/{kind}/', params)
+            self.assertEqual(response.status_code, 400, (kind, params))
+            self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(self.client.get('/api/export/swipes/').status_code, 403)
+
+
+class MessageSearchTests(TransactionTestCase):
+    """Busca FTS5 nas conversas (accounts/search.py e SearchMessagesView)"""
+
+    def search(self, client, text, cursor=None):
+        data = {'q': text}
+        if cursor:
+            data['cursor'] = cursor
+        return client.get('/api/messages/search/', data)
+
+    def setUp(self):
+        self.pet_a, self.client_a = make_pet('a')
+        pet_b, _ = make_pet('b')
+        pet_c, self.client_c = make_pet('c')
+        self.match = Match.objects.create(pet1=self.pet_a, pet2=pet_b)
+        other = Match.objects.create(pet1=pet_b, pet2=pet_c)
+        self.first = Message.objects.create(match=self.match, sender=self.pet_a.owner, content='Vamos ao parque <amanhã>?')
+        Message.objects.create(match=self.match, sender=pet_b.owner, content='Você gosta de parquinhos')
+        Message.objects.create(match=other, sender=pet_c.owner, content='Parque no sábado')
+
+    def test_results_are_scoped_and_highlighted(self):
+        response = self.search(self.client_a, 'parq')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['match_id'] for result in results], [self.match.id] * 2)
+        first = next(result for result in results if result['id'] == self.first.id)
+        self.assertIn('<mark>parque</mark> &lt;amanhã&gt;?', first['snippet'])
+        self.assertTrue(first['is_mine'])
+        # Acentos e caixa não importam
+        self.assertEqual(len(self.search(self.client_a, 'VOCE').json()['results']), 1)
+        self.assertEqual(len(self.search(self.client_c, 'parque').json()['results']), 1)
+        # A sintaxe do FTS5 não passa do usuário
+        response = self.search(self.client_a, '"parque* OR')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 0)
+        self.assertEqual(self.search(self.client_a, '').status_code, 400)
+
+    def test_pagination_and_index_follows_deletes(self):
+        for index in range(5):
+            Message.objects.create(match=self.match, sender=self.pet_a.owner, content=f'parque {index}')
+        seen, cursor = [], None
+        while True:
+            results, cursor = search_messages(self.pet_a.owner_id, 'parque', cursor, limit=3)
+            seen += [message.id for message, _ in results]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+
+        self.first.delete()
+        self.assertEqual(len(self.search(self.client_a, 'amanha').json()['results']), 0)
+        # O comando refaz o índice com as mensagens que existem
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM accounts_message_search')
+        call_command('rebuild_message_search', stdout=io.StringIO())
+        self.assertEqual(len(self.search(self.client_a, 'parque').json()['results']), 5)
+
+
+class StaticAssetTests(TransactionTestCase):
+    """Estáticos com hash, pré-comprimidos e com cache imutável (accounts/assets.py e StaticAssetView)"""
+
+    def test_repeat_page_load_needs_no_static_bytes(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            html = self.client.get('/login/').content.decode()
+            urls = re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+            self.assertTrue(urls)
+            for url in urls:
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+                self.assertEqual(response.status_code, 200, url)
+                self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+                response.close()
+                # Mesmo se o navegador revalidar, não volta nenhum byte
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+            # Nome sem hash: revalida sempre; sem Accept-Encoding vai sem compressão
+            response = self.client.get('/static/css/style.css')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            response.close()
+            self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    @override_settings(DEBUG=False)
+    def test_pages_render_without_collectstatic(self):
+        pet_a, client = make_pet('a')
+        pet_b, _ = make_pet('b')
+        Match.objects.create(pet1=pet_a, pet2=pet_b)
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            for url in ('/swipe/', '/matches/', '/login/'):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                # Sem manifesto: nome sem hash
+                self.assertIn('/static/css/style.css', response.content.decode())
+
+
+class MediaServingTests(TransactionTestCase):
+    """Mídia com ETag, Range e entrega pelo proxy (MediaView)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        os.makedirs(os.path.join(media_root.name, 'pet_photos'))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(media_root.name, 'pet_photos', 'rex.jpg'), 'wb') as photo:
+            photo.write(self.content)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get(self, **headers):
+        response = self.client.get('/media/pet_photos/rex.jpg', **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_and_conditional_responses(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['Cache-Control'].startswith('public, max-age='))
+        self.assertFalse(response.has_header('Vary'))
+
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified)[0].status_code, 304)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/pet_photos/missing.jpg').status_code, 404)
+
+    def test_range_requests(self):
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+
+        self.assertEqual(self.get(HTTP_RANGE='bytes=1000-')[1], self.content[1000:])
+        self.assertEqual(self.get(HTTP_RANGE='bytes=-24')[1], self.content[-24:])
+        self.assertEqual(self.get(HTTP_RANGE='bytes=1000-5000')[1], self.content[1000:])
+
+        response, _ = self.get(HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+        # Vários intervalos ou If-Range de outra versão: o arquivo inteiro
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6')[0].status_code, 200)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"outra"')[0].status_code, 200)
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)[0].status_code, 206)
+
+    def test_proxy_sends_the_bytes(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='x-accel-redirect'):
+            response, body = self.get()
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/pet_photos/rex.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        with override_settings(MEDIA_ACCEL_REDIRECT='x-sendfile'):
+            response, body = self.get()
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'pet_photos', 'rex.jpg'))
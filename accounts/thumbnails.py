@@ -0,0 +1,150 @@
+# Pipeline de imagens derivadas (variantes) das fotos enviadas pelos usuários.
+# Cada upload de PetPhoto.image ou Owner.profile_picture gera versões
+# redimensionadas e recomprimidas (WebP e JPEG) em segundo plano, num pool
+# de threads, para que os celulares não baixem o arquivo original.
+# Os templates escolhem a variante com a tag {% picture %} (templatetags/media_variants.py).
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .fragments import invalidate_fragments
+
+# nome -> (largura, altura, recortar no quadrado?)
+VARIANTS = {
+    'card': (800, 800, False),    # cards do swipe e fotos da página do pet
+    'thumb': (400, 400, False),   # lista de matches
+    'avatar': (160, 160, True),   # cabeçalho do chat e fotos de perfil
+}
+
+# extensão -> (formato do Pillow, opções de compressão)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Campo booleano que indica se as variantes já existem, por modelo/campo de imagem
+READY_FIELDS = {
+    ('accounts.PetPhoto', 'image'): 'variants_ready',
+    ('accounts.Owner', 'profile_picture'): 'picture_variants_ready',
+}
+
+logger = logging.getLogger('accounts.thumbnails')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def variant_name(name, variant, ext):
+    """
+    pet_photos/rex.png -> pet_photos/variants/rex.png__card.webp
+    O nome inteiro do original (com a extensão) entra no nome da variante:
+    rex.png e rex.jpg não podem gravar uma por cima da outra.
+    """
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, 'variants', f'{filename}__{variant}.{ext}')
+
+
+def variant_url(field_file, variant, ext='jpg', ready=True):
+    """URL da variante, ou do arquivo original se as variantes ainda não foram geradas"""
+    if not field_file:
+        return None
+    if not ready:
+        return field_file.url
+    return field_file.storage.url(variant_name(field_file.name, variant, ext))
+
+
+def build_variants(field_file):
+    """Gera (ou regera) todas as variantes de um arquivo de imagem"""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        original = Image.open(source)
+        # Respeita a rotação gravada pela câmera no EXIF
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    for variant, (width, height, crop) in VARIANTS.items():
+        if crop:
+            image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            image = original.copy()
+            image.thumbnail((width, height), Image.LANCZOS)
+
+        for ext, (image_format, options) in FORMATS.items():
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                output_image = image.convert('RGB')
+            else:
+                output_image = image
+            buffer = BytesIO()
+            output_image.save(buffer, image_format, **options)
+
+            name = variant_name(field_file.name, variant, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_and_mark(model_label, pk, field_name):
+    """Gera as variantes de um objeto e marca o campo "pronto" correspondente"""
+    model = apps.get_model(model_label)
+    ready_field = READY_FIELDS[(model_label, field_name)]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    build_variants(field_file)
+    # update() direto: só muda a flag, sem disparar o save() completo
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{ready_field: True})
+    if updated:
+        # Fragmentos cacheados ainda apontam para o arquivo original
+        invalidate_fragments(instance)
+
+
+def _run_in_worker(model_label, pk, field_name):
+    try:
+        build_and_mark(model_label, pk, field_name)
+    finally:
+        # Threads do pool não passam pelo ciclo de request, então fecham a conexão aqui
+        close_old_connections()
+
+
+def _log_failure(model_label, pk, field_name, future):
+    # Sem isso a exceção ficaria guardada no Future, que ninguém consulta
+    error = future.exception()
+    if error is not None:
+        logger.error(
+            'Falha ao gerar as variantes de %s %s (%s)', model_label, pk, field_name,
+            exc_info=(type(error), error, error.__traceback__),
+        )
+
+
+def submit_variants(model_label, pk, field_name):
+    """Gera as variantes no pool de threads; falhas vão para o logger accounts.thumbnails"""
+    future = _get_executor().submit(_run_in_worker, model_label, pk, field_name)
+    future.add_done_callback(partial(_log_failure, model_label, pk, field_name))
+    return future
+
+
+def queue_variants(instance, field_name):
+    """Agenda a geração das variantes para depois do commit da transação atual"""
+    model_label = instance._meta.label
+    pk = instance.pk
+    transaction.on_commit(lambda: submit_variants(model_label, pk, field_name))
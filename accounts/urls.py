@@ -1,13 +1,22 @@
 # ESSE ARQUIVO É RESPONSÁVEL POR GERENCIAR AS ROTAS (URLS) DO APLICATIVO ACCOUNTS
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 # Importação das nossas Views
 from .views import (
     SignUpView, HomeView, PetCreateView, PetDetailView, OwnerDetailView,
-    OwnerUpdateView, PetUpdateView, SwipeView, ProcessSwipeView, MatchesView,
-    ChatView, SendMessageView, GetNewMessagesView
+    OwnerUpdateView, PetUpdateView, PetPrimaryPhotoView, SwipeView, DeckView, ProcessSwipeView, ProcessSwipeBatchView, MatchesView,
+    ChatView, SendMessageView, GetNewMessagesView, MessageHistoryView, ChatStreamView, CacheStatsView,
+    MetricsView, ExportView, AsyncProcessSwipeView, AsyncSendMessageView, AsyncGetNewMessagesView,
+    SearchMessagesView
 )
 
+
+def api_view(sync_view, async_view):
+    # Sob ASGI (settings.ASYNC_API_VIEWS) usa a versão async da view
+    return (async_view if settings.ASYNC_API_VIEWS else sync_view).as_view()
+
+
 # Definição das rotas URL para o app de contas
 # Cada rota mapeia uma URL para uma View específica
 # Exemplo: 'login/' mapeia para a view de login padrão do Django
@@ -33,10 +42,19 @@ urlpatterns = [
     path('profile/<int:pk>/', OwnerDetailView.as_view(), name='owner_detail'),
     path('profile/edit/', OwnerUpdateView.as_view(), name='owner_edit'),
     path('pet/<int:pk>/edit/', PetUpdateView.as_view(), name='pet_edit'),
+    path('pet/<int:pk>/photo/<int:photo_pk>/primary/', PetPrimaryPhotoView.as_view(), name='pet_primary_photo'),
     path('swipe/', SwipeView.as_view(), name='swipe'),
-    path('api/swipe/', ProcessSwipeView.as_view(), name='process_swipe'),
+    path('api/deck/', DeckView.as_view(), name='deck'),
+    path('api/swipe/', api_view(ProcessSwipeView, AsyncProcessSwipeView), name='process_swipe'),
+    path('api/swipe/batch/', ProcessSwipeBatchView.as_view(), name='process_swipe_batch'),
     path('matches/', MatchesView.as_view(), name='matches'),
     path('chat/<int:pk>/', ChatView.as_view(), name='chat'),
-    path('api/send-message/', SendMessageView.as_view(), name='send_message'),
-    path('api/get-messages/', GetNewMessagesView.as_view(), name='get_messages'),
+    path('api/send-message/', api_view(SendMessageView, AsyncSendMessageView), name='send_message'),
+    path('api/get-messages/', api_view(GetNewMessagesView, AsyncGetNewMessagesView), name='get_messages'),
+    path('api/messages/history/', MessageHistoryView.as_view(), name='message_history'),
+    path('api/messages/search/', SearchMessagesView.as_view(), name='message_search'),
+    path('api/chat-stream/', ChatStreamView.as_view(), name='chat_stream'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/export/<str:kind>/', ExportView.as_view(), name='export'),
 ]
\ No newline at end of file
@@ -1,3 +1,4 @@
 from .auth_views import *
 from .profile_views import *
-from .api_views import *
\ No newline at end of file
+from .api_views import *
+from .asset_views import *
\ No newline at end of file
@@ -1,74 +1,144 @@
 # Django Imports
 from django.views.generic.base import TemplateView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import DetailView, ListView
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseNotModified, Http404
+from django.core.handlers.asgi import ASGIRequest
 from django.views import View
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Q, F, Count
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from asgiref.sync import sync_to_async
+import asyncio
 import json
 
 # App-specific Imports
-from ..models import Pet, Owner, Swipe, Match, Message
+from ..models import Pet, Swipe, Match, Message
+from ..pubsub import chat_channel, is_shared, publish, subscribe
+from ..chat import (
+    latest_message_id, set_latest_message_id, get_message_page, serialize_message, advance_read_cursor,
+    alatest_message_id, aset_latest_message_id, aadvance_read_cursor
+)
+from ..deck import get_deck_page, serialize_pet_card, consume_candidates
+from ..swipes import record_swipe
+from ..passes import add_passes
+from ..pagination import InvalidCursor
+from ..search import SearchUnavailable, search_messages
+from ..fragments import get_fragment_stats
+from ..metrics import registry as metrics_registry
+from ..export import FORMATS as EXPORT_FORMATS, ExportError, iter_export, parse_bound
+from ..routers import ReadReplicaMixin
 
 # --- Views de API (Swipe, Match, Chat) ---
 
-class SwipeView(LoginRequiredMixin, ListView):
+# As views mais chamadas (swipe e chat) têm uma versão async (prefixo Async)
+# usada sob ASGI (settings.ASYNC_API_VIEWS, ligado pelo latinder_proj/asgi.py):
+# enquanto esperam o banco ou o cache não ocupam o event loop. Sob WSGI ficam
+# as síncronas, já que lá cada view async custaria um event loop por request.
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin para views com handlers async"""
+    async def dispatch(self, request, *args, **kwargs):
+        # request.user já foi carregado pelo ActivePetMiddleware
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+async def aget_object_or_404(model, **kwargs):
+    """get_object_or_404 para views async (o Django só tem o seu a partir da 5.0)"""
+    try:
+        return await model.objects.aget(**kwargs)
+    except model.DoesNotExist:
+        raise Http404(f'No {model._meta.object_name} matches the given query.')
+
+
+def parse_match_id(value):
+    """match_id recebido na query string, ou None se não for um id válido"""
+    try:
+        match_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return match_id if match_id > 0 else None
+
+
+class SwipeView(LoginRequiredMixin, ReadReplicaMixin, ListView):
     model = Pet
     template_name = 'swipe.html'
     context_object_name = 'pets_to_swipe' 
     
     def get_queryset(self):
-        try:
-            user_pet = self.request.user.owner.pet_set.first()
-        except (Owner.DoesNotExist, AttributeError):
-            return Pet.objects.none()
-        
-        if not user_pet:
+        # Apenas a primeira página do deck é renderizada no HTML;
+        # as próximas são buscadas pelo swipe.js através do DeckView
+        self.next_cursor = None
+        # Pet ativo resolvido pelo ActivePetMiddleware
+        user_pet_id = self.request.active_pet_id
+        if not user_pet_id:
             return Pet.objects.none()
 
-        swiped_pet_ids = Swipe.objects.filter(swiper=user_pet).values_list('swiped_id', flat=True)
-        queryset = Pet.objects.exclude(id=user_pet.id).exclude(id__in=swiped_pet_ids)
-    
-        return queryset
+        pets, self.next_cursor = get_deck_page(user_pet_id)
+        return pets
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['swipe_batch_mode'] = getattr(settings, 'SWIPE_BATCH_MODE', False)
+        return context
+
+class DeckView(LoginRequiredMixin, ReadReplicaMixin, View):
+    """Retorna uma página de cards do deck em JSON (paginação por cursor)"""
+    def get(self, request, *args, **kwargs):
+        user_pet_id = request.active_pet_id
+        if not user_pet_id:
+            return JsonResponse({'status': 'error', 'message': 'User has no pet.'}, status=400)
+
+        try:
+            pets, next_cursor = get_deck_page(user_pet_id, request.GET.get('cursor'))
+        except InvalidCursor as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+        return JsonResponse({
+            'status': 'success',
+            'pets': [serialize_pet_card(pet) for pet in pets],
+            'next_cursor': next_cursor,
+        })
     
 class ProcessSwipeView(LoginRequiredMixin, View):
     """View para processar swipes e detectar matches"""
     def post(self, request, *args, **kwargs):
         try:
-            swiper_pet = request.user.owner.pet_set.first()
-            if not swiper_pet:
+            swiper_pet_id = request.active_pet_id
+            if not swiper_pet_id:
                 return JsonResponse({'status': 'error', 'message': 'User has no pet.'}, status=400)
 
             data = json.loads(request.body)
-            swiped_pet_id = data.get('swiped_pet_id')
-            liked = data.get('liked')
+            # Swipe, fila do deck e match numa só transação (accounts/swipes.py)
+            match_occurred = record_swipe(swiper_pet_id, data.get('swiped_pet_id'), data.get('liked'))
+            
+            return JsonResponse({
+                'status': 'success',
+                'match': match_occurred
+            })
 
-            swiped_pet = Pet.objects.get(id=swiped_pet_id)
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-            Swipe.objects.create(
-                swiper=swiper_pet,
-                swiped=swiped_pet,
-                liked=liked
+class AsyncProcessSwipeView(AsyncLoginRequiredMixin, ProcessSwipeView):
+    """Versão async do ProcessSwipeView (ASGI)"""
+    async def post(self, request, *args, **kwargs):
+        try:
+            swiper_pet_id = request.active_pet_id
+            if not swiper_pet_id:
+                return JsonResponse({'status': 'error', 'message': 'User has no pet.'}, status=400)
+
+            data = json.loads(request.body)
+            # A transação inteira numa só ida à thread do banco
+            match_occurred = await sync_to_async(record_swipe)(
+                swiper_pet_id, data.get('swiped_pet_id'), data.get('liked')
             )
-            
-            match_occurred = False
-            if liked:
-                reciprocal_like = Swipe.objects.filter(
-                    swiper=swiped_pet,
-                    swiped=swiper_pet,
-                    liked=True
-                ).exists()
-                
-                if reciprocal_like:
-                    pet1, pet2 = sorted([swiper_pet.id, swiped_pet.id])
-                    Match.objects.get_or_create(
-                        pet1_id=pet1,
-                        pet2_id=pet2
-                    )
-                    match_occurred = True
-            
+
             return JsonResponse({
                 'status': 'success',
                 'match': match_occurred
@@ -77,34 +147,139 @@ class ProcessSwipeView(LoginRequiredMixin, View):
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-class MatchesView(LoginRequiredMixin, TemplateView):
+class ProcessSwipeBatchView(LoginRequiredMixin, View):
+    """
+    View para processar vários swipes de uma vez (modo em lote do swipe.js).
+    Corpo: {"swipes": [{"swiped_pet_id": 1, "liked": true}, ...]} em ordem.
+    Ids de pets que não existem são ignorados; os demais swipes do lote valem.
+    """
+    # Limite de swipes por requisição
+    max_batch_size = 100
+    invalid_batch_message = 'Invalid swipe batch.'
+
+    def parse_swipes(self, body):
+        """
+        Valida o formato do corpo e retorna a lista de (swiped_pet_id, liked).
+        Levanta ValueError para qualquer corpo fora do formato (sem detalhes,
+        que não voltam para o cliente).
+        """
+        try:
+            data = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ValueError('JSON inválido')
+        swipes = data.get('swipes') if isinstance(data, dict) else None
+        if not isinstance(swipes, list) or len(swipes) > self.max_batch_size:
+            raise ValueError('Lista de swipes ausente ou grande demais')
+
+        parsed = []
+        for item in swipes:
+            if not isinstance(item, dict):
+                raise ValueError('Swipe não é um objeto')
+            pet_id, liked = item.get('swiped_pet_id'), item.get('liked')
+            # O id pode vir como texto só de dígitos (versões do swipe.js que
+            # mandavam o data-pet-id direto); bool é subclasse de int, mas
+            # true/false não são ids
+            if isinstance(pet_id, str) and pet_id.isascii() and pet_id.isdigit():
+                pet_id = int(pet_id)
+            if not isinstance(pet_id, int) or isinstance(pet_id, bool) or not isinstance(liked, bool):
+                raise ValueError('Swipe com campos inválidos')
+            parsed.append((pet_id, liked))
+        return parsed
+
+    def post(self, request, *args, **kwargs):
+        swiper_pet_id = request.active_pet_id
+        if not swiper_pet_id:
+            return JsonResponse({'status': 'error', 'message': 'User has no pet.'}, status=400)
+
+        try:
+            swipes = self.parse_swipes(request.body)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': self.invalid_batch_message}, status=400)
+
+        # A lista vem em ordem: se o mesmo pet aparece duas vezes, vale a última decisão
+        decisions = dict(swipes)
+        decisions.pop(swiper_pet_id, None)
+
+        # Ignora ids de pets que não existem (uma consulta só)
+        existing_ids = set(Pet.objects.filter(id__in=decisions).values_list('id', flat=True))
+        decisions = {pet_id: liked for pet_id, liked in decisions.items() if pet_id in existing_ids}
+
+        with transaction.atomic():
+            liked_ids = [pet_id for pet_id, liked in decisions.items() if liked]
+            passed_ids = [pet_id for pet_id, liked in decisions.items() if not liked]
+            # Likes em lote; um like repetido não duplica (restrição unique_swipe)
+            Swipe.objects.bulk_create(
+                [Swipe(swiper_id=swiper_pet_id, swiped_id=pet_id, liked=True) for pet_id in liked_ids],
+                update_conflicts=True,
+                unique_fields=['swiper', 'swiped'],
+                update_fields=['liked'],
+            )
+            # Passes vão para o blob do pet (accounts/passes.py) e desfazem likes anteriores
+            if passed_ids:
+                Swipe.objects.filter(swiper_id=swiper_pet_id, swiped_id__in=passed_ids).delete()
+                add_passes(swiper_pet_id, passed_ids)
+            consume_candidates(swiper_pet_id, list(decisions))
+
+            # Uma única consulta encontra todos os likes recíprocos do lote
+            matched_ids = list(Swipe.objects.filter(
+                swiper_id__in=liked_ids,
+                swiped_id=swiper_pet_id,
+                liked=True
+            ).values_list('swiper_id', flat=True))
+
+            Match.objects.bulk_create(
+                [Match(pet1_id=min(swiper_pet_id, pet_id), pet2_id=max(swiper_pet_id, pet_id))
+                 for pet_id in matched_ids],
+                ignore_conflicts=True,
+            )
+
+        return JsonResponse({
+            'status': 'success',
+            'processed': len(decisions),
+            'matches': matched_ids
+        })
+
+class MatchesView(LoginRequiredMixin, ReadReplicaMixin, TemplateView):
     """View para exibir a lista de matches do usuário"""
     template_name = 'matches.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data( **kwargs)
         
-        try:
-            user_pet = self.request.user.owner.pet_set.first()
-        except (Owner.DoesNotExist, AttributeError):
-            context['matches'] = []
-            return context
-        
-        if not user_pet:
+        user_pet_id = self.request.active_pet_id
+        if not user_pet_id:
             context['matches'] = []
             return context
         
+        # Uma única consulta: pets, fotos, última mensagem e contagem de não lidas,
+        # ordenada pela atividade mais recente (custa o mesmo com 5 ou 5.000 matches)
         matches = Match.objects.filter(
-            models.Q(pet1=user_pet) | models.Q(pet2=user_pet)
-        ).select_related('pet1', 'pet2', 'pet1__owner__user', 'pet2__owner__user')
+            models.Q(pet1_id=user_pet_id) | models.Q(pet2_id=user_pet_id)
+        ).select_related(
+            'pet1__primary_photo', 'pet2__primary_photo', 'pet1__owner__user', 'pet2__owner__user',
+            'last_message'
+        ).annotate(
+            unread_count=Count(
+                'messages',
+                # Não lidas: mensagens do outro lado depois do meu cursor de leitura
+                filter=~Q(messages__sender_id=self.request.owner_id) & (
+                    Q(pet1_id=user_pet_id, messages__id__gt=F('pet1_last_read_id')) |
+                    Q(pet2_id=user_pet_id, messages__id__gt=F('pet2_last_read_id'))
+                )
+            ),
+            last_activity=Coalesce('last_message_at', 'created_at'),
+        ).order_by('-last_activity', '-id')
         
         matched_pets = []
         for match in matches:
-            other_pet = match.pet2 if match.pet1 == user_pet else match.pet1
+            other_pet = match.pet2 if match.pet1_id == user_pet_id else match.pet1
             matched_pets.append({
                 'match': match,
                 'pet': other_pet,
-                'match_date': match.created_at
+                'match_date': match.created_at,
+                'last_message': match.last_message,
+                'unread_count': match.unread_count,
+                'last_activity': match.last_activity
             })
         
         context['matches'] = matched_pets
@@ -117,24 +292,34 @@ class ChatView(LoginRequiredMixin, DetailView):
     context_object_name = 'match'
     
     def get_queryset(self):
-        user_pet = self.request.user.owner.pet_set.first()
+        user_pet_id = self.request.active_pet_id
         return Match.objects.filter(
-            Q(pet1=user_pet) | Q(pet2=user_pet)
-        )
+            Q(pet1_id=user_pet_id) | Q(pet2_id=user_pet_id)
+        ).select_related('pet1__primary_photo', 'pet2__primary_photo', 'pet1__owner__user', 'pet2__owner__user')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        match = self.get_object()
+        match = self.object
         
-        user_pet = self.request.user.owner.pet_set.first()
-        other_pet = match.pet2 if match.pet1 == user_pet else match.pet1
+        other_pet = match.pet2 if match.pet1_id == self.request.active_pet_id else match.pet1
         context['other_pet'] = other_pet
         
-        context['messages'] = match.messages.all()
+        # Só a página mais recente; as anteriores vêm do MessageHistoryView (rolando para cima)
+        messages, older_cursor = get_message_page(match.id)
+        context['messages'] = messages
+        context['older_cursor'] = older_cursor
+        context['last_message_id'] = messages[-1].id if messages else 0
+        # O canal de push (SSE) só existe quando o projeto roda sob ASGI
+        context['push_enabled'] = (
+            getattr(settings, 'CHAT_PUSH_ENABLED', False) and isinstance(self.request, ASGIRequest)
+        )
         
-        match.messages.exclude(
-            sender=self.request.user.owner
-        ).update(is_read=True)
+        # Abrir o chat lê tudo até a última mensagem exibida
+        advance_read_cursor(
+            match.id,
+            Match.last_read_field(self.request.active_pet_id, match.pet1_id),
+            context['last_message_id']
+        )
         
         return context
 
@@ -154,35 +339,95 @@ class SendMessageView(LoginRequiredMixin, View):
                 }, status=400)
             
             match = get_object_or_404(Match, id=match_id)
-            user_pet = request.user.owner.pet_set.first()
             
-            if match.pet1 != user_pet and match.pet2 != user_pet:
+            if request.active_pet_id not in (match.pet1_id, match.pet2_id):
                 return JsonResponse({
                     'status': 'error',
                     'message': 'Acesso negado'
                 }, status=403)
             
+            message = self.save_message(match, request.owner_id, content)
+
+            # Nova versão do chat: os próximos polls deste match vão ao banco
+            set_latest_message_id(match.id, message.id)
+
+            return self.sent_response(request, match, message)
+            
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=400)
+
+    @staticmethod
+    def save_message(match, owner_id, content):
+        with transaction.atomic():
             message = Message.objects.create(
                 match=match,
-                sender=request.user.owner,
+                sender_id=owner_id,
                 content=content
             )
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': {
-                    'id': message.id,
-                    'content': message.content,
-                    'sender': message.sender.user.username,
-                    
-                    # ***** MUDANÇA 1/2 *****
-                    # Trocado de .strftime('%H:%M') para .isoformat()
-                    'timestamp': message.timestamp.isoformat(),
-                    
-                    'is_mine': True
-                }
-            })
-            
+            # Prévia e ordenação da lista de matches (MatchesView)
+            Match.objects.filter(pk=match.pk).update(
+                last_message=message,
+                last_message_at=message.timestamp
+            )
+        return message
+
+    def sent_response(self, request, match, message):
+        # Empurra a mensagem para quem está com o chat aberto (ChatStreamView)
+        publish(chat_channel(match.id), {
+            'id': message.id,
+            'content': message.content,
+            'sender': request.user.username,
+            'sender_id': message.sender_id,
+            'timestamp': message.timestamp.isoformat(),
+        })
+        
+        return JsonResponse({
+            'status': 'success',
+            'message': {
+                'id': message.id,
+                'content': message.content,
+                'sender': request.user.username,
+                
+                # ***** MUDANÇA 1/2 *****
+                # Trocado de .strftime('%H:%M') para .isoformat()
+                'timestamp': message.timestamp.isoformat(),
+                
+                'is_mine': True
+            }
+        })
+
+class AsyncSendMessageView(AsyncLoginRequiredMixin, SendMessageView):
+    """Versão async do SendMessageView (ASGI)"""
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            match_id = data.get('match_id')
+            content = data.get('content', '').strip()
+
+            if not content:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Mensagem vazia'
+                }, status=400)
+
+            match = await aget_object_or_404(Match, id=match_id)
+
+            if request.active_pet_id not in (match.pet1_id, match.pet2_id):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Acesso negado'
+                }, status=403)
+
+            # A transação inteira numa só ida à thread do banco
+            message = await sync_to_async(self.save_message)(match, request.owner_id, content)
+
+            await aset_latest_message_id(match.id, message.id)
+
+            return self.sent_response(request, match, message)
+
         except Exception as e:
             return JsonResponse({
                 'status': 'error',
@@ -198,41 +443,291 @@ class GetNewMessagesView(LoginRequiredMixin, View):
             last_message_id = request.GET.get('last_message_id', 0)
             
             match = get_object_or_404(Match, id=match_id)
-            user_pet = request.user.owner.pet_set.first()
             
-            if match.pet1 != user_pet and match.pet2 != user_pet:
+            if request.active_pet_id not in (match.pet1_id, match.pet2_id):
                 return JsonResponse({
                     'status': 'error',
                     'message': 'Acesso negado'
                 }, status=403)
             
-            new_messages = match.messages.filter(
+            # Caminho rápido: se a última mensagem do match (do cache, ou do
+            # índice sem cache compartilhado) já é conhecida pelo cliente, não
+            # há nada novo. Responde 304 sem ler as mensagens nem fazer o
+            # UPDATE de "lida".
+            if latest_message_id(match.id) <= int(last_message_id):
+                return HttpResponseNotModified()
+
+            new_messages = list(match.messages.filter(
                 id__gt=last_message_id
-            ).select_related('sender__user')
+            ).select_related('sender__user'))
             
-            new_messages.exclude(
-                sender=request.user.owner
-            ).update(is_read=True)
-            
-            messages_data = [{
-                'id': msg.id,
-                'content': msg.content,
-                'sender': msg.sender.user.username,
-                
-                # ***** MUDANÇA 2/2 *****
-                # Trocado de .strftime('%H:%M') para .isoformat()
-                'timestamp': msg.timestamp.isoformat(),
-                
-                'is_mine': msg.sender == request.user.owner
-            } for msg in new_messages]
+            if new_messages:
+                advance_read_cursor(
+                    match.id,
+                    Match.last_read_field(request.active_pet_id, match.pet1_id),
+                    new_messages[-1].id
+                )
             
             return JsonResponse({
                 'status': 'success',
-                'messages': messages_data
+                'messages': [serialize_message(msg, request.owner_id) for msg in new_messages]
             })
             
         except Exception as e:
             return JsonResponse({
                 'status': 'error',
                 'message': str(e)
-            }, status=400)
\ No newline at end of file
+            }, status=400)
+
+class AsyncGetNewMessagesView(AsyncLoginRequiredMixin, GetNewMessagesView):
+    """Versão async do GetNewMessagesView (ASGI): o caminho do 304 só consulta o cache"""
+    async def get(self, request, *args, **kwargs):
+        try:
+            match_id = request.GET.get('match_id')
+            last_message_id = request.GET.get('last_message_id', 0)
+
+            match = await aget_object_or_404(Match, id=match_id)
+
+            if request.active_pet_id not in (match.pet1_id, match.pet2_id):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Acesso negado'
+                }, status=403)
+
+            if await alatest_message_id(match.id) <= int(last_message_id):
+                return HttpResponseNotModified()
+
+            new_messages = [msg async for msg in match.messages.filter(
+                id__gt=last_message_id
+            ).select_related('sender__user')]
+
+            if new_messages:
+                await aadvance_read_cursor(
+                    match.id,
+                    Match.last_read_field(request.active_pet_id, match.pet1_id),
+                    new_messages[-1].id
+                )
+
+            return JsonResponse({
+                'status': 'success',
+                'messages': [serialize_message(msg, request.owner_id) for msg in new_messages]
+            })
+
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=400)
+
+
+class MessageHistoryView(LoginRequiredMixin, ReadReplicaMixin, View):
+    """Retorna páginas mais antigas de um chat (paginação por cursor, de trás para frente)"""
+    
+    def get(self, request, *args, **kwargs):
+        match_id = parse_match_id(request.GET.get('match_id'))
+        if match_id is None:
+            return JsonResponse({'status': 'error', 'message': 'match_id inválido'}, status=400)
+        match = get_object_or_404(Match, id=match_id)
+        
+        if request.active_pet_id not in (match.pet1_id, match.pet2_id):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Acesso negado'
+            }, status=403)
+        
+        try:
+            messages, older_cursor = get_message_page(match.id, request.GET.get('cursor'))
+        except InvalidCursor as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        
+        return JsonResponse({
+            'status': 'success',
+            'messages': [serialize_message(msg, request.owner_id) for msg in messages],
+            'next_cursor': older_cursor
+        })
+
+
+class SearchMessagesView(LoginRequiredMixin, ReadReplicaMixin, View):
+    """
+    Busca nas conversas do dono (índice FTS5, ver accounts/search.py).
+    GET ?q=texto[&cursor=...]: mensagens por relevância, com o trecho destacado.
+    """
+    def get(self, request, *args, **kwargs):
+        if not request.owner_id:
+            return JsonResponse({'status': 'error', 'message': 'User has no profile.'}, status=400)
+        text = request.GET.get('q', '').strip()
+        if not text:
+            return JsonResponse({'status': 'error', 'message': 'Empty query.'}, status=400)
+
+        try:
+            results, next_cursor = search_messages(request.owner_id, text, request.GET.get('cursor'))
+        except InvalidCursor as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        except SearchUnavailable as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+
+        return JsonResponse({
+            'status': 'success',
+            'results': [
+                {**serialize_message(message, request.owner_id), 'match_id': message.match_id, 'snippet': snippet}
+                for message, snippet in results
+            ],
+            'next_cursor': next_cursor,
+        })
+
+
+class ChatStreamView(View):
+    """
+    Canal de push (Server-Sent Events) com as mensagens novas de um match.
+    Só é servido sob ASGI (latinder_proj/asgi.py); sob WSGI responde 503 e o
+    chat.js continua usando o polling do GetNewMessagesView.
+    """
+    # Duração máxima de uma conexão; o EventSource reconecta sozinho
+    # mandando o Last-Event-ID, então nenhuma mensagem se perde
+    max_stream_seconds = 300
+    # Intervalo dos comentários de keepalive (evita timeout de proxies). Com
+    # um backend de pub/sub que não é compartilhado entre os processos, é
+    # também o atraso máximo de uma mensagem salva em outro worker
+    keepalive_seconds = 15
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest) or not getattr(settings, 'CHAT_PUSH_ENABLED', False):
+            return JsonResponse({'status': 'error', 'message': 'Push indisponível'}, status=503)
+
+        match_id = parse_match_id(request.GET.get('match_id'))
+        if match_id is None:
+            return JsonResponse({'status': 'error', 'message': 'match_id inválido'}, status=400)
+        owner_id, match_id, read_field = await sync_to_async(self.authorize)(request, match_id)
+        if owner_id is None:
+            return JsonResponse({'status': 'error', 'message': 'Acesso negado'}, status=403)
+
+        try:
+            last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_message_id') or 0)
+        except ValueError:
+            last_id = 0
+
+        response = StreamingHttpResponse(
+            self.event_stream(match_id, owner_id, read_field, last_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Desliga o buffer do nginx para os eventos saírem na hora
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def authorize(self, request, match_id):
+        """
+        Retorna (owner_id, match_id, campo do cursor de leitura) se o usuário
+        participa do match, senão (None, None, None)
+        """
+        if not request.user.is_authenticated:
+            return None, None, None
+        match = get_object_or_404(Match, id=match_id)
+        if request.active_pet_id not in (match.pet1_id, match.pet2_id):
+            return None, None, None
+        return request.owner_id, match.id, Match.last_read_field(request.active_pet_id, match.pet1_id)
+
+    def messages_since(self, match_id, last_id):
+        """Mensagens enviadas enquanto o cliente estava desconectado"""
+        return [{
+            'id': msg.id,
+            'content': msg.content,
+            'sender': msg.sender.user.username,
+            'sender_id': msg.sender_id,
+            'timestamp': msg.timestamp.isoformat(),
+        } for msg in Message.objects.filter(
+            match_id=match_id, id__gt=last_id
+        ).select_related('sender__user')]
+
+    def format_event(self, payload, owner_id):
+        data = {
+            'id': payload['id'],
+            'content': payload['content'],
+            'sender': payload['sender'],
+            'timestamp': payload['timestamp'],
+            'is_mine': payload['sender_id'] == owner_id,
+        }
+        return f"id: {payload['id']}\ndata: {json.dumps(data)}\n\n"
+
+    async def event_stream(self, match_id, owner_id, read_field, last_id):
+        # Intervalo de reconexão sugerido ao EventSource (ms)
+        yield 'retry: 3000\n\n'
+        # Inscreve antes de consultar o banco para não perder nada entre as duas coisas
+        async with subscribe(chat_channel(match_id)) as queue:
+            pending = await sync_to_async(self.messages_since)(match_id, last_id)
+            catch_up = not is_shared()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.max_stream_seconds
+
+            while True:
+                while pending:
+                    payload = pending.pop(0)
+                    if payload['id'] <= last_id:
+                        continue
+                    last_id = payload['id']
+                    if payload['sender_id'] != owner_id:
+                        # Entregue com o chat aberto = lida (como no polling)
+                        await sync_to_async(advance_read_cursor)(match_id, read_field, payload['id'])
+                    yield self.format_event(payload, owner_id)
+
+                timeout = min(self.keepalive_seconds, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    if catch_up:
+                        # O publish de outro processo não chega nesta fila
+                        pending = await sync_to_async(self.messages_since)(match_id, last_id)
+                        if pending:
+                            continue
+                    yield ': keepalive\n\n'
+
+
+class CacheStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Contadores de acerto do cache de fragmentos (só para staff, por processo)"""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'status': 'success', **get_fragment_stats()})
+
+
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Métricas dos requests no formato texto do Prometheus (só para staff, por processo)"""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Exportação em streaming de swipes, passes, matches ou mensagens (só para staff).
+    GET /api/export/<kind>/?format=jsonl|csv&since_id=&start=&end=
+    """
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, kind, *args, **kwargs):
+        export_format = request.GET.get('format', 'jsonl')
+        try:
+            chunks = iter_export(
+                kind, export_format,
+                since_id=int(request.GET.get('since_id') or 0),
+                start=parse_bound(request.GET.get('start')),
+                end=parse_bound(request.GET.get('end')),
+            )
+        except (ExportError, ValueError) as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+        response = StreamingHttpResponse(chunks, content_type=f'{EXPORT_FORMATS[export_format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{export_format}"'
+        return response
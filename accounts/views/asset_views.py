@@ -0,0 +1,201 @@
+# Django Imports
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views import View
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+# Um ano: o máximo que os navegadores respeitam
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Nomes sem hash podem mudar: o navegador sempre revalida (304 pelo ETag)
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+# Range com um único intervalo: bytes=início-fim, bytes=início- ou bytes=-sufixo
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$', re.IGNORECASE)
+
+
+def accepted_encodings(request):
+    """Codificações aceitas no Accept-Encoding (ignorando as com q=0)"""
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        name, _, value = params.strip().partition('=')
+        try:
+            if name.strip() == 'q' and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def file_etag(stat, suffix='', weak=True):
+    """ETag do arquivo a partir de mtime e tamanho (sem ler o conteúdo)"""
+    return f'{"W/" if weak else ""}"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+
+
+def resolve_file(root, path):
+    """Caminho absoluto de path dentro de root; 404 se sair de root ou não existir"""
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Arquivo não encontrado')
+    if not os.path.isfile(full_path):
+        raise Http404('Arquivo não encontrado')
+    return full_path
+
+
+def parse_range(header, size):
+    """
+    (início, fim) inclusivos de um cabeçalho Range com um único intervalo de
+    bytes. None quando o cabeçalho deve ser ignorado (ausente, malformado ou
+    com vários intervalos: a resposta é o arquivo inteiro). Levanta
+    ValueError se o intervalo não cabe no arquivo (416).
+    """
+    match = RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Sufixo: os últimos N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError('Intervalo vazio')
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Intervalo fora do arquivo')
+    return start, end
+
+
+def iter_file_range(path, start, length, block_size=FileResponse.block_size):
+    """Lê só o trecho pedido do arquivo, em blocos"""
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class StaticAssetView(View):
+    """
+    Serve o STATIC_ROOT quando não há proxy na frente (settings.SERVE_STATIC,
+    DEBUG desligado). Arquivos com hash no nome (manifesto do collectstatic)
+    vão com cache imutável de um ano; os demais, com revalidação por ETag.
+    Se o navegador aceitar, entrega a versão pré-comprimida .br ou .gz gerada
+    no collectstatic (ver accounts/assets.py), sem comprimir nada por request.
+    """
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def get(self, request, path):
+        full_path = resolve_file(settings.STATIC_ROOT, path)
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        served_path, content_encoding = full_path, None
+        has_variants = False
+        accepted = accepted_encodings(request)
+        for coding, extension in self.encodings:
+            if os.path.isfile(full_path + extension):
+                has_variants = True
+                if content_encoding is None and coding in accepted:
+                    served_path, content_encoding = full_path + extension, coding
+
+        stat = os.stat(served_path)
+        immutable = path in getattr(staticfiles_storage, 'immutable_names', ())
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'ETag': file_etag(stat, f'-{content_encoding}' if content_encoding else ''),
+            'Last-Modified': http_date(stat.st_mtime),
+        }
+        if has_variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        response = get_conditional_response(
+            request, etag=headers['ETag'], last_modified=int(stat.st_mtime),
+        )
+        if response is None:
+            response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+            if content_encoding:
+                response['Content-Encoding'] = content_encoding
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+def if_range_matches(request, etag, last_modified):
+    """O If-Range (se houver) ainda vale para a versão atual do arquivo?"""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        # Só ETag forte serve para Range
+        return value == etag
+    return parse_http_date_safe(value) == int(last_modified)
+
+
+class MediaView(View):
+    """
+    Serve o MEDIA_ROOT (fotos dos pets, fotos de perfil e suas variantes)
+    com ETag, Last-Modified, cache de settings.MEDIA_CACHE_SECONDS e Range
+    (um intervalo por request). Com settings.MEDIA_ACCEL_REDIRECT, o Django
+    só decide o cabeçalho e o proxy envia os bytes:
+      'x-accel-redirect' (nginx): redireciona para MEDIA_ACCEL_PREFIX + caminho,
+          uma location interna, ex.: location /protected-media/ { internal; alias /srv/latinder/media/; }
+      'x-sendfile' (Apache mod_xsendfile, lighttpd): caminho absoluto do arquivo.
+    """
+    def get(self, request, path):
+        full_path = resolve_file(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        headers = {
+            'Cache-Control': f'public, max-age={getattr(settings, "MEDIA_CACHE_SECONDS", 0)}',
+            'ETag': file_etag(stat, weak=False),
+            'Last-Modified': http_date(stat.st_mtime),
+            'Accept-Ranges': 'bytes',
+        }
+
+        response = get_conditional_response(request, etag=headers['ETag'], last_modified=int(stat.st_mtime))
+        if response is None:
+            response = self.file_response(request, path, full_path, stat, content_type, headers['ETag'])
+        for name, value in headers.items():
+            response.setdefault(name, value)
+        return response
+
+    def file_response(self, request, path, full_path, stat, content_type, etag):
+        accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+        if accel == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + quote(path)
+            return response
+        if accel == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+            return response
+
+        size = stat.st_size
+        byte_range = None
+        if 'Range' in request.headers and if_range_matches(request, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(request.headers['Range'], size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+        if byte_range is None:
+            return FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(full_path, start, end - start + 1), status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
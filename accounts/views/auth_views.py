@@ -8,6 +8,7 @@ from django.shortcuts import redirect
 
 # App-specific Imports
 from ..models import Owner # Usamos ..models para "subir um nível" de pasta
+from ..middleware import get_active_pet
 
 # --- Views de Autenticação e Home ---
 
@@ -31,4 +32,10 @@ class HomeView(LoginRequiredMixin, TemplateView):
             return redirect('owner_edit')
         
         # Se já preencheu, continua e mostra a home.html
-        return super().get(self, request, *args, **kwargs)
\ No newline at end of file
+        return super().get(self, request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Pet ativo resolvido pelo ActivePetMiddleware
+        context['active_pet'] = get_active_pet(self.request)
+        return context
\ No newline at end of file
@@ -3,11 +3,16 @@ from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import DetailView
+from django.views import View
 from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
 
 # App-specific Imports
 from ..forms import PetForm, PetPhotoForm, OwnerProfileForm
 from ..models import Pet, Owner, PetPhoto
+from ..thumbnails import queue_variants
+from ..fragments import invalidate_fragments
+from ..routers import ReadReplicaMixin
 
 # --- Views de Perfil (CRUD) ---
 
@@ -23,7 +28,7 @@ class PetCreateView(LoginRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse_lazy('pet_detail', kwargs={'pk': self.object.pk})
 
-class PetDetailView(DetailView):
+class PetDetailView(ReadReplicaMixin, DetailView):
     model = Pet
     template_name = 'pet_detail.html'
 
@@ -32,7 +37,7 @@ class PetDetailView(DetailView):
         
         is_mine = False
         if self.request.user.is_authenticated:
-            is_mine = (self.object.owner == self.request.user.owner)
+            is_mine = (self.object.owner_id == self.request.owner_id)
         
         context['is_mine'] = is_mine
         
@@ -46,17 +51,20 @@ class PetDetailView(DetailView):
     def post(self, request, *args, **kwargs):
         self.object = self.get_object() 
         
-        if self.object.owner != self.request.user.owner:
+        if self.object.owner_id != self.request.owner_id:
             return HttpResponseRedirect(self.request.path_info) 
             
         form = PetPhotoForm(request.POST, request.FILES)
         
-        photo_count_before_save = self.object.petphoto_set.count()
+        # Contagem desnormalizada no próprio Pet (mantida pelos sinais de PetPhoto)
+        photo_count_before_save = self.object.photo_count
             
         if form.is_valid():
             photo = form.save(commit=False)
             photo.pet = self.object
             photo.save()
+            # Versões redimensionadas (card, thumb, avatar) são geradas em segundo plano
+            queue_variants(photo, 'image')
 
             if photo_count_before_save == 0:
                 return HttpResponseRedirect(reverse_lazy('swipe'))
@@ -68,7 +76,17 @@ class PetDetailView(DetailView):
             context['photo_form'] = form
             return self.render_to_response(context)
 
-class OwnerDetailView(LoginRequiredMixin, DetailView):
+class PetPrimaryPhotoView(LoginRequiredMixin, View):
+    """Define qual foto do pet aparece nos cards, matches e chat"""
+    def post(self, request, *args, **kwargs):
+        pet = get_object_or_404(Pet, pk=kwargs['pk'], owner_id=request.owner_id)
+        photo = get_object_or_404(PetPhoto, pk=kwargs['photo_pk'], pet=pet)
+        Pet.objects.filter(pk=pet.pk).update(primary_photo=photo)
+        # update() não dispara sinais: invalida os cards cacheados do pet aqui
+        invalidate_fragments(pet)
+        return HttpResponseRedirect(reverse_lazy('pet_detail', kwargs={'pk': pet.pk}))
+
+class OwnerDetailView(LoginRequiredMixin, ReadReplicaMixin, DetailView):
     model = Owner
     template_name = 'owner_detail.html'
 
@@ -102,4 +120,4 @@ class PetUpdateView(LoginRequiredMixin, UpdateView):
         return reverse_lazy('pet_detail', kwargs={'pk': self.object.pk})
     
     def get_queryset(self):
-        return Pet.objects.filter(owner=self.request.user.owner)
\ No newline at end of file
+        return Pet.objects.filter(owner_id=self.request.owner_id)
\ No newline at end of file
@@ -3,5 +3,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'latinder_proj.settings')
+# Swipe e chat com as views async (settings.ASYNC_API_VIEWS)
+os.environ.setdefault('LATINDER_ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
@@ -33,10 +33,16 @@ INSTALLED_APPS = [
 # Cada middleware é executado em ordem.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Latência e SQL por rota, expostos em /api/metrics/ (accounts/metrics.py)
+    'accounts.metrics.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Resolve o dono e o pet ativo uma vez por request (request.owner_id / request.active_pet_id)
+    'accounts.middleware.ActivePetMiddleware',
+    # Leituras das views com ReadReplicaMixin vão para as réplicas (accounts/routers.py)
+    'accounts.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,9 +79,71 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Banco de teste em arquivo: os testes com threads (accounts/tests.py)
+        # precisam esperar o lock de escrita, o que o banco em memória não faz
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Modo de produção do SQLite (opt-in): LATINDER_SQLITE_PRODUCTION=1.
+# Aplica WAL, busy_timeout, synchronous=NORMAL, mmap e cache_size em toda
+# conexão nova (accounts/sqlite_tuning.py) e mantém as conexões abertas
+# entre requests. Rode "python manage.py sqlite_maintenance" periodicamente
+# (ex.: cron a cada hora) para o checkpoint do WAL e o ANALYZE.
+SQLITE_PRODUCTION_MODE = os.environ.get('LATINDER_SQLITE_PRODUCTION') == '1'
+# Sobrescreve valores de accounts.sqlite_tuning.DEFAULT_PRAGMAS, ex.: {'busy_timeout': 10000}
+SQLITE_PRAGMAS = {}
+if SQLITE_PRODUCTION_MODE:
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Réplicas de leitura: LATINDER_DB_REPLICAS com os arquivos separados por
+# vírgula (ex.: /srv/latinder/replica.sqlite3). Cada um vira o alias
+# replica1, replica2, ... Localmente, "python manage.py sync_sqlite_replicas"
+# copia o banco principal para as réplicas no lugar da replicação real.
+DATABASE_REPLICAS = []
+for _index, _path in enumerate(filter(None, os.environ.get('LATINDER_DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'NAME': _path.strip(),
+        # Nos testes as réplicas apontam para o banco de teste principal
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['accounts.routers.ReplicaRouter']
+# Segundos que um navegador lê só do primário depois de escrever algo
+REPLICA_STICKY_SECONDS = 5
+
+# Cache
+# 'file' (padrão): arquivos em CACHE_DIR, compartilhado entre os processos da máquina.
+# 'locmem': memória de cada processo, mais rápido mas não compartilhado.
+# Escolha com a variável de ambiente LATINDER_CACHE_BACKEND.
+CACHE_BACKEND = os.environ.get('LATINDER_CACHE_BACKEND', 'file')
+CACHE_DIR = os.environ.get('LATINDER_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'latinder',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+CACHES = {'default': CACHE_BACKENDS[CACHE_BACKEND]}
+# O pet ativo na sessão, o cache de fragmentos e o 304 do polling do chat
+# guardam versões no cache, invalidadas por quem escreve. Isso só funciona
+# se todos os processos enxergam o mesmo cache: com o 'locmem' (ou
+# SHARED_CACHE = False) esses três recursos ficam desligados e cada request
+# lê do banco o que eles evitariam.
+SHARED_CACHE = CACHE_BACKEND != 'locmem'
+
+# Versão dos pets de cada dono em cache (accounts/middleware.py): com ela o
+# pet ativo guardado na sessão vale até um pet do dono ser criado ou apagado.
+ACTIVE_PET_VERSION_CACHE = SHARED_CACHE
+
 # Validação de senhas
 # Define regras para senhas seguras
 # Inclui validadores padrão do Django
@@ -131,5 +199,105 @@ LOGIN_URL = '/login/'
 # Configuração para arquivos de mídia (uploads dos usuários)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Mídia servida pelo MediaView (accounts/views/asset_views.py), com ETag,
+# Range e cache; desligue SERVE_MEDIA quando o proxy servir /media/ sozinho.
+SERVE_MEDIA = True
+# As variantes são regeradas com o mesmo nome, então o cache não é imutável
+MEDIA_CACHE_SECONDS = 60 * 60 * 24 * 7
+# Entrega dos bytes pelo proxy: None (o Django envia), 'x-accel-redirect'
+# (nginx, para a location interna MEDIA_ACCEL_PREFIX apontando para o
+# MEDIA_ROOT) ou 'x-sendfile' (Apache com mod_xsendfile, lighttpd)
+MEDIA_ACCEL_REDIRECT = os.environ.get('LATINDER_MEDIA_ACCEL') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+# Estáticos de produção (accounts/assets.py): "python manage.py collectstatic"
+# copia tudo para STATIC_ROOT com o hash do conteúdo no nome e as versões
+# .gz/.br (o .br só com o pacote opcional "brotli" instalado).
+# Bootstrap e Hammer.js saem do CDN até rodar "python manage.py vendor_static".
+STATIC_ROOT = os.environ.get('LATINDER_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'accounts.assets.CompressedManifestStaticFilesStorage'},
+}
+# Com DEBUG desligado, o próprio Django serve o STATIC_ROOT com cache imutável
+# (accounts/views/asset_views.py). Desligue quando o nginx servir /static/.
+SERVE_STATIC = True
+
+# Modo em lote do swipe.js: os swipes ficam num buffer no navegador e são
+# enviados juntos para /api/swipe/batch/ (periodicamente ou ao sair da página)
+SWIPE_BATCH_MODE = True
+
+# Push das mensagens do chat (Server-Sent Events em /api/chat-stream/).
+# Só funciona rodando sob ASGI (latinder_proj/asgi.py, ex.: uvicorn/daphne);
+# sob WSGI o chat.js continua com o polling a cada 5 segundos.
+CHAT_PUSH_ENABLED = True
+# Backend de publish/subscribe das mensagens (ver accounts/pubsub.py).
+# O InProcessBackend só entrega dentro do mesmo processo; com vários workers
+# as mensagens de outro processo chegam pela consulta feita a cada keepalive
+# do stream (até ~15 s de atraso). Um backend compartilhado entrega na hora.
+CHAT_PUBSUB_BACKEND = 'accounts.pubsub.InProcessBackend'
+
+# Versões async das views de swipe e chat (accounts/views/api_views.py).
+# O latinder_proj/asgi.py liga por padrão; sob WSGI ficam as síncronas.
+ASYNC_API_VIEWS = os.environ.get('LATINDER_ASYNC_API_VIEWS') == '1'
+
+# Id da última mensagem de cada match em cache, para o polling do chat
+# responder 304 sem ir ao banco (ver accounts/chat.py e SHARED_CACHE)
+CHAT_LATEST_MESSAGE_CACHE = SHARED_CACHE
+# Tempo (segundos) que esse id fica em cache
+CHAT_LATEST_MESSAGE_TIMEOUT = 300
+
+# Threads do pool que gera as versões redimensionadas das fotos (accounts/thumbnails.py)
+IMAGE_VARIANT_WORKERS = 2
+
+# Ranking dos candidatos do deck (accounts/ranking.py): com True os cards
+# vêm ordenados por nota (idade, localização, raça, atividade, likes recebidos)
+# em vez de por id. Os pesos padrão podem ser trocados em DECK_RANKING_WEIGHTS,
+# ex.: {'city': 3.0}. O cache de features em memória é recarregado por inteiro
+# a cada DECK_RANKING_REFRESH_SECONDS (mudanças de outros processos).
+DECK_RANKING_ENABLED = True
+DECK_RANKING_WEIGHTS = {}
+DECK_RANKING_REFRESH_SECONDS = 300
+# A ordem calculada na primeira página fica em cache por este tempo e as
+# páginas seguintes a reaproveitam (mesmas notas, sem cards repetidos).
+# Com o cache 'locmem' e vários processos, quem não a encontra recalcula e
+# continua pela nota do último card.
+DECK_RANKING_SNAPSHOT_SECONDS = 900
+# Candidatos ordenados por vez (a janela guardada no snapshot); os demais só
+# são ordenados quando o deck chega ao fim da janela.
+DECK_RANKING_SNAPSHOT_SIZE = 500
+
+# Passes compactados (accounts/passes.py): cada pet guarda os ids que passou
+# num blob por período de PASS_PERIOD_DAYS dias. Com PASS_EXPIRY_DAYS (ex.: 90)
+# os passes mais velhos que isso expiram e os pets voltam ao deck; None nunca
+# expira. A expiração e a compactação dos blobs são feitas pelo
+# "python manage.py compact_passes" (rodar periodicamente, ex.: cron diário).
+PASS_PERIOD_DAYS = 7
+PASS_EXPIRY_DAYS = None
+
+# Cache de fragmentos de template (cards de pets e blocos de perfil, ver
+# accounts/fragments.py). A invalidação é feita pelos sinais; o timeout só
+# limita dados que mudam com o tempo, como a idade exibida (ver SHARED_CACHE).
+FRAGMENT_CACHE_ENABLED = SHARED_CACHE
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Métricas por request (accounts/metrics.py), expostas em /api/metrics/ para staff.
+# Requests acima de METRICS_SLOW_REQUEST_MS, ou que repetem o mesmo SQL
+# METRICS_DUPLICATE_QUERY_THRESHOLD vezes ou mais (suspeita de N+1), geram
+# uma linha de log em JSON no logger "accounts.metrics".
+METRICS_ENABLED = True
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_DUPLICATE_QUERY_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'accounts': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -1,24 +1,30 @@
 # Esse arquivo define as rotas URL para o projeto Latinder.
 # Ele inclui as URLs do aplicativo de contas (accounts)
-# e configura o acesso a arquivos de mídia durante o desenvolvimento.
+# e as rotas dos arquivos de mídia e estáticos.
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from accounts.views import MediaView, StaticAssetView
 
 # Definindo as rotas principais do projeto
 # Adicionamos a rota para o admin e para o app de contas
 # A rota raiz ('') aponta para as URLs definidas no app "accounts"
-# Configuração para servir arquivos de mídia em modo de desenvolvimento
-# Isso é importante para permitir uploads de usuários, como fotos de perfil
-# durante o desenvolvimento local.
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')), 
 ]
 
-# Configuração para servir arquivos de mídia em modo de desenvolvimento
-# Isso permite que arquivos enviados pelos usuários sejam acessíveis
-# apenas quando o DEBUG está ativado (modo de desenvolvimento)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Arquivos de mídia (uploads dos usuários), em desenvolvimento e em produção.
+# Com settings.MEDIA_ACCEL_REDIRECT quem envia os bytes é o proxy.
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', MediaView.as_view(), name='media'),
+    ]
+
+# Em produção sem proxy, os estáticos do collectstatic (com hash e .gz/.br)
+# saem daqui com cache imutável; em DEBUG o runserver já serve os estáticos
+if not settings.DEBUG and settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.+)$', StaticAssetView.as_view(), name='static_asset'),
+    ]
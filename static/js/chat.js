@@ -36,19 +36,12 @@ function scrollToBottom() {
 // Rola para o final ao carregar a página
 scrollToBottom();
 
-// Função para adicionar uma mensagem na tela
-function addMessageToScreen(messageData) {
-    
-    // <-- MUDANÇA 1: REMOVER MENSAGEM DE "VAZIO" ---
-    // Procura pela mensagem "Nenhuma mensagem"
-    const emptyMessage = document.getElementById('emptyChatMessage');
-    // Se ela existir, remove
-    if (emptyMessage) {
-        emptyMessage.remove();
-    }
-    // --- FIM DA MUDANÇA 1 ---
-
+// Cursor da página de mensagens mais antigas (vazio quando não há mais histórico)
+let olderCursor = messagesArea.dataset.olderCursor || '';
+let isLoadingOlder = false;
 
+// Cria o elemento HTML de uma mensagem
+function createMessageElement(messageData) {
     // <-- MUDANÇA 2: CORREÇÃO DO FUSO HORÁRIO ---
     // Converte o timestamp ISO (que vem do backend) para um objeto Data do JS
     const messageDate = new Date(messageData.timestamp);
@@ -72,14 +65,65 @@ function addMessageToScreen(messageData) {
         <div class="message-time">
             ${localTime} </div>
     `;
+    return messageDiv;
+}
+
+// Função para adicionar uma mensagem na tela
+function addMessageToScreen(messageData) {
     
-    messagesArea.appendChild(messageDiv);
+    // <-- MUDANÇA 1: REMOVER MENSAGEM DE "VAZIO" ---
+    // Procura pela mensagem "Nenhuma mensagem"
+    const emptyMessage = document.getElementById('emptyChatMessage');
+    // Se ela existir, remove
+    if (emptyMessage) {
+        emptyMessage.remove();
+    }
+    // --- FIM DA MUDANÇA 1 ---
+
+    // A mesma mensagem pode chegar pelo envio, pelo push e pelo polling
+    if (messagesArea.querySelector(`[data-message-id="${messageData.id}"]`)) {
+        return;
+    }
+
+
+    messagesArea.appendChild(createMessageElement(messageData));
     scrollToBottom();
     
     // Atualiza o ID da última mensagem
-    lastMessageId = messageData.id;
+    lastMessageId = Math.max(lastMessageId, messageData.id);
 }
 
+// Carrega a página anterior do histórico quando o usuário rola até o topo
+function loadOlderMessages() {
+    if (!olderCursor || isLoadingOlder) return;
+    isLoadingOlder = true;
+
+    fetch(`/api/messages/history/?match_id=${matchId}&cursor=${encodeURIComponent(olderCursor)}`)
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(data => {
+            olderCursor = data.next_cursor || '';
+
+            // Insere as mensagens no topo sem "pular" a posição de leitura
+            const previousHeight = messagesArea.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(message => {
+                if (!messagesArea.querySelector(`[data-message-id="${message.id}"]`)) {
+                    fragment.appendChild(createMessageElement(message));
+                }
+            });
+            messagesArea.insertBefore(fragment, messagesArea.firstChild);
+            messagesArea.scrollTop += messagesArea.scrollHeight - previousHeight;
+        })
+        .catch(error => console.error('Erro ao carregar mensagens antigas:', error))
+        .finally(() => { isLoadingOlder = false; });
+}
+
+messagesArea.addEventListener('scroll', function() {
+    if (messagesArea.scrollTop < 50) {
+        loadOlderMessages();
+    }
+});
+
 // Função para enviar mensagem (AJAX)
 messageForm.addEventListener('submit', function(e) {
     e.preventDefault();
@@ -128,9 +172,10 @@ messageForm.addEventListener('submit', function(e) {
 // Função para buscar novas mensagens (Polling)
 function fetchNewMessages() {
     fetch(`/api/get-messages/?match_id=${matchId}&last_message_id=${lastMessageId}`)
-        .then(response => response.json())
+        // 304 = nenhuma mensagem nova desde lastMessageId
+        .then(response => response.status === 304 ? null : response.json())
         .then(data => {
-            if (data.status === 'success' && data.messages.length > 0) {
+            if (data && data.status === 'success' && data.messages.length > 0) {
                 // Adiciona cada mensagem nova na tela
                 data.messages.forEach(message => {
                     addMessageToScreen(message);
@@ -142,5 +187,52 @@ function fetchNewMessages() {
         });
 }
 
-// Inicia o polling: busca novas mensagens a cada 5 segundos
-setInterval(fetchNewMessages, 5000);
\ No newline at end of file
+// Polling: busca novas mensagens a cada 5 segundos.
+// Só fica ligado quando o canal de push (SSE) não está disponível.
+let pollingTimer = null;
+
+function startPolling() {
+    if (pollingTimer === null) {
+        pollingTimer = setInterval(fetchNewMessages, 5000);
+    }
+}
+
+function stopPolling() {
+    if (pollingTimer !== null) {
+        clearInterval(pollingTimer);
+        pollingTimer = null;
+    }
+}
+
+// Canal de push: o servidor envia cada mensagem nova assim que ela é salva
+function startPush(streamUrl) {
+    const source = new EventSource(`${streamUrl}?match_id=${matchId}&last_message_id=${lastMessageId}`);
+
+    source.onopen = function() {
+        // Com o stream aberto o polling para: mensagens salvas em outro worker
+        // chegam pelo próprio stream, que consulta o banco a cada keepalive
+        stopPolling();
+        // Cobre mensagens que chegaram enquanto a conexão estava caída
+        fetchNewMessages();
+    };
+
+    source.onmessage = function(event) {
+        const message = JSON.parse(event.data);
+        if (message.id > lastMessageId) {
+            addMessageToScreen(message);
+        }
+    };
+
+    source.onerror = function() {
+        // O EventSource tenta reconectar sozinho; enquanto isso, volta ao polling.
+        // Se o servidor recusar o push (ex.: rodando sob WSGI), a conexão é fechada de vez.
+        startPolling();
+    };
+}
+
+const streamUrl = messagesArea.dataset.streamUrl;
+if (streamUrl && window.EventSource) {
+    startPush(streamUrl);
+} else {
+    startPolling();
+}
\ No newline at end of file
@@ -6,6 +6,18 @@ document.addEventListener('DOMContentLoaded', function () {
     const swipeButtons = document.getElementById('swipeButtons');
 
     const swipeContainer = document.getElementById('swipeContainer');
+
+    // Cursor da próxima página do deck (vazio quando não há mais páginas)
+    let nextCursor = cardStack ? cardStack.dataset.nextCursor : '';
+    let isLoadingDeck = false;
+    // Quando restarem esta quantidade de cards (ou menos), busca a próxima página
+    const PREFETCH_THRESHOLD = 3;
+
+    // Modo em lote: swipes vão para um buffer e são enviados juntos
+    const BATCH_MODE = cardStack ? cardStack.dataset.swipeMode === 'batch' : false;
+    const BATCH_FLUSH_INTERVAL = 5000; // ms
+    const BATCH_MAX_SIZE = 20;
+    let swipeBuffer = [];
     
     // ----------------------------------------------------
     // FUNÇÕES DE AÇÃO
@@ -13,6 +25,13 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Envia a ação de like/pass para o backend Django
     function sendSwipeAction(petId, liked) {
+        if (BATCH_MODE) {
+            // O dataset guarda o id como texto; a API espera um número
+            swipeBuffer.push({ 'swiped_pet_id': Number(petId), 'liked': liked });
+            if (swipeBuffer.length >= BATCH_MAX_SIZE) flushSwipes();
+            return;
+        }
+
         fetch('/api/swipe/', {
             method: 'POST',
             headers: { 
@@ -34,6 +53,126 @@ document.addEventListener('DOMContentLoaded', function () {
         .catch(error => console.error('Erro:', error));
     }
     
+    // Envia o buffer de swipes para /api/swipe/batch/.
+    // keepalive permite que a requisição termine mesmo com a página sendo fechada.
+    function flushSwipes(keepalive = false) {
+        if (swipeBuffer.length === 0) return;
+        const batch = swipeBuffer;
+        swipeBuffer = [];
+
+        fetch('/api/swipe/batch/', {
+            method: 'POST',
+            keepalive: keepalive,
+            headers: { 
+                'Content-Type': 'application/json', 
+                'X-CSRFToken': csrfToken 
+            },
+            body: JSON.stringify({ 'swipes': batch })
+        })
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(data => {
+            console.log('Swipes registrados:', data.processed);
+            if (data.matches && data.matches.length > 0) {
+                alert('Você tem um novo match! 💕');
+            }
+        })
+        .catch(error => {
+            console.error('Erro:', error);
+            // Um 4xx (lote recusado) se repetiria para sempre: o lote é descartado.
+            // Falha de rede ou 5xx: devolve o lote ao buffer para o próximo envio.
+            const rejected = typeof error === 'number' && error >= 400 && error < 500;
+            if (!keepalive && !rejected) swipeBuffer = batch.concat(swipeBuffer);
+        });
+    }
+
+    // Monta o HTML de um card a partir do JSON do /api/deck/ (mesmo formato do swipe.html)
+    function buildCard(pet) {
+        const card = document.createElement('div');
+        card.className = 'pet-card';
+        card.dataset.petId = pet.id;
+        card.innerHTML = `
+            <div class="card-overlay like">❤️</div>
+            <div class="card-overlay nope">❌</div>
+            <div class="card shadow-lg">
+                <div class="card-photo"></div>
+                <div class="card-body">
+                    <h4 class="card-title"></h4>
+                    <p class="card-text text-muted card-breed"></p>
+                    <p class="card-text card-bio"></p>
+                </div>
+            </div>
+        `;
+
+        const photo = card.querySelector('.card-photo');
+        if (pet.photo_url) {
+            const img = document.createElement('img');
+            img.src = pet.photo_url;
+            img.className = 'card-img-top';
+            img.alt = `Foto de ${pet.name}`;
+            img.style.height = '400px';
+            img.style.objectFit = 'cover';
+            if (pet.photo_webp_url) {
+                // Mesma estrutura da tag {% picture %}: WebP com JPEG de reserva
+                const picture = document.createElement('picture');
+                const source = document.createElement('source');
+                source.type = 'image/webp';
+                source.srcset = pet.photo_webp_url;
+                picture.append(source, img);
+                photo.replaceWith(picture);
+            } else {
+                photo.replaceWith(img);
+            }
+        } else {
+            photo.className = 'd-flex justify-content-center align-items-center bg-secondary text-white';
+            photo.style.height = '400px';
+            photo.innerHTML = '<span>Sem foto</span>';
+        }
+
+        // textContent evita injeção de HTML vindo do perfil do pet
+        card.querySelector('.card-title').textContent = `${pet.name}, ${pet.age}`;
+        card.querySelector('.card-breed').textContent = pet.breed;
+        card.querySelector('.card-bio').textContent = pet.bio;
+        return card;
+    }
+
+    // Busca a próxima página do deck quando a pilha está acabando
+    function prefetchDeck() {
+        if (!nextCursor || isLoadingDeck || cards.length > PREFETCH_THRESHOLD) return;
+        isLoadingDeck = true;
+
+        fetch(`/api/deck/?cursor=${encodeURIComponent(nextCursor)}`)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => {
+                nextCursor = data.next_cursor || '';
+                const wasEmpty = cards.length === 0;
+                data.pets.forEach(pet => {
+                    const card = buildCard(pet);
+                    cardStack.appendChild(card);
+                    cards.push(card);
+                });
+
+                if (wasEmpty && cards.length > 0) {
+                    // A pilha tinha acabado enquanto a página carregava
+                    if (swipeContainer) swipeContainer.style.display = '';
+                    if (swipeButtons) swipeButtons.style.display = '';
+                    endMessage.style.display = 'none';
+                    setupHammer(cards[0]);
+                } else if (cards.length === 0) {
+                    showEndMessage();
+                }
+            })
+            .catch(error => console.error('Erro ao carregar o deck:', error))
+            .finally(() => { isLoadingDeck = false; });
+    }
+
+    // Mostra a mensagem de fim da fila e esconde os botões
+    function showEndMessage() {
+        if (swipeContainer) swipeContainer.style.display = 'none';
+        
+        endMessage.style.display = 'block';
+        if (swipeButtons) swipeButtons.style.display = 'none'; 
+    }
+
     // Função para remover card com animação
     function removeCard(card, liked) {
         const petId = card.dataset.petId;
@@ -52,15 +191,15 @@ document.addEventListener('DOMContentLoaded', function () {
             cards = cards.filter(c => c !== card);
             
             if (cards.length === 0) {
-                if (swipeContainer) swipeContainer.style.display = 'none';
-                
-                endMessage.style.display = 'block';
-                if (swipeButtons) swipeButtons.style.display = 'none'; 
-                
+                // Se ainda há páginas, o prefetchDeck reexibe a pilha quando chegarem
+                if (!nextCursor) {
+                    showEndMessage();
+                }
             } else {
                 // Prepara o próximo card para "arrastar"
                 setupHammer(cards[0]); 
             }
+            prefetchDeck();
         }, 500);
     }
 
@@ -144,4 +283,16 @@ document.addEventListener('DOMContentLoaded', function () {
     // Tenta ativar o 'arrastar' (drag) no primeiro card
     setupHammer(cards[0]);
 
+    // Se a primeira página já veio pequena, busca a próxima logo de início
+    prefetchDeck();
+
+    if (BATCH_MODE) {
+        // Envio periódico do buffer e envio final ao sair/esconder a página
+        setInterval(flushSwipes, BATCH_FLUSH_INTERVAL);
+        document.addEventListener('visibilitychange', function() {
+            if (document.visibilityState === 'hidden') flushSwipes(true);
+        });
+        window.addEventListener('pagehide', function() { flushSwipes(true); });
+    }
+
 });
\ No newline at end of file